@@ -1,12 +1,15 @@
 import math
+import bisect
+import itertools
 from abc import ABC, abstractmethod
 from enum import Enum
 from pyrecodes_hospitals import ComponentRecoveryModel
 from pyrecodes_hospitals import Resource
 from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientList
+from pyrecodes_hospitals import RandomStreams
 import numpy as np
 import json
-import copy
 
 
 class SupplyOrDemand(Enum):
@@ -490,22 +493,68 @@ class HospitalComponent(StandardiReCoDeSComponent):
 
     set_predefined_resource_dynamics
 
-    update_resources_based_on_predefined_resource_dynamics
+    compile_resource_dynamics
 
-    get_resource_amount_based_on_time_step
+    update_resources_based_on_predefined_resource_dynamics
 
     update_supply_based_on_consumption
     """
 
-    PRIORITIZED_PATIENTS_LIST = ['Red', 'Yellow', 'Green', 'Rest'] # last element is for patients that do not have a triage category and must be in the list to avoid errors
+    PRIORITIZED_PATIENTS_LIST = Patient.PatientProfile.TRIAGE_CATEGORIES # last element is for patients that do not have a triage category and must be in the list to avoid errors
+    EVENLY_DISTRIBUTED_RESOURCE = 'Nurse'
 
     def __init__(self) -> None:
         super().__init__()
         self.predefined_resource_dynamics = []
-        self.patients = []
+        # predefined resource dynamics compiled to the (resource dynamic, amount) pairs that change resources at each time step
+        self.resource_dynamics_schedule = {}
+        self.resource_dynamics_time_steps = []
+        self.patients = PatientList.PatientList()
+        # if a patient store is set, patients are stored in the store and the patients list is only synchronized on request
+        self.patient_store = None
+        # if a patient router is set, patients that leave the component are reported to it
+        # and the demand of the patients is kept as running totals updated when patients arrive, leave or change their demand
+        self.patient_router = None
+        self.patient_demand = {}
+        # patients demanding a resource are indexed by resource name and triage category in the order of the patients list
+        self.patients_with_demand = {}
+        self.unordered_resources = set()
+        # if a patient archive is set, patients in the component exited the hospital and are not updated at each time step
+        self.patient_archive = None
     
     def set_predefined_resource_dynamics(self, resource_dynamics: list): 
         self.predefined_resource_dynamics = resource_dynamics    
+        self.resource_dynamics_schedule = self.compile_resource_dynamics(resource_dynamics)
+        self.resource_dynamics_time_steps = sorted(self.resource_dynamics_schedule)
+
+    def compile_resource_dynamics(self, resource_dynamics: list) -> dict:
+        """
+        Return the table of resource dynamics that change resources at each time step, so that a time step only touches its own events.
+        """
+        resource_dynamics_schedule = {}
+        for resource_dynamic in resource_dynamics:
+            for time_step, amount in self.get_amounts_at_time_steps(resource_dynamic).items():
+                resource_dynamics_schedule.setdefault(time_step, []).append((resource_dynamic, amount))
+        return resource_dynamics_schedule
+
+    def get_amounts_at_time_steps(self, resource_dynamic: dict) -> dict:
+        amounts_at_time_steps = {}
+        for time_step, amount in zip(resource_dynamic['AtTimeStep'], resource_dynamic['Amount']):
+            # if a time step is listed more than once, its first amount is used
+            amounts_at_time_steps.setdefault(time_step, amount)
+        return amounts_at_time_steps
+
+    def get_next_resource_dynamics_time_step(self, time_step: int) -> float:
+        """
+        Return the first time step after time_step at which predefined resource dynamics change resources, or infinity if there is none.
+        """
+        time_step_id = bisect.bisect_right(self.resource_dynamics_time_steps, time_step)
+        if time_step_id < len(self.resource_dynamics_time_steps):
+            return self.resource_dynamics_time_steps[time_step_id]
+        return math.inf
+
+    def get_resource_to_change(self, resource_dynamic: dict) -> Resource.Resource:
+        return getattr(self, resource_dynamic['SupplyOrDemand'])[resource_dynamic['SupplyOrDemandType']][resource_dynamic['Resource']]
 
     def update(self, time_step: int, system_consumption: dict) -> None:
         super().update(time_step)
@@ -517,22 +566,9 @@ class HospitalComponent(StandardiReCoDeSComponent):
         """
         Note that the predefined resoruce dynamics changes the intial resource amount.
         """
-        for resource_dynamic in self.predefined_resource_dynamics:
-            new_amount = self.get_resource_amount_based_on_time_step(resource_dynamic, time_step)
-            if new_amount is not None:
-                resource_to_change = getattr(self, resource_dynamic['SupplyOrDemand'])[resource_dynamic['SupplyOrDemandType']][resource_dynamic['Resource']]
-                resource_to_change.set_initial_amount(new_amount)
-    
-    def get_resource_amount_based_on_time_step(self, resource_dynamic: dict, time_step: int) -> None:   
-        # this method is used for supply increase (consider renaming it to reflect that!)
-        # take current supply and increase the amount based on resource dynamics  
-        # different for patient source component   
-        if time_step in resource_dynamic['AtTimeStep']:
-            amount_id = [i for i, value in enumerate(resource_dynamic['AtTimeStep']) if value == time_step]
-            current_amount = getattr(self, resource_dynamic['SupplyOrDemand'])[resource_dynamic['SupplyOrDemandType']][resource_dynamic['Resource']].current_amount
-            return resource_dynamic['Amount'][amount_id[0]] + current_amount
-        else:
-            return None
+        for resource_dynamic, amount in self.resource_dynamics_schedule.get(time_step, []):
+            resource_to_change = self.get_resource_to_change(resource_dynamic)
+            resource_to_change.set_initial_amount(amount + resource_to_change.current_amount)
     
     def update_supply_based_on_consumption(self, system_consumption: dict) -> None:
         """
@@ -542,8 +578,31 @@ class HospitalComponent(StandardiReCoDeSComponent):
         for resource_name, resource in self.supply['Supply'].items():
             if isinstance(resource, Resource.ConsumableResource) and len(system_consumption[resource_name]) > 0:
                 resource.update_supply_based_on_consumption(system_consumption[resource_name][-1])
+
+    def advance_supply_based_on_consumption(self, system_consumption: dict, number_of_time_steps: int) -> dict:
+        """
+        Decrease supply of consumable resources as if it were decreased by the last consumption at each of the given number of time steps.
+        Return the amounts of the consumable resources after each time step.
+        """
+        amounts_after_consumption = {}
+        for resource_name, resource in self.supply['Supply'].items():
+            if isinstance(resource, Resource.ConsumableResource) and len(system_consumption[resource_name]) > 0:
+                amounts = resource.get_amounts_after_consumption(resource.current_amount, system_consumption[resource_name][-1], number_of_time_steps)
+                resource.current_amount = amounts[-1].item()
+                amounts_after_consumption[resource_name] = amounts
+        return amounts_after_consumption
     
     def update_operation_demand_based_on_patients(self):
+        if self.patient_store is not None:
+            self.set_current_operation_demand(self.patient_store.get_operation_demand(self))
+            return
+        if self.patient_archive is not None:
+            # archived patients are out of the hospital and have no demand
+            self.set_current_operation_demand({})
+            return
+        if self.patient_router is not None:
+            self.set_current_operation_demand({resource_name: total_demand for resource_name, (total_demand, _) in self.patient_demand.items()})
+            return
         operation_demand = {}
         for patient in self.patients:
             patient_resource_demand = patient.get_resource_demand()
@@ -575,29 +634,46 @@ class HospitalComponent(StandardiReCoDeSComponent):
         """
         Define the number of patients with met demand - prioritization on first-come first-served basis.
         """
-        patients_with_demand = self.get_patients_with_demand(resource_name)
-        if resource_name == 'Nurse':
-            self.distribute_resource_among_patients_evenly_within_the_same_patient_profile(resource_name, percent_of_met_demand, patients_with_demand)
+        if self.patient_store is not None:
+            self.update_stored_patients_based_on_unmet_demand(resource_name, percent_of_met_demand)
+            return
+        if self.patient_router is not None:
+            categorized_patients = self.get_categorized_patients_with_demand(resource_name)
         else:
-            self.distribute_resource_among_patients_priority(resource_name, percent_of_met_demand, patients_with_demand)
+            categorized_patients = self.categorize_patients(self.get_patients_with_demand(resource_name))
+        if resource_name == self.EVENLY_DISTRIBUTED_RESOURCE:
+            self.distribute_resource_among_categorized_patients_evenly(resource_name, percent_of_met_demand, categorized_patients)
+        else:
+            self.distribute_resource_among_categorized_patients_priority(resource_name, percent_of_met_demand, categorized_patients)
     
+    def update_stored_patients_based_on_unmet_demand(self, resource_name: str, percent_of_met_demand: float) -> None:
+        if resource_name == self.EVENLY_DISTRIBUTED_RESOURCE:
+            self.patient_store.distribute_resource_among_patients_evenly_within_the_same_patient_profile(self, resource_name, percent_of_met_demand)
+        else:
+            self.patient_store.distribute_resource_among_patients_priority(self, resource_name, percent_of_met_demand)
+
     def distribute_resource_among_patients_priority(self, resource_name: str, percent_of_met_demand: float, patients_with_demand: list) -> None:
-        number_of_patients_with_met_demand = int(len(patients_with_demand) * percent_of_met_demand)
-        patients_with_demand = self.prioritize_patients(patients_with_demand)
-        for i, patient in enumerate(patients_with_demand):
-            if i >= number_of_patients_with_met_demand:
-                patient.update_resource_demand_met(resource_name, 0.0) 
+        self.distribute_resource_among_categorized_patients_priority(resource_name, percent_of_met_demand, self.categorize_patients(patients_with_demand))
+
+    def distribute_resource_among_categorized_patients_priority(self, resource_name: str, percent_of_met_demand: float, categorized_patients: dict) -> None:
+        # categories are walked in the order of the PRIORITIZED_PATIENTS_LIST and patients within a category on first-come first-served basis
+        number_of_patients_with_demand = sum([len(categorized_patients[category]) for category in self.PRIORITIZED_PATIENTS_LIST])
+        number_of_patients_with_met_demand = int(number_of_patients_with_demand * percent_of_met_demand)
+        prioritized_patients = itertools.chain.from_iterable(categorized_patients[category] for category in self.PRIORITIZED_PATIENTS_LIST)
+        for patient in itertools.islice(prioritized_patients, number_of_patients_with_met_demand, None):
+            patient.update_resource_demand_met(resource_name, 0.0)
+
+    def get_triage_category(self, patient: Patient.PatientType) -> str:
+        # the triage category of the default PRIORITIZED_PATIENTS_LIST is resolved once in the patient profile
+        if self.PRIORITIZED_PATIENTS_LIST is Patient.PatientProfile.TRIAGE_CATEGORIES:
+            return patient.triage_category
+        return Patient.PatientProfile.find_triage_category(patient.name, self.PRIORITIZED_PATIENTS_LIST)
 
     def categorize_patients(self, patients: list):
         # Categorize patients based on their patient profile (i.e., patient.name) and the PRIORITIZED_PATIENTS_LIST.
         categorized_patients = {category: [] for category in self.PRIORITIZED_PATIENTS_LIST}
         for patient in patients:
-            for category in self.PRIORITIZED_PATIENTS_LIST:
-                if category in patient.name:
-                    categorized_patients[category].append(patient)
-                    break
-            else:
-                categorized_patients[category].append(patient)
+            categorized_patients[self.get_triage_category(patient)].append(patient)
         return categorized_patients
     
     def prioritize_patients(self, patients_with_demand: list) -> list:
@@ -614,9 +690,11 @@ class HospitalComponent(StandardiReCoDeSComponent):
         # This method is foremost written for distributing Nurses among patients.
         # If in a department there are different pateint profiles, the resource is distributed evenly among patients within the same patient profile.
         # But some patient profiles are prioritized over others, depending on the PRIORITIZED_PATIENTS_LIST.
+        self.distribute_resource_among_categorized_patients_evenly(resource_name, percent_of_met_demand, self.categorize_patients(patients_with_demand))
+
+    def distribute_resource_among_categorized_patients_evenly(self, resource_name: str, percent_of_met_demand: float, categorized_patients: dict) -> None:
         total_demand = self.demand[self.DemandTypes.OPERATION_DEMAND.value][resource_name].current_amount
         met_demand = total_demand * percent_of_met_demand
-        categorized_patients = self.categorize_patients(patients_with_demand)
         for patient_category in self.PRIORITIZED_PATIENTS_LIST:
             patients = categorized_patients[patient_category]
             total_demand_per_category = sum([patient.get_resource_demand()[resource_name] for patient in patients])
@@ -626,6 +704,15 @@ class HospitalComponent(StandardiReCoDeSComponent):
                     patient.update_resource_demand_met(resource_name, demand_met_per_patient)
             met_demand = max(met_demand - total_demand_per_category, 0)
 
+    def get_categorized_patients_with_demand(self, resource_name: str) -> dict:
+        if resource_name in self.unordered_resources:
+            self.unordered_resources.discard(resource_name)
+            self.patients_with_demand[resource_name] = {}
+            for patient in self.get_patients_with_demand(resource_name):
+                self.patients_with_demand[resource_name].setdefault(self.get_triage_category(patient), {})[patient] = None
+        patients_with_demand = self.patients_with_demand.get(resource_name, {})
+        return {category: patients_with_demand.get(category, {}) for category in self.PRIORITIZED_PATIENTS_LIST}
+
     def get_patients_with_demand(self, resource_name: str) -> list:
         patients_with_demand = []
         for patient in self.patients:
@@ -633,22 +720,114 @@ class HospitalComponent(StandardiReCoDeSComponent):
                 patients_with_demand.append(patient)
         return patients_with_demand      
 
+    def initialize_patient_demand(self) -> None:
+        self.patient_demand = {}
+        self.patients_with_demand = {}
+        self.unordered_resources = set()
+        for patient in self.patients:
+            self.add_patient_demand(patient, patient.get_resource_demand())
+
+    def add_patient_demand(self, patient: Patient.PatientType, resource_demand: dict) -> None:
+        self.add_to_demand_totals(resource_demand, number_of_patients=1)
+        for resource_name, amount in resource_demand.items():
+            if amount > 0:
+                self.index_patient(patient, resource_name)
+
+    def remove_patient_demand(self, patient: Patient.PatientType, resource_demand: dict) -> None:
+        self.add_to_demand_totals(resource_demand, number_of_patients=-1)
+        for resource_name, amount in resource_demand.items():
+            if amount > 0:
+                self.patients_with_demand[resource_name][self.get_triage_category(patient)].pop(patient)
+
+    def index_patient(self, patient: Patient.PatientType, resource_name: str) -> None:
+        # patients are kept in first-in first-out order per resource and triage category
+        self.patients_with_demand.setdefault(resource_name, {}).setdefault(self.get_triage_category(patient), {})[patient] = None
+
+    def change_patient_demand(self, patient: Patient.PatientType, old_resource_demand: dict, new_resource_demand: dict) -> None:
+        self.add_to_demand_totals(old_resource_demand, number_of_patients=-1)
+        self.add_to_demand_totals(new_resource_demand, number_of_patients=1)
+        # a patient keeps its position in the index of resources it still demands
+        for resource_name, amount in old_resource_demand.items():
+            if amount > 0 and not(new_resource_demand.get(resource_name, 0) > 0):
+                self.patients_with_demand[resource_name][self.get_triage_category(patient)].pop(patient)
+        for resource_name, amount in new_resource_demand.items():
+            if amount > 0 and not(old_resource_demand.get(resource_name, 0) > 0):
+                # patients that are not the last in the list are ordered again when the index is used
+                self.index_patient(patient, resource_name)
+                self.unordered_resources.add(resource_name)
+
+    def add_to_demand_totals(self, resource_demand: dict, number_of_patients: int) -> None:
+        # the number of patients demanding a resource is kept to remove the resource when no patient demands it,
+        # which also resets the rounding errors accumulated by adding and removing patients
+        for resource_name, amount in resource_demand.items():
+            total_demand, patients_with_demand = self.patient_demand.get(resource_name, (0, 0))
+            patients_with_demand += number_of_patients
+            if patients_with_demand == 0:
+                self.patient_demand.pop(resource_name)
+            else:
+                self.patient_demand[resource_name] = (total_demand + number_of_patients * amount, patients_with_demand)
+
     def update_patient_status(self, time_step: int) -> None:
+        if self.patient_archive is not None:
+            self.patient_archive.update(time_step)
+            return
+        if self.patient_router is None:
+            for patient in self.patients:
+                patient.update(time_step)
+            return
+        leaving_patients = []
         for patient in self.patients:
+            resource_demand = patient.get_resource_demand()
             patient.update(time_step)
+            # profiles' demand mappings are shared, so the demand changed only if the mapping is different
+            if patient.get_resource_demand() is not resource_demand:
+                self.change_patient_demand(patient, resource_demand, patient.get_resource_demand())
+            # patients can only leave when they are updated, so they are reported without scanning the patients again
+            if not(self.patient_in_component(patient)):
+                leaving_patients.append(patient)
+        if leaving_patients:
+            self.patient_router.report_leaving_patients(self, leaving_patients)
+
+    def report_leaving_patients(self, patients: list) -> None:
+        leaving_patients = [patient for patient in patients if not(self.patient_in_component(patient))]
+        if leaving_patients:
+            self.patient_router.report_leaving_patients(self, leaving_patients)
 
     def get_patients_that_move(self) -> list:
         patients_that_move = []
+        patients_that_stay = []
         for patient in self.patients:
-            if not(self.patient_in_component(patient)):
+            if self.patient_in_component(patient):
+                patients_that_stay.append(patient)
+            else:
                 patients_that_move.append(patient)
-        self.patients = [patient for patient in self.patients if patient not in patients_that_move]
+        self.patients = PatientList.PatientList(patients_that_stay)
+        return patients_that_move
+
+    def remove_patients(self, patients: list) -> list:
+        """
+        Remove the given patients from the component if they are no longer in it and return them in the order they are given.
+        Components report leaving patients in the order of their patients, so the order of the component's patients is kept.
+        """
+        # patients reported twice or still in the component are skipped
+        patients_that_move = list(dict.fromkeys(patient for patient in patients if patient in self.patients and not(self.patient_in_component(patient))))
+        for patient in patients_that_move:
+            self.patients.remove(patient)
+            if self.patient_router is not None:
+                self.remove_patient_demand(patient, patient.get_resource_demand())
         return patients_that_move
 
     def set_new_patients(self, patients_that_move: list):
         for patient in patients_that_move:
             if self.patient_in_component(patient):
-                self.patients.append(patient)
+                self.add_patient(patient)
+
+    def add_patient(self, patient: Patient.PatientType) -> None:
+        self.patients.append(patient)
+        if self.patient_router is not None:
+            self.add_patient_demand(patient, patient.get_resource_demand())
+        if self.patient_archive is not None:
+            self.patient_archive.archive_patient(patient)
 
     def patient_in_component(self, patient: Patient.PatientType) -> bool:
         return patient.get_current_department() == self.name
@@ -658,29 +837,91 @@ class PatientSource(HospitalComponent):
     Class to create patients.
     """
 
+    def __init__(self) -> None:
+        super().__init__()
+        # resource dynamics whose resources were changed at the last time step and are reset to 0 at the next one
+        self.resource_dynamics_to_reset = []
+        self.patient_arrival_time_steps = []
+
     def form(self, component_name: str, component_parameters: dict) -> None:
         super().form(component_name, component_parameters)
         self.set_patient_library(component_parameters['PatientLibrary'])
+        self.set_random_streams(RandomStreams.RandomStreams())
+
+    def set_random_streams(self, random_streams: RandomStreams.RandomStreams) -> None:
+        self.random_streams = random_streams
+        self.random_generators = {}
+
+    def get_random_generator(self, patient_type_name: str) -> np.random.Generator:
+        # each patient type arriving through the source has its own stream, so adding a patient type does not change the draws of the others
+        if patient_type_name not in self.random_generators:
+            self.random_generators[patient_type_name] = self.random_streams.get_generator(f'{self.name}/{patient_type_name}')
+        return self.random_generators[patient_type_name]
+
+    def set_random_keys(self, patient_type_name: str, patients: list) -> None:
+        if self.random_streams.is_seeded():
+            random_keys = RandomStreams.draw_random_keys(self.get_random_generator(patient_type_name), len(patients))
+            for patient, random_key in zip(patients, random_keys):
+                patient.set_random_key(int(random_key))
 
     def set_patient_library(self, patient_library_file: str) -> None:
         with open(patient_library_file, 'r') as file:
             self.patient_library = json.load(file)
+        self.compiled_patient_library = Patient.PatientLibrary(self.patient_library)
+
+    def get_patient_profile(self, patient_type_name: str) -> Patient.PatientProfile:
+        # profiles are built once and shared by all patients of the type
+        return self.compiled_patient_library.get_profile(patient_type_name)
     
     def update(self, time_step: int, system_consumption: float) -> None:
         pass
 
-    def get_resource_amount_based_on_time_step(self, resource_dynamic: dict, time_step: int) -> None:  
-        # This method is different for patient source, as setting patients based on resource dynamics works different than setting resource supply 
-        amount_id = [i for i, value in enumerate(resource_dynamic['AtTimeStep']) if value == time_step]
-        if len(amount_id) == 0:
-            return 0
-        else:
-            return resource_dynamic['Amount'][amount_id[0]]  
+    def compile_resource_dynamics(self, resource_dynamics: list) -> dict:
+        """
+        Override parent method: the number of patients is set by the last resource dynamic of a patient type and is 0 at time steps that are not listed.
+        Until the first time step, all patient types are reset to 0.
+        """
+        last_resource_dynamics = {}
+        for resource_dynamic in resource_dynamics:
+            last_resource_dynamics[(resource_dynamic['SupplyOrDemand'], resource_dynamic['SupplyOrDemandType'], resource_dynamic['Resource'])] = resource_dynamic
+        self.resource_dynamics_to_reset = list(last_resource_dynamics.values())
+        resource_dynamics_schedule = super().compile_resource_dynamics(self.resource_dynamics_to_reset)
+        self.patient_arrival_time_steps = sorted(time_step for time_step, resource_dynamics in resource_dynamics_schedule.items()
+                                                 if any(amount != 0 for _, amount in resource_dynamics))
+        return resource_dynamics_schedule
+
+    def get_next_resource_dynamics_time_step(self, time_step: int) -> float:
+        """
+        Override parent method: time steps without arriving patients do not change the source once the numbers of patients were reset to 0,
+        so the next time step at which patients arrive is returned.
+        """
+        if any(self.get_resource_to_change(resource_dynamic).initial_amount != 0 for resource_dynamic in self.resource_dynamics_to_reset):
+            return time_step + 1
+        time_step_id = bisect.bisect_right(self.patient_arrival_time_steps, time_step)
+        if time_step_id < len(self.patient_arrival_time_steps):
+            return self.patient_arrival_time_steps[time_step_id]
+        return math.inf
+
+    def update_resources_based_on_predefined_resource_dynamics(self, time_step: int) -> None:
+        """
+        Override parent method by setting the number of arriving patients instead of increasing it.
+        """
+        for resource_dynamic in self.resource_dynamics_to_reset:
+            self.get_resource_to_change(resource_dynamic).set_initial_amount(0)
+        self.resource_dynamics_to_reset = []
+        for resource_dynamic, amount in self.resource_dynamics_schedule.get(time_step, []):
+            self.get_resource_to_change(resource_dynamic).set_initial_amount(amount)
+            self.resource_dynamics_to_reset.append(resource_dynamic)
     
     def create_patients(self, time_step: int) -> None:
         self.update_resources_based_on_predefined_resource_dynamics(time_step)
         for patient_type_name, patient_group_parameters in self.demand['OperationDemand'].items():
-            patient = Patient.PatientType()
             number_of_patients = patient_group_parameters.initial_amount
-            patient.set_parameters(patient_type_name, self.patient_library[patient_type_name])
-            self.patients += [copy.deepcopy(patient) for _ in range(number_of_patients)]
+            patient_profile = self.get_patient_profile(patient_type_name)
+            new_patients = [Patient.PatientType(patient_profile) for _ in range(number_of_patients)]
+            self.set_random_keys(patient_type_name, new_patients)
+            self.patients += new_patients
+            if self.patient_router is not None:
+                for patient in new_patients:
+                    self.add_patient_demand(patient, patient.get_resource_demand())
+                self.report_leaving_patients(new_patients)
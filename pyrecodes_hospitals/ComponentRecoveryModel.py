@@ -77,6 +77,8 @@ class ConcreteRecoveryActivity(RecoveryActivity):
         self.demand_met = 1.0
         self.demand = {}
         self.preceding_activities_finished = False
+        # without a dedicated generator, durations are sampled from numpy's global random state
+        self.random_generator = None
 
     def set_name(self, name: str) -> None:
         self.name = name
@@ -88,6 +90,7 @@ class ConcreteRecoveryActivity(RecoveryActivity):
             raise ValueError(f'Level must be between 0 and 1. Recovery activity: {self.name}.')
 
     def set_duration(self, distribution: dict) -> None:
+        self.duration_distribution = distribution
         duration = self.sample_duration(distribution)
         self.duration = duration
         if duration > 0:            
@@ -100,9 +103,17 @@ class ConcreteRecoveryActivity(RecoveryActivity):
     def sample_duration(self, distribution: dict) -> float:
         distribution_name, distribution_parameters = list(distribution.items())[0]
         target_distribution = getattr(ProbabilityDistribution, distribution_name)
-        distribution = target_distribution(distribution_parameters)
+        distribution = target_distribution(distribution_parameters, self.random_generator)
         return distribution.sample()
 
+    def set_random_generator(self, random_generator) -> None:
+        """
+        Set the generator that durations are sampled from and sample the duration again, if it was set. Used before the recovery starts.
+        """
+        self.random_generator = random_generator
+        if hasattr(self, 'duration_distribution'):
+            self.set_duration(self.duration_distribution)
+
     def set_preceding_activities(self, preceding_activities: list([str])) -> None:
         self.preceding_activities = preceding_activities
 
@@ -176,6 +187,13 @@ class RecoveryModel(ABC):
     def set_unmet_demand_for_recovery_activities(self, resource_name: str, percent_of_met_demand: float) -> None:
         pass
 
+    def set_random_generator(self, random_generator) -> None:
+        """
+        Set the generator that the durations of recovery activities are sampled from.
+        """
+        for recovery_activity in self.recovery_activities.values():
+            recovery_activity.set_random_generator(random_generator)
+
 
 class NoRecoveryActivity(RecoveryModel):
     """
@@ -250,6 +268,9 @@ class SingleRecoveryActivity(RecoveryModel):
     def recover(self, time_step: int) -> None:
         self.recovery_activity.recover(time_step)
 
+    def set_random_generator(self, random_generator) -> None:
+        self.recovery_activity.set_random_generator(random_generator)
+
     def get_functionality_level(self) -> float:
         return self.damage_to_functionality_relation.get_output(self.get_damage_level())
 
@@ -387,6 +408,9 @@ class InfrastructureInterfaceRecoveryModel(RecoveryModel):
     def recover(self, time_step: int) -> None:
         self.recovery_activity.recover(time_step)
 
+    def set_random_generator(self, random_generator) -> None:
+        self.recovery_activity.set_random_generator(random_generator)
+
     def get_functionality_level(self) -> float:
         return self.damage_to_functionality_relation.get_output(1 - self.get_damage_level())
     
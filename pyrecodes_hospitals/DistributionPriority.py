@@ -17,6 +17,12 @@ class DistributionPriority(ABC):
     def get_component_priorities(self) -> list([int]):
         pass
 
+    def set_random_generator(self, random_generator) -> None:
+        """
+        Set the generator of random priorities. Priorities that are not random do not use it.
+        """
+        pass
+
 class ComponentTypeBasedPriority(DistributionPriority):
     """
     Components are prioritized based on their type (i.e., name). Components higher in the system's component list are prioritized among same type components.
@@ -81,10 +87,18 @@ class RandomPriority(DistributionPriority):
     def __init__(self, resource_name: str, parameters: dict, components: list([Component.Component])):
         self.resource_name = resource_name
         self.components = components
-        self.set_distribution_priority(parameters)
+        self.parameters = parameters
+        # use an own generator instead of seeding the global one, so that other stochastic subsystems are not affected
+        self.set_random_generator(random.Random(parameters['Seed']))
+
+    def set_random_generator(self, random_generator) -> None:
+        """
+        Override parent method by shuffling components again with the new generator, e.g., the replication's stream.
+        """
+        self.random_generator = random_generator
+        self.set_distribution_priority(self.parameters)
 
     def set_distribution_priority(self, parameters: dict) -> None:
-        random.seed(parameters['Seed'])
         component_ids = list(range(len(self.components)))
         supplier_ids, nonsupplier_ids = self.get_suppliers_id(component_ids)
         supplier_ids_randomized, supplier_demand_types = self.randomize_ids(supplier_ids,
@@ -109,7 +123,7 @@ class RandomPriority(DistributionPriority):
         randomized_priorities = []
         randomized_demand_types = []
         for demand_type in demand_types:
-            random.shuffle(component_ids)
+            self.random_generator.shuffle(component_ids)
             randomized_priorities += copy.deepcopy(component_ids)
             randomized_demand_types += [demand_type for _ in component_ids]
         return randomized_priorities, randomized_demand_types
@@ -128,8 +142,7 @@ class RandomPriorityWithPrioritizedInterfaces(RandomPriority):
         component_ids = list(range(len(self.components)))
         suppliers_ids, remaining_components_id = self.get_suppliers_id(component_ids)
         interface_ids, remaining_components_id = self.get_infrastructure_interface_id(remaining_components_id)
-        random.seed(parameters['Seed'])
-        random.shuffle(suppliers_ids)
+        self.random_generator.shuffle(suppliers_ids)
         supplier_demand_types = [Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value for _ in
                                  suppliers_ids]
         interface_demand_types = [Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value for _ in
@@ -137,7 +150,7 @@ class RandomPriorityWithPrioritizedInterfaces(RandomPriority):
         random_priorities = []
         random_demand_types = []
         for demand_type in parameters['DemandType']:
-            random.shuffle(remaining_components_id)
+            self.random_generator.shuffle(remaining_components_id)
             random_priorities += copy.deepcopy(remaining_components_id)
             random_demand_types = [demand_type for _ in remaining_components_id]
 
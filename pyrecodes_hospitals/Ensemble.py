@@ -0,0 +1,123 @@
+import math
+import pickle
+import numpy as np
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+from pyrecodes_hospitals import System
+from pyrecodes_hospitals import ResilienceCalculator
+from pyrecodes_hospitals import RandomStreams
+
+_SYSTEM_TEMPLATE = None
+_RANDOM_STREAMS = None
+
+def set_system_template(pickled_system: bytes, seed: int) -> None:
+    """
+    Store the pickled system and the root seed in the worker process. Called once per worker by the process pool.
+    """
+    global _SYSTEM_TEMPLATE, _RANDOM_STREAMS
+    _SYSTEM_TEMPLATE = pickled_system
+    _RANDOM_STREAMS = RandomStreams.RandomStreams(seed)
+
+def run_replication(replication_id: int) -> list:
+    """
+    Run one replication on a fresh copy of the system template and return the resilience calculator outputs.
+    Random streams depend only on the root seed and the replication id, not on the worker that runs the replication.
+    """
+    system = pickle.loads(_SYSTEM_TEMPLATE)
+    system.set_random_streams(_RANDOM_STREAMS.for_replication(replication_id))
+    system.start_resilience_assessment()
+    return system.calculate_resilience()
+
+
+class EnsembleRunner():
+    """
+    Class to run a Monte Carlo ensemble of resilience assessments of the same system.
+
+    The system is created once, pickled and sent to each worker process once.
+    Every replication then runs on an unpickled copy of the system, so replications do not share any state.
+    If no seed is provided, the seed defined in the system configuration is used and, if that is not defined either, a new root seed is drawn.
+    """
+
+    def __init__(self, system: System.System, number_of_replications: int, number_of_workers=1, seed=None) -> None:
+        self.system = system
+        self.number_of_replications = number_of_replications
+        self.number_of_workers = number_of_workers
+        self.set_seed(seed)
+
+    def set_seed(self, seed: int) -> None:
+        if seed is None:
+            seed = self.system.random_streams.seed
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+
+    def run(self) -> 'EnsembleResult':
+        pickled_system = pickle.dumps(self.system)
+        replication_ids = range(self.number_of_replications)
+        if self.number_of_workers == 1:
+            set_system_template(pickled_system, self.seed)
+            replication_outputs = [run_replication(replication_id) for replication_id in replication_ids]
+        else:
+            with ProcessPoolExecutor(max_workers=self.number_of_workers, initializer=set_system_template, initargs=(pickled_system, self.seed)) as executor:
+                replication_outputs = list(executor.map(run_replication, replication_ids, chunksize=self.get_chunksize()))
+        return EnsembleResult(self.system.resilience_calculators, replication_outputs, self.seed)
+
+    def get_chunksize(self) -> int:
+        return max(1, self.number_of_replications // (4 * self.number_of_workers))
+
+
+class EnsembleResult():
+    """
+    Class to aggregate the resilience calculator outputs of all replications in an ensemble.
+
+    Numeric outputs are summarized by their mean, standard deviation and confidence interval of the mean.
+    """
+
+    CONFIDENCE_LEVEL = 0.95
+    SUMMARIZED_CALCULATORS = (ResilienceCalculator.ReCoDeSResilienceCalculator, ResilienceCalculator.HospitalMeasureOfServiceCalculator)
+
+    def __init__(self, resilience_calculators: list, replication_outputs: list, seed=None) -> None:
+        self.resilience_calculators = resilience_calculators
+        self.replication_outputs = replication_outputs
+        self.number_of_replications = len(replication_outputs)
+        self.seed = seed
+
+    def summarize(self) -> list:
+        """
+        Return one entry per resilience calculator, in the order of the system's resilience calculators.
+        Each entry contains the calculator type, scope and resources, and the summary of its outputs.
+        """
+        summary = []
+        for calculator_id, resilience_calculator in enumerate(self.resilience_calculators):
+            if not isinstance(resilience_calculator, self.SUMMARIZED_CALCULATORS):
+                continue
+            outputs = [replication_output[calculator_id] for replication_output in self.replication_outputs]
+            summary.append({'ResilienceCalculator': type(resilience_calculator).__name__,
+                            'Scope': resilience_calculator.scope,
+                            'Resources': resilience_calculator.resources,
+                            'Summary': self.summarize_outputs(outputs)})
+        return summary
+
+    def summarize_outputs(self, outputs: list):
+        if isinstance(outputs[0], dict):
+            keys = []
+            for output in outputs:
+                keys += [key for key in output.keys() if key not in keys]
+            return {key: self.summarize_outputs([output.get(key, 0) for output in outputs]) for key in keys}
+        else:
+            return self.summarize_values(outputs)
+
+    def summarize_values(self, values: list) -> dict:
+        values = np.asarray(values, dtype=float)
+        mean = np.mean(values)
+        if len(values) > 1:
+            std = np.std(values, ddof=1)
+            half_width = stats.t.ppf(0.5 + self.CONFIDENCE_LEVEL / 2, len(values) - 1) * std / math.sqrt(len(values))
+        else:
+            std = 0.0
+            half_width = 0.0
+        return {'Mean': float(mean),
+                'Std': float(std),
+                'ConfidenceInterval': [float(mean - half_width), float(mean + half_width)],
+                'Min': float(np.min(values)),
+                'Max': float(np.max(values))}
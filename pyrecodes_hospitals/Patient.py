@@ -1,76 +1,173 @@
-import random
+from types import MappingProxyType
+from pyrecodes_hospitals import RandomStreams
 
-class PatientType():
+class PatientProfile():
     """
-    Class to represent a patient type that goes through the hospital and consumes resources.
+    Class to represent the data of a patient type that is the same for all patients of the type.
+
+    A profile is built once from the patient library and shared by all patients of the type, so it must not be changed.
+    Baseline mortality rates and lengths of stay are tuples and resource demand and consequences of unmet demand per department are read-only mappings.
+    Copying a profile returns the profile itself.
     """
 
-    EXIT = 'EXIT'
-    STRETCHER_NAME = 'Stretcher'
     ONE_TIME_CONSUMABLES = ['Stretcher', 'MCI_Kit_NonWalking_EmergencyDepartment', 
                             'MCI_Kit_NonWalking_OperatingTheater', 'MCI_Kit_NonWalking_HighDependencyUnit',
                             'MCI_Kit_NonWalking_Medical/SurgicalDepartment', 'MCI_Kit_NonWalking_RestOfHospital',
                             'MCI_Kit_Walking_RestOfHospital', 'Blood']
+    # last element is for patients that do not have a triage category
+    TRIAGE_CATEGORIES = ['Red', 'Yellow', 'Green', 'Rest']
 
-    def set_parameters(self, patient_type_name, patient_type_parameters: list) -> None:
+    def __init__(self, patient_type_name: str, patient_type_parameters: list) -> None:
         self.name = patient_type_name
+        self.parameters = patient_type_parameters
+        self.triage_category = self.find_triage_category(patient_type_name, self.TRIAGE_CATEGORIES)
+        self.departments = [list(department_dict.keys())[0] for department_dict in patient_type_parameters]
+        self.mortality_rates = tuple(list(department_dict.values())[0]['BaselineMortalityRate'] for department_dict in patient_type_parameters)
+        self.lengths_of_stay = tuple(list(department_dict.values())[0]['BaselineLengthOfStay'] for department_dict in patient_type_parameters)
         self.set_demand(patient_type_parameters)
-        self.set_departments(patient_type_parameters)
-        self.set_mortality_rates(patient_type_parameters)
-        self.set_lengths_of_stay(patient_type_parameters)
-        self.flow = []        
-        self.treated = False
-        self.alive = True
-        self.unmet_demand_info = {}
-        self.mortality_rate_record = []
-        self.set_initial_department()     
-    
-    def set_initial_department(self) -> None:
-        self.flow.append({'Department': self.departments[0],
-                         'TimeStepAtDepartment': [],
-                         'TimeStepTreated': []})
-        
+
     def set_demand(self, parameters: list) -> None:
         self.demand = []
-        self.demand_met = []
+        self.demand_after_first_time_step = []
         self.consequences_of_unmet_demand = []
         for department_dict in parameters:
             department_parameters = list(department_dict.values())[0]
             current_department_demand = {}
-            current_department_demand_met = {}
             current_department_consequences = {}
             for resource_dict in department_parameters['ResourcesRequired']: 
                 current_department_demand[resource_dict['ResourceName']] = resource_dict['ResourceAmount']
-                current_department_demand_met[resource_dict['ResourceName']] = 1.0
                 current_department_consequences[resource_dict['ResourceName']] = resource_dict['ConsequencesOfUnmetDemand']
-            self.demand.append(current_department_demand)
-            self.demand_met.append(current_department_demand_met)
-            self.consequences_of_unmet_demand.append(current_department_consequences)
+            # Stretchers are only needed in the first time step of the patient's stay at the department.
+            # Other consumables (MCI kits, blood) are also only consumed once.
+            demand_after_first_time_step = {resource_name: 0.0 if resource_name in self.ONE_TIME_CONSUMABLES else amount for resource_name, amount in current_department_demand.items()}
+            self.demand.append(MappingProxyType(current_department_demand))
+            self.demand_after_first_time_step.append(MappingProxyType(demand_after_first_time_step))
+            self.consequences_of_unmet_demand.append(MappingProxyType(current_department_consequences))
+
+    @staticmethod
+    def find_triage_category(patient_type_name: str, triage_categories: list) -> str:
+        # the triage category is the first category that is part of the patient type name
+        for triage_category in triage_categories:
+            if triage_category in patient_type_name:
+                return triage_category
+        return triage_categories[-1]
+
+    def __copy__(self) -> 'PatientProfile':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'PatientProfile':
+        return self
+
+    def __reduce__(self) -> tuple:
+        # read-only mappings cannot be pickled, so the profile is rebuilt from the patient library parameters
+        return (PatientProfile, (self.name, self.parameters))
+
+class PatientLibrary():
+    """
+    Class to compile the patient library into patient profiles, built once per patient type.
+
+    Values that resilience calculators derive from profiles are kept in tables of the library, so profiles are not changed.
+    Baseline mortality rates are keyed by the profile name, the scope and the mortality calculation method.
+    """
+
+    def __init__(self, parameters: dict) -> None:
+        self.parameters = parameters
+        self.profiles = {}
+        self.baseline_mortality_rates = {}
+
+    def get_profile(self, patient_type_name: str) -> PatientProfile:
+        if patient_type_name not in self.profiles:
+            self.profiles[patient_type_name] = PatientProfile(patient_type_name, self.parameters[patient_type_name])
+        return self.profiles[patient_type_name]
+
+class PatientType():
+    """
+    Class to represent a patient type that goes through the hospital and consumes resources.
 
-    def set_departments(self, parameters: list):
-        self.departments = [list(department_dict.keys())[0] for department_dict in parameters]
+    Data that is the same for all patients of the type is in the shared patient profile.
+    A patient only stores its own state.
+    """
+
+    EXIT = 'EXIT'
+    STRETCHER_NAME = 'Stretcher'
+    NO_DEMAND = MappingProxyType({})
+    ONE_TIME_CONSUMABLES = PatientProfile.ONE_TIME_CONSUMABLES
+
+    __slots__ = ('profile', 'flow', 'treated', 'alive', 'unmet_demand_info', 'mortality_rate_record',
+                 'mortality_rate', 'length_of_stay', 'random_key', '_demand_met')
+
+    def __init__(self, profile=None) -> None:
+        # key of the patient's own random stream, None means that the legacy deterministic death draw is used
+        self.random_key = None
+        if profile is not None:
+            self.set_profile(profile)
+
+    def set_parameters(self, patient_type_name, patient_type_parameters: list) -> None:
+        self.set_profile(PatientProfile(patient_type_name, patient_type_parameters))
+
+    def set_profile(self, profile: PatientProfile) -> None:
+        self.profile = profile
+        self.flow = []        
+        self.treated = False
+        self.alive = True
+        self.unmet_demand_info = {}
+        self.mortality_rate_record = []
+        # demand met per department is only created once some demand is not met
+        self._demand_met = None
+        self.set_initial_department()     
     
-    def set_mortality_rates(self, parameters: list):
-        self.mortality_rates = [list(department_dict.values())[0]['BaselineMortalityRate'] for department_dict in parameters]
+    def set_initial_department(self) -> None:
+        self.flow.append({'Department': self.departments[0],
+                         'TimeStepAtDepartment': [],
+                         'TimeStepTreated': []})
+
+    @property
+    def name(self) -> str:
+        return self.profile.name
+
+    @property
+    def departments(self) -> list:
+        return self.profile.departments
+
+    @property
+    def triage_category(self) -> str:
+        return self.profile.triage_category
+
+    @property
+    def mortality_rates(self) -> list:
+        return self.profile.mortality_rates
+
+    @property
+    def lengths_of_stay(self) -> list:
+        return self.profile.lengths_of_stay
 
-    def set_lengths_of_stay(self, parameters: list):
-        self.lengths_of_stay = [list(department_dict.values())[0]['BaselineLengthOfStay'] for department_dict in parameters]
+    @property
+    def consequences_of_unmet_demand(self) -> list:
+        return self.profile.consequences_of_unmet_demand
+
+    @property
+    def demand(self) -> list:
+        # one-time consumables are not demanded anymore at departments where the patient already spent a time step
+        current_department_id = self.get_current_department_id()
+        current_department_started = self.get_current_length_of_stay() > 0
+        return [self.profile.demand_after_first_time_step[department_id] if department_id < current_department_id or (department_id == current_department_id and current_department_started) 
+                else department_demand for department_id, department_demand in enumerate(self.profile.demand)]
+
+    @property
+    def demand_met(self) -> list:
+        if self._demand_met is None:
+            self._demand_met = [{resource_name: 1.0 for resource_name in department_demand} for department_demand in self.profile.demand]
+        return self._demand_met
     
     def get_resource_demand(self) -> dict:
-        if not(self.out_of_hospital()):
-            self.update_consumable_demand()
-            return self.demand[self.get_current_department_id()]
+        # called for every patient at every time step, so the current department is read only once
+        current_department = self.flow[-1]
+        if current_department['Department'] == self.EXIT:
+            return self.NO_DEMAND
+        elif len(current_department['TimeStepAtDepartment']) > 0:
+            return self.profile.demand_after_first_time_step[len(self.flow)-1]
         else:
-            return {}
-    
-    def update_consumable_demand(self) -> None:
-        # Stretchers are only needed in the first time step of the patient's stay at the department.
-        # Other consumables (MCI kits, blood) are also only consumed once.
-        # If the patient is already at the department, then the patient has already been transferred to a bed and does not a stretcher.        
-        if self.get_current_length_of_stay() > 0:
-            for resource_name in self.demand[self.get_current_department_id()].keys():
-                if resource_name in self.ONE_TIME_CONSUMABLES:
-                    self.demand[self.get_current_department_id()][resource_name] = 0.0
+            return self.profile.demand[len(self.flow)-1]
     
     def get_current_department(self) -> str:
         return self.flow[-1]['Department']
@@ -157,7 +254,11 @@ class PatientType():
     
     def update_patient_when_nurses_missing(self, resource_name: str, consequence_value: float, demand_met: float, parameter_to_update: float) -> None:
         # self.patient_not_treated() # too conservative to assume that if a single nurse is missing, the patient is not treated, the patient is treated but with increased mortality rate/length of stay
-        nurse_demand = self.demand[self.get_current_department_id()][resource_name]
+        # demand when resources were distributed, i.e., before the current time step was added to the stay
+        if self.get_current_length_of_stay() > 1:
+            nurse_demand = self.profile.demand_after_first_time_step[self.get_current_department_id()][resource_name]
+        else:
+            nurse_demand = self.profile.demand[self.get_current_department_id()][resource_name]
         if nurse_demand > 1:
             number_of_missing_nurses = nurse_demand * (1-demand_met)           
         else:            
@@ -176,11 +277,20 @@ class PatientType():
         else:
             self.unmet_demand_info[resource_name] = [time_step]        
 
+    def set_random_key(self, random_key: int) -> None:
+        self.random_key = random_key
+
+    def draw_uniform(self) -> float:
+        if self.random_key is None:
+            return RandomStreams.LEGACY_UNIFORM_DRAW
+        else:
+            # one draw per time step in the hospital, so the number of recorded mortality rates is the position in the stream
+            return RandomStreams.uniform_from_key(self.random_key, len(self.mortality_rate_record))
+
     def check_if_alive(self) -> None:
-        random.seed(1)
         # check if patient is alive at each time step
         # by sampling from a uniform distribution and comparing to the mortality rate
-        if random.random() < self.mortality_rate:
+        if self.draw_uniform() < self.mortality_rate:
             self.alive = False
             self.flow.append({'Department': self.EXIT,
                         'TimeStepAtDepartment': [],
@@ -196,6 +306,8 @@ class PatientType():
         return self.get_current_length_of_stay() >= self.length_of_stay
     
     def resource_demand_met(self) -> bool: 
+        if self._demand_met is None:
+            return True
         return all([demand_met == 1.0 for demand_met in self.demand_met[self.get_current_department_id()].values()])
     
     def update_resource_demand_met(self, resource_name: str, demand_met: float) -> None:
@@ -203,6 +315,8 @@ class PatientType():
             self.demand_met[self.get_current_department_id()][resource_name] = demand_met
 
     def set_all_demand_as_met(self) -> None:
+        if self._demand_met is None:
+            return
         for resource_name in self.demand_met[self.get_current_department_id()].keys():
             self.demand_met[self.get_current_department_id()][resource_name] = 1.0
 
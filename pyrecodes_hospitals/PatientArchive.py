@@ -0,0 +1,50 @@
+class PatientArchive():
+    """
+    Append-only store of patients that exited the hospital, either discharged or dead.
+
+    Archived patients are frozen: they are only updated at the first time step they spend at EXIT,
+    and their stay at EXIT is completed up to the last time step on request.
+    The number of exited and dead patients per patient type is kept, so that resilience calculators
+    that are updated at each time step do not iterate over archived patients.
+    Measures of service of archived patients are summed per patient type by resilience calculators and kept here,
+    so calculators with the same scope calculate them once per patient.
+    """
+
+    def __init__(self) -> None:
+        self.patients = []
+        # position in time_steps from which a patient's stay at EXIT is not recorded yet
+        self.first_missing_time_step = []
+        self.time_steps = []
+        self.number_of_updated_patients = 0
+        self.number_of_completed_time_steps = 0
+        self.exited_patients = {}
+        self.dead_patients = {}
+        # sums of measures of service per patient type, by scope of the resilience calculators
+        self.patient_measures = {}
+
+    def archive_patient(self, patient) -> None:
+        self.patients.append(patient)
+        self.first_missing_time_step.append(len(self.time_steps))
+        self.exited_patients[patient.name] = self.exited_patients.get(patient.name, 0) + 1
+        if patient.alive == False:
+            self.dead_patients[patient.name] = self.dead_patients.get(patient.name, 0) + 1
+
+    def update(self, time_step: int) -> None:
+        self.time_steps.append(time_step)
+        for patient_id in range(self.number_of_updated_patients, len(self.patients)):
+            self.patients[patient_id].update(time_step)
+            self.first_missing_time_step[patient_id] = len(self.time_steps)
+        self.number_of_updated_patients = len(self.patients)
+
+    def complete_stays(self) -> None:
+        """
+        Record the time steps at EXIT that archived patients skipped, as if they were updated at each time step.
+        """
+        if self.number_of_completed_time_steps == len(self.time_steps):
+            return
+        for patient_id, patient in enumerate(self.patients[:self.number_of_updated_patients]):
+            missing_time_steps = self.time_steps[self.first_missing_time_step[patient_id]:]
+            patient.flow[-1]['TimeStepAtDepartment'] += missing_time_steps
+            patient.flow[-1]['TimeStepTreated'] += missing_time_steps
+            self.first_missing_time_step[patient_id] = len(self.time_steps)
+        self.number_of_completed_time_steps = len(self.time_steps)
@@ -0,0 +1,45 @@
+class PatientList():
+    """
+    Class to keep the patients of a component in order of arrival.
+
+    Patients are stored as keys of an insertion-ordered dictionary, so a patient that leaves the component
+    is removed in constant time without rebuilding the list, while the patients keep their first-come first-served order.
+    """
+
+    def __init__(self, patients=()) -> None:
+        self.patients = dict.fromkeys(patients)
+
+    def __iter__(self):
+        return iter(self.patients)
+
+    def __len__(self) -> int:
+        return len(self.patients)
+
+    def __contains__(self, patient) -> bool:
+        return patient in self.patients
+
+    def __getitem__(self, index):
+        # indexing walks the patients and is meant for inspecting results, not for the simulation loop
+        return list(self.patients)[index]
+
+    def __eq__(self, other) -> bool:
+        try:
+            return list(self.patients) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __iadd__(self, patients):
+        self.extend(patients)
+        return self
+
+    def __repr__(self) -> str:
+        return f'PatientList({list(self.patients)})'
+
+    def append(self, patient) -> None:
+        self.patients[patient] = None
+
+    def extend(self, patients) -> None:
+        self.patients.update(dict.fromkeys(patients))
+
+    def remove(self, patient) -> None:
+        del self.patients[patient]
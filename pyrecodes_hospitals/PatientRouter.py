@@ -0,0 +1,43 @@
+from pyrecodes_hospitals import Component
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientArchive
+
+
+class PatientRouter():
+    """
+    Class to move patients between hospital departments.
+
+    Components report the patients that leave them when they are created or updated. When patients are received,
+    only the reported patients are removed from their components and appended to the component of their current department,
+    so a transfer does not scan all patients in the hospital. Patients that reach the EXIT component are archived.
+    """
+
+    def __init__(self, components: list) -> None:
+        self.components = components
+        # patients are added to the first component with the name of their current department, patients without one leave the system
+        self.departments = {}
+        for component in components:
+            if isinstance(component, Component.HospitalComponent):
+                self.departments.setdefault(component.name, component)
+                component.patient_router = self
+                component.initialize_patient_demand()
+        self.leaving_patients = {}
+        self.patient_archive = None
+        if Patient.PatientType.EXIT in self.departments:
+            self.patient_archive = PatientArchive.PatientArchive()
+            self.departments[Patient.PatientType.EXIT].patient_archive = self.patient_archive
+
+    def report_leaving_patients(self, component: Component.HospitalComponent, patients: list) -> None:
+        self.leaving_patients.setdefault(component.name, []).extend(patients)
+
+    def move_patients(self) -> None:
+        # movers are collected in component order and in the order of the component's patients, as when all components are scanned
+        patients_to_move = []
+        for component in self.components:
+            leaving_patients = self.leaving_patients.pop(component.name, None)
+            if leaving_patients:
+                patients_to_move += component.remove_patients(leaving_patients)
+        for patient in patients_to_move:
+            department = self.departments.get(patient.get_current_department())
+            if department is not None:
+                department.add_patient(patient)
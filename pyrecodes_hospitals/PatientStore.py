@@ -0,0 +1,765 @@
+import copy
+import numpy as np
+from pyrecodes_hospitals import Component
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientList
+from pyrecodes_hospitals import RandomStreams
+
+
+class PatientProfileTable():
+    """
+    Class to compile the patient library into arrays indexed by patient profile, department of the profile and resource.
+
+    A key identifies one department of one patient profile. Demand, baseline mortality rate, baseline length of stay and
+    consequences of unmet demand are stored per key, so that they can be gathered for many patients at once.
+    """
+
+    EXIT = Patient.PatientType.EXIT
+    CONSEQUENCE_TYPES = ['Mortality Rate Increase [per missing nurse]', 'Length Of Stay Extended [per missing nurse]',
+                         'Mortality Rate Increase', 'Length Of Stay Extended', 'Death In [hours]', 'None']
+
+    def __init__(self, department_names: list) -> None:
+        self.profile_names = []
+        self.profile_ids = {}
+        self.profile_parameters = []
+        self.department_names = [self.EXIT]
+        self.department_ids = {self.EXIT: 0}
+        for department_name in department_names:
+            self.get_department_id(department_name)
+        self.resource_names = []
+        self.resource_ids = {}
+        self.key_profile = []
+        self.key_demand = []
+        self.key_mortality_rate = []
+        self.key_length_of_stay = []
+        self.key_consequences = []
+        self.profile_keys = []
+        self.profile_departments = []
+        self.build_arrays()
+
+    def get_department_id(self, department_name: str) -> int:
+        if department_name not in self.department_ids:
+            self.department_ids[department_name] = len(self.department_names)
+            self.department_names.append(department_name)
+        return self.department_ids[department_name]
+
+    def get_resource_id(self, resource_name: str) -> int:
+        if resource_name not in self.resource_ids:
+            self.resource_ids[resource_name] = len(self.resource_names)
+            self.resource_names.append(resource_name)
+        return self.resource_ids[resource_name]
+
+    def get_profile_id(self, profile_name: str, profile_parameters: list) -> int:
+        if profile_name not in self.profile_ids:
+            self.add_profile(profile_name, profile_parameters)
+        return self.profile_ids[profile_name]
+
+    def add_profile(self, profile_name: str, profile_parameters: list) -> None:
+        self.profile_ids[profile_name] = len(self.profile_names)
+        self.profile_names.append(profile_name)
+        self.profile_parameters.append(profile_parameters)
+        keys = []
+        departments = []
+        for department_dict in profile_parameters:
+            department_name, department_parameters = list(department_dict.items())[0]
+            departments.append(self.get_department_id(department_name))
+            keys.append(len(self.key_profile))
+            self.key_profile.append(self.profile_ids[profile_name])
+            self.key_mortality_rate.append(department_parameters['BaselineMortalityRate'])
+            self.key_length_of_stay.append(department_parameters['BaselineLengthOfStay'])
+            demand = {}
+            consequences = {}
+            for resource_dict in department_parameters['ResourcesRequired']:
+                resource_id = self.get_resource_id(resource_dict['ResourceName'])
+                demand[resource_id] = resource_dict['ResourceAmount']
+                consequences[resource_id] = [self.compile_consequence(consequence) for consequence in resource_dict['ConsequencesOfUnmetDemand']]
+            self.key_demand.append(demand)
+            self.key_consequences.append(list(consequences.items()))
+        self.profile_keys.append(keys)
+        self.profile_departments.append(departments)
+        self.build_arrays()
+
+    def compile_consequence(self, consequence: dict) -> tuple:
+        consequence_name, consequence_value = list(consequence.items())[0]
+        if consequence_name in self.CONSEQUENCE_TYPES:
+            return self.CONSEQUENCE_TYPES.index(consequence_name), consequence_value
+        else:
+            return consequence_name, consequence_value
+
+    def build_arrays(self) -> None:
+        number_of_keys = len(self.key_profile)
+        number_of_resources = len(self.resource_names)
+        self.demand = np.zeros((number_of_keys, number_of_resources))
+        self.has_resource = np.zeros((number_of_keys, number_of_resources), dtype=bool)
+        for key, demand in enumerate(self.key_demand):
+            for resource_id, amount in demand.items():
+                self.demand[key, resource_id] = amount
+                self.has_resource[key, resource_id] = True
+        self.mortality_rate = np.asarray(self.key_mortality_rate, dtype=float)
+        self.length_of_stay = np.asarray(self.key_length_of_stay, dtype=float)
+        self.one_time_consumable = np.asarray([resource_name in Patient.PatientType.ONE_TIME_CONSUMABLES for resource_name in self.resource_names], dtype=bool)
+        # keys and departments along each profile's flow, with invalid keys (-1) and EXIT after the last department
+        width = max([len(keys) for keys in self.profile_keys], default=0) + 2
+        self.keys_along_flow = np.full((len(self.profile_keys), width), -1, dtype=np.int64)
+        self.departments_along_flow = np.full((len(self.profile_keys), width), self.department_ids[self.EXIT], dtype=np.int64)
+        for profile_id, (keys, departments) in enumerate(zip(self.profile_keys, self.profile_departments)):
+            self.keys_along_flow[profile_id, :len(keys)] = keys
+            self.departments_along_flow[profile_id, :len(departments)] = departments
+
+    def get_keys(self, profiles: np.ndarray, department_positions: np.ndarray) -> np.ndarray:
+        return self.keys_along_flow[profiles, np.minimum(department_positions, self.keys_along_flow.shape[1] - 1)]
+
+    def get_departments(self, profiles: np.ndarray, department_positions: np.ndarray) -> np.ndarray:
+        return self.departments_along_flow[profiles, np.minimum(department_positions, self.departments_along_flow.shape[1] - 1)]
+
+
+class PatientLog():
+    """
+    Class to log columns of patient rows, e.g., departments patients left or their mortality rates, in the order of logging.
+
+    Each entry holds one array per column with a record per row. Entries are compacted into a single array per column
+    once COMPACTION_THRESHOLD entries are pending, and compacted entries are merged once there are COMPACTION_THRESHOLD of them,
+    so long simulations do not keep a growing number of small arrays.
+    The position of a record in the log is the number of records logged before it and does not change when compacting.
+    """
+
+    COMPACTION_THRESHOLD = 256
+
+    def __init__(self) -> None:
+        self.compacted_entries = []
+        self.pending_entries = []
+        self.length = 0
+
+    def append(self, entry: tuple) -> None:
+        self.pending_entries.append(entry)
+        self.length += len(entry[0])
+        if len(self.pending_entries) >= self.COMPACTION_THRESHOLD:
+            self.compact()
+
+    def compact(self) -> None:
+        if len(self.pending_entries) > 0:
+            self.compacted_entries.append(self.concatenate(self.pending_entries))
+            self.pending_entries = []
+        if len(self.compacted_entries) >= self.COMPACTION_THRESHOLD:
+            self.compacted_entries = [self.concatenate(self.compacted_entries)]
+
+    def get_columns(self) -> tuple:
+        return self.concatenate(self.compacted_entries + self.pending_entries)
+
+    def concatenate(self, entries: list) -> tuple:
+        return tuple(np.concatenate(column) for column in zip(*entries))
+
+
+class PatientArrayStore():
+    """
+    Class to store all patients of a hospital system in NumPy columns (struct of arrays) instead of PatientType objects.
+
+    Patient arrival, transfers between departments, resource demand, distribution of unmet demand and the per time step
+    update of patients are vectorized over all patients. The store reproduces the object model (PatientType) step by step,
+    so the outputs of the resilience calculators are the same.
+    Patient objects are only created when components' patient lists are synchronized, e.g., before measures of service are calculated.
+
+    Patients are ordered in departments by the sequence number they get when they enter the department,
+    which reproduces the first-come first-served order of the components' patient lists.
+    """
+
+    INITIAL_CAPACITY = 1024
+    NOT_LOCATED = -1
+
+    def __init__(self, components: list) -> None:
+        self.components = components
+        self.profiles = PatientProfileTable([component.name for component in components])
+        self.set_component_links()
+        self.number_of_patients = 0
+        self.next_sequence_number = 0
+        self.allocate_columns(self.INITIAL_CAPACITY, number_of_resources=0)
+        self.flow_log = PatientLog()
+        self.mortality_rate_log = PatientLog()
+        self.unmet_demand_log = PatientLog()
+        self.department_demand_cache = {}
+
+    def __getstate__(self) -> dict:
+        # only the rows of patients are pickled, the columns are reallocated to the capacity when unpickled
+        state = self.__dict__.copy()
+        patient_columns = self.get_patient_columns()
+        for name, column in patient_columns.items():
+            state[name] = column[:self.number_of_patients].copy()
+        state['number_of_resources'] = self.demand_met.shape[1]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        number_of_resources = state.pop('number_of_resources')
+        patient_columns = {name: state[name] for name in state['patient_column_names']}
+        self.__dict__.update(state)
+        self.allocate_columns(self.capacity, number_of_resources)
+        self.set_patient_rows(patient_columns)
+
+    def set_component_links(self) -> None:
+        self.component_ids = {}
+        for component_id, component in enumerate(self.components):
+            self.component_ids[component.name] = component_id
+            if isinstance(component, Component.HospitalComponent):
+                component.patient_store = self
+
+    def get_component_id_of_department(self, department_ids: np.ndarray) -> np.ndarray:
+        department_to_component = np.asarray([self.component_ids.get(department_name, self.NOT_LOCATED) for department_name in self.profiles.department_names], dtype=np.int64)
+        return department_to_component[department_ids]
+
+    def allocate_columns(self, capacity: int, number_of_resources: int) -> None:
+        self.capacity = capacity
+        # columns with one entry per row, copied when columns are resized, rows are split or the store is pickled
+        self.patient_column_names = ['profile', 'location', 'sequence_number', 'department', 'flow_length', 'time_in_department',
+                                     'treated_count', 'entry_time_step', 'treated', 'alive', 'count', 'updated', 'mortality_rate',
+                                     'length_of_stay', 'has_random_key', 'random_key', 'draw_counter',
+                                     'demand_met', 'unmet_demand_count', 'unmet_demand_run', 'last_unmet_demand_time_step']
+        self.profile = np.zeros(capacity, dtype=np.int64)
+        self.location = np.full(capacity, self.NOT_LOCATED, dtype=np.int64)
+        self.sequence_number = np.zeros(capacity, dtype=np.int64)
+        self.department = np.zeros(capacity, dtype=np.int64)
+        self.flow_length = np.ones(capacity, dtype=np.int64)
+        self.time_in_department = np.zeros(capacity, dtype=np.int64)
+        self.treated_count = np.zeros(capacity, dtype=np.int64)
+        self.entry_time_step = np.zeros(capacity, dtype=np.int64)
+        self.treated = np.zeros(capacity, dtype=bool)
+        self.alive = np.ones(capacity, dtype=bool)
+        # number of identical patients represented by a row, always 1 if each patient has its own row
+        self.count = np.ones(capacity, dtype=np.int64)
+        self.updated = np.zeros(capacity, dtype=bool)
+        self.mortality_rate = np.zeros(capacity)
+        self.length_of_stay = np.zeros(capacity)
+        self.has_random_key = np.zeros(capacity, dtype=bool)
+        self.random_key = np.zeros(capacity, dtype=np.uint64)
+        self.draw_counter = np.zeros(capacity, dtype=np.int64)
+        self.allocate_resource_columns(capacity, number_of_resources)
+
+    def allocate_resource_columns(self, capacity: int, number_of_resources: int) -> None:
+        self.demand_met = np.ones((capacity, number_of_resources))
+        self.unmet_demand_count = np.zeros((capacity, number_of_resources), dtype=np.int64)
+        self.unmet_demand_run = np.zeros((capacity, number_of_resources), dtype=np.int64)
+        self.last_unmet_demand_time_step = np.zeros((capacity, number_of_resources), dtype=np.int64)
+
+    def resize_columns(self, capacity: int, number_of_resources: int) -> None:
+        old_columns = self.get_patient_columns()
+        self.allocate_columns(capacity, number_of_resources)
+        self.set_patient_rows(old_columns)
+
+    def get_patient_columns(self) -> dict:
+        return {name: getattr(self, name) for name in self.patient_column_names}
+
+    def set_patient_rows(self, columns: dict) -> None:
+        # copy the rows of patients from the given columns to the allocated columns
+        for name, old_column in columns.items():
+            new_column = getattr(self, name)
+            if old_column.ndim == 1:
+                new_column[:self.number_of_patients] = old_column[:self.number_of_patients]
+            else:
+                new_column[:self.number_of_patients, :old_column.shape[1]] = old_column[:self.number_of_patients]
+
+    def add_patients(self, profile_name: str, profile_parameters: list, number_of_patients: int, component_id: int, random_keys=None) -> None:
+        new_rows = self.add_rows(profile_name, profile_parameters, number_of_patients, component_id)
+        if random_keys is not None:
+            self.has_random_key[new_rows] = True
+            self.random_key[new_rows] = random_keys
+
+    def add_rows(self, profile_name: str, profile_parameters: list, number_of_rows: int, component_id: int) -> np.ndarray:
+        profile_id = self.profiles.get_profile_id(profile_name, profile_parameters)
+        self.reserve_rows(number_of_rows)
+        new_rows = np.arange(self.number_of_patients, self.number_of_patients + number_of_rows)
+        self.profile[new_rows] = profile_id
+        self.location[new_rows] = component_id
+        self.sequence_number[new_rows] = np.arange(self.next_sequence_number, self.next_sequence_number + number_of_rows)
+        self.next_sequence_number += number_of_rows
+        self.department[new_rows] = self.profiles.departments_along_flow[profile_id, 0]
+        self.number_of_patients += number_of_rows
+        return new_rows
+
+    def reserve_rows(self, number_of_rows: int) -> None:
+        required_capacity = self.number_of_patients + number_of_rows
+        if required_capacity > self.capacity or len(self.profiles.resource_names) > self.demand_met.shape[1]:
+            self.resize_columns(max(required_capacity, 2 * self.capacity), len(self.profiles.resource_names))
+
+    def get_located_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.location[:self.number_of_patients] != self.NOT_LOCATED)
+
+    def get_number_of_patients_in_departments(self) -> int:
+        # patients that exited the hospital stay located at the EXIT component
+        exit_component_id = self.component_ids.get(Patient.PatientType.EXIT, self.NOT_LOCATED)
+        rows = self.get_located_rows()
+        return int(np.sum(self.count[rows[self.location[rows] != exit_component_id]]))
+
+    def get_state(self) -> tuple:
+        # patients in components, which are the same as long as no patient enters, moves or is split into another row
+        return self.number_of_patients, self.location[:self.number_of_patients].tobytes(), self.count[:self.number_of_patients].tobytes()
+
+    def patients_leave_departments(self) -> bool:
+        rows = self.get_located_rows()
+        return bool(np.any(self.get_component_id_of_department(self.department[rows]) != self.location[rows]))
+
+    def get_next_stay_end_time_step(self, time_step: int, last_time_step: int) -> int:
+        """
+        Return the time step after the first stay of a treated patient in a department ends, if patients are treated at every time step
+        after the given one, or last_time_step if no stay ends before. Patients that exited the hospital stay at EXIT and are not considered.
+        """
+        rows = self.get_located_rows()
+        rows = rows[self.treated[rows] & (self.department[rows] != self.profiles.department_ids[self.profiles.EXIT])]
+        if len(rows) == 0:
+            return last_time_step
+        time_steps_to_stay = np.ceil(self.length_of_stay[rows] - self.treated_count[rows])
+        return min(last_time_step, time_step + int(time_steps_to_stay.min()) + 1)
+
+    def get_patient_counts(self) -> list:
+        """
+        Return the number of patients, treated patients and dead patients per patient type in each component, counted from the columns,
+        in the same format as the resilience aggregator counts patient objects.
+        """
+        rows = self.get_located_rows()
+        number_of_profiles = len(self.profiles.profile_names)
+        number_of_bins = len(self.components) * number_of_profiles
+        bins = self.location[rows] * number_of_profiles + self.profile[rows]
+        counts = self.count[rows]
+        patients = np.bincount(bins, weights=counts, minlength=number_of_bins).reshape(len(self.components), number_of_profiles)
+        treated_patients = np.bincount(bins, weights=counts * self.treated[rows], minlength=number_of_bins).reshape(patients.shape)
+        dead_patients = np.bincount(bins, weights=counts * ~self.alive[rows], minlength=number_of_bins).reshape(patients.shape)
+        patient_counts = [{} for _ in self.components]
+        for component_id, profile_id in zip(*np.nonzero(patients)):
+            patient_counts[component_id][self.profiles.profile_names[profile_id]] = [int(patients[component_id, profile_id]),
+                                                                                     int(treated_patients[component_id, profile_id]),
+                                                                                     int(dead_patients[component_id, profile_id])]
+        return patient_counts
+
+    def get_rows_in_component(self, component_id: int) -> np.ndarray:
+        rows = np.flatnonzero(self.location[:self.number_of_patients] == component_id)
+        return rows[np.argsort(self.sequence_number[rows], kind='stable')]
+
+    def receive_patients(self, time_step: int) -> None:
+        """
+        Create new patients in patient sources and move patients whose current department differs from the component they are in.
+        """
+        for component_id, component in enumerate(self.components):
+            if isinstance(component, Component.PatientSource):
+                self.create_patients(component, component_id, time_step)
+        self.move_patients()
+        self.department_demand_cache = {}
+
+    def create_patients(self, patient_source: Component.PatientSource, component_id: int, time_step: int) -> None:
+        patient_source.update_resources_based_on_predefined_resource_dynamics(time_step)
+        for patient_type_name, patient_group_parameters in patient_source.demand['OperationDemand'].items():
+            number_of_patients = int(patient_group_parameters.initial_amount)
+            profile_parameters = patient_source.patient_library[patient_type_name]
+            random_keys = None
+            if patient_source.random_streams.is_seeded():
+                random_keys = RandomStreams.draw_random_keys(patient_source.get_random_generator(patient_type_name), number_of_patients)
+            self.add_patients(patient_type_name, profile_parameters, number_of_patients, component_id, random_keys)
+
+    def move_patients(self) -> None:
+        rows = self.get_located_rows()
+        target_components = self.get_component_id_of_department(self.department[rows])
+        moving = target_components != self.location[rows]
+        moving_rows = rows[moving]
+        # patients leave components in the order of the components and of the patients within components
+        order = np.lexsort((self.sequence_number[moving_rows], self.location[moving_rows]))
+        moving_rows = moving_rows[order]
+        self.location[moving_rows] = target_components[moving][order]
+        self.sequence_number[moving_rows] = np.arange(self.next_sequence_number, self.next_sequence_number + len(moving_rows))
+        self.next_sequence_number += len(moving_rows)
+
+    def get_department_demand(self, component: Component.Component) -> tuple:
+        """
+        Return the patients in the component that are in the hospital, in the component's order, and their current resource demand.
+        One-time consumables are only demanded in the first time step at the department.
+        """
+        component_id = self.component_ids[component.name]
+        if component_id not in self.department_demand_cache:
+            rows = self.get_rows_in_component(component_id)
+            rows = rows[self.department[rows] != self.profiles.department_ids[self.profiles.EXIT]]
+            keys = self.profiles.get_keys(self.profile[rows], self.flow_length[rows] - 1)
+            demand = self.profiles.demand[keys]
+            demand[np.ix_(self.time_in_department[rows] > 0, self.profiles.one_time_consumable)] = 0.0
+            self.department_demand_cache[component_id] = (rows, keys, demand)
+        return self.department_demand_cache[component_id]
+
+    def get_operation_demand(self, component: Component.Component) -> dict:
+        rows, keys, demand = self.get_department_demand(component)
+        if len(rows) == 0:
+            return {}
+        # cumulative sum adds patient demands one by one, in the same order as summing over the component's patient list
+        total_demand = np.cumsum(demand * self.count[rows, None], axis=0)[-1]
+        demanded_resources = np.flatnonzero(self.profiles.has_resource[keys].any(axis=0))
+        return {self.profiles.resource_names[resource_id]: float(total_demand[resource_id]) for resource_id in demanded_resources}
+
+    def get_patients_with_demand(self, component: Component.Component, resource_name: str) -> tuple:
+        rows, keys, demand = self.get_department_demand(component)
+        if resource_name not in self.profiles.resource_ids:
+            return rows[:0], np.zeros(0)
+        resource_id = self.profiles.resource_ids[resource_name]
+        with_demand = demand[:, resource_id] > 0
+        return rows[with_demand], demand[with_demand, resource_id]
+
+    def get_triage_categories(self, component: Component.HospitalComponent, rows: np.ndarray) -> np.ndarray:
+        profile_categories = [component.PRIORITIZED_PATIENTS_LIST.index(Patient.PatientProfile.find_triage_category(profile_name, component.PRIORITIZED_PATIENTS_LIST))
+                              for profile_name in self.profiles.profile_names]
+        return np.asarray(profile_categories, dtype=np.int64)[self.profile[rows]]
+
+    def distribute_resource_among_patients_priority(self, component: Component.HospitalComponent, resource_name: str, percent_of_met_demand: float) -> None:
+        rows, _ = self.get_patients_with_demand(component, resource_name)
+        if len(rows) == 0:
+            return
+        number_of_patients_with_met_demand = int(len(rows) * percent_of_met_demand)
+        prioritized_rows = rows[np.argsort(self.get_triage_categories(component, rows), kind='stable')]
+        self.demand_met[prioritized_rows[number_of_patients_with_met_demand:], self.profiles.resource_ids[resource_name]] = 0.0
+
+    def distribute_resource_among_patients_evenly_within_the_same_patient_profile(self, component: Component.HospitalComponent, resource_name: str, percent_of_met_demand: float) -> None:
+        rows, demand = self.get_patients_with_demand(component, resource_name)
+        total_demand = component.demand[component.DemandTypes.OPERATION_DEMAND.value][resource_name].current_amount
+        met_demand = total_demand * percent_of_met_demand
+        categories = self.get_triage_categories(component, rows)
+        for category_id in range(len(component.PRIORITIZED_PATIENTS_LIST)):
+            in_category = categories == category_id
+            total_demand_per_category = np.cumsum(demand[in_category] * self.count[rows[in_category]])[-1] if in_category.any() else 0
+            if met_demand < total_demand_per_category:
+                demand_met_per_patient = round(float(met_demand) / float(total_demand_per_category), 5) # to avoid 0.99999 being registered as unmet demand
+                self.demand_met[rows[in_category], self.profiles.resource_ids[resource_name]] = demand_met_per_patient
+            met_demand = max(met_demand - total_demand_per_category, 0)
+
+    def update_patients(self, time_step: int) -> None:
+        """
+        Vectorized PatientType.update for all patients in components.
+        """
+        self.department_demand_cache = {}
+        rows = self.get_located_rows()
+        entering = rows[self.time_in_department[rows] == 0]
+        self.entry_time_step[entering] = time_step
+        self.time_in_department[rows] += 1
+        self.treated_count[rows] += 1
+        self.treated[rows] = True
+        rows = rows[self.department[rows] != self.profiles.department_ids[self.profiles.EXIT]]
+        if len(rows) == 0:
+            return
+        keys = self.profiles.get_keys(self.profile[rows], self.flow_length[rows] - 1)
+        mortality_rate = self.profiles.mortality_rate[keys]
+        length_of_stay = self.profiles.length_of_stay[keys]
+        with_unmet_demand = (self.demand_met[rows] < 1.0).any(axis=1)
+        if with_unmet_demand.any():
+            self.check_consequences_of_unmet_demand(rows, keys, mortality_rate, length_of_stay, np.flatnonzero(with_unmet_demand), time_step)
+            self.demand_met[rows[with_unmet_demand]] = 1.0
+        rows, mortality_rate, length_of_stay = self.check_if_alive(rows, mortality_rate, length_of_stay)
+        self.mortality_rate_log.append((rows, mortality_rate))
+        self.mortality_rate[rows] = mortality_rate
+        self.length_of_stay[rows] = length_of_stay
+        self.updated[rows] = True
+        stay_finished = self.treated_count[rows] >= length_of_stay
+        self.move_to_next_department(rows[stay_finished])
+
+    def check_consequences_of_unmet_demand(self, rows: np.ndarray, keys: np.ndarray, mortality_rate: np.ndarray, length_of_stay: np.ndarray,
+                                           positions: np.ndarray, time_step: int) -> None:
+        """
+        Apply consequences of unmet demand in the order of the resources and consequences in the patient profile.
+        Mortality rates and lengths of stay are updated in place at the given positions.
+        """
+        unmet_demand_rows = []
+        unmet_demand_resources = []
+        for key in np.unique(keys[positions]):
+            key_positions = positions[keys[positions] == key]
+            for resource_id, consequences in self.profiles.key_consequences[key]:
+                unmet_positions = key_positions[self.demand_met[rows[key_positions], resource_id] < 1.0]
+                if len(unmet_positions) == 0:
+                    continue
+                unmet_rows = rows[unmet_positions]
+                unmet_demand_rows.append(unmet_rows)
+                unmet_demand_resources.append(np.full(len(unmet_rows), resource_id))
+                time_steps_unmet_in_a_row = self.update_unmet_demand_record(unmet_rows, resource_id, time_step)
+                for consequence_type, consequence_value in consequences:
+                    self.apply_consequence(key, resource_id, consequence_type, consequence_value, unmet_rows, unmet_positions,
+                                           mortality_rate, length_of_stay, time_steps_unmet_in_a_row)
+        if len(unmet_demand_rows) > 0:
+            unmet_demand_rows = np.concatenate(unmet_demand_rows)
+            self.unmet_demand_log.append((unmet_demand_rows, np.concatenate(unmet_demand_resources), np.full(len(unmet_demand_rows), time_step)))
+
+    def update_unmet_demand_record(self, rows: np.ndarray, resource_id: int, time_step: int) -> np.ndarray:
+        """
+        Return the length of the last run of consecutive time steps with unmet demand, as in PatientType.length_of_last_n_elements_with_difference_one.
+        """
+        count = self.unmet_demand_count[rows, resource_id] + 1
+        consecutive = (count >= 2) & (time_step - self.last_unmet_demand_time_step[rows, resource_id] == 1)
+        run = np.where(consecutive, self.unmet_demand_run[rows, resource_id] + 1, 1)
+        self.unmet_demand_count[rows, resource_id] = count
+        self.unmet_demand_run[rows, resource_id] = run
+        self.last_unmet_demand_time_step[rows, resource_id] = time_step
+        return np.where(count >= 2, run, 0)
+
+    def apply_consequence(self, key: int, resource_id: int, consequence_type, consequence_value, rows: np.ndarray, positions: np.ndarray,
+                          mortality_rate: np.ndarray, length_of_stay: np.ndarray, time_steps_unmet_in_a_row: np.ndarray) -> None:
+        if consequence_type == 0:
+            updated_mortality_rate = self.update_patients_when_nurses_missing(key, resource_id, consequence_value, rows, self.profiles.mortality_rate[key])
+            mortality_rate[positions] = np.maximum(updated_mortality_rate, mortality_rate[positions])
+        elif consequence_type == 1:
+            updated_length_of_stay = self.update_patients_when_nurses_missing(key, resource_id, consequence_value, rows, self.profiles.length_of_stay[key])
+            length_of_stay[positions] = np.maximum(length_of_stay[positions], updated_length_of_stay)
+        elif consequence_type == 2:
+            mortality_rate[positions] = np.maximum(consequence_value * self.profiles.mortality_rate[key], mortality_rate[positions])
+            self.patients_not_treated(rows)
+        elif consequence_type == 3:
+            length_of_stay[positions] = np.maximum(length_of_stay[positions], consequence_value * self.profiles.length_of_stay[key])
+            self.patients_not_treated(rows)
+        elif consequence_type == 4:
+            self.patients_not_treated(rows)
+            mortality_rate[positions[time_steps_unmet_in_a_row >= consequence_value]] = 1.0
+        elif consequence_type == 5:
+            pass
+        else:
+            raise ValueError(f'Consequence {consequence_type} is not implemented in the patient class.')
+
+    def update_patients_when_nurses_missing(self, key: int, resource_id: int, consequence_value: float, rows: np.ndarray, parameter_to_update: float) -> np.ndarray:
+        nurse_demand = self.profiles.demand[key, resource_id]
+        if self.profiles.one_time_consumable[resource_id]:
+            nurse_demand = np.where(self.time_in_department[rows] > 1, 0.0, nurse_demand)
+        else:
+            nurse_demand = np.full(len(rows), nurse_demand)
+        demand_met = self.demand_met[rows, resource_id]
+        number_of_missing_nurses = [demand * (1 - met) if demand > 1 else 1 / demand * (1 - met) for demand, met in zip(nurse_demand, demand_met)]
+        # Python's power is used to get exactly the same values as PatientType
+        return np.asarray([parameter_to_update * max(consequence_value ** float(missing), 1.0) for missing in number_of_missing_nurses])
+
+    def patients_not_treated(self, rows: np.ndarray) -> None:
+        self.treated[rows] = False
+        self.treated_count[rows] = np.maximum(self.treated_count[rows] - 1, 0)
+
+    def check_if_alive(self, rows: np.ndarray, mortality_rate: np.ndarray, length_of_stay: np.ndarray) -> tuple:
+        """
+        Draw whether patients die in this time step. Return the updated patients with their mortality rates and lengths of stay.
+        """
+        draws = np.full(len(rows), RandomStreams.LEGACY_UNIFORM_DRAW)
+        with_random_key = self.has_random_key[rows]
+        draws[with_random_key] = RandomStreams.uniform_from_keys(self.random_key[rows[with_random_key]], self.draw_counter[rows[with_random_key]])
+        self.draw_counter[rows] += 1
+        self.set_dead(rows[draws < mortality_rate])
+        return rows, mortality_rate, length_of_stay
+
+    def set_dead(self, rows: np.ndarray) -> None:
+        self.alive[rows] = False
+        self.add_department_to_flow(rows, np.full(len(rows), self.profiles.department_ids[self.profiles.EXIT]))
+
+    def move_to_next_department(self, rows: np.ndarray) -> None:
+        next_departments = self.profiles.get_departments(self.profile[rows], self.flow_length[rows])
+        self.add_department_to_flow(rows, next_departments)
+
+    def add_department_to_flow(self, rows: np.ndarray, departments: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        self.flow_log.append((rows, self.department[rows], self.entry_time_step[rows], self.time_in_department[rows], self.treated_count[rows]))
+        self.department[rows] = departments
+        self.flow_length[rows] += 1
+        self.time_in_department[rows] = 0
+        self.treated_count[rows] = 0
+
+    def synchronize_components(self) -> None:
+        """
+        Create PatientType objects from the store and set them as components' patients, in the components' order.
+        Patient objects share the profile of their patient type.
+        """
+        patient_histories = self.get_patient_histories()
+        patient_profiles = self.get_patient_profiles()
+        for component_id, component in enumerate(self.components):
+            if isinstance(component, Component.HospitalComponent):
+                component.patients = PatientList.PatientList()
+                for row in self.get_rows_in_component(component_id).tolist():
+                    component.patients += self.create_patient_objects(row, patient_profiles[self.profile[row]], patient_histories)
+
+    def get_patient_profiles(self) -> list:
+        # profiles are taken from the compiled patient libraries of patient sources, so patient objects share them with the object model
+        patient_libraries = [component.compiled_patient_library for component in self.components if isinstance(component, Component.PatientSource)]
+        patient_profiles = []
+        for profile_name, profile_parameters in zip(self.profiles.profile_names, self.profiles.profile_parameters):
+            patient_library = next((patient_library for patient_library in patient_libraries if profile_name in patient_library.parameters), None)
+            if patient_library is None:
+                patient_profiles.append(Patient.PatientProfile(profile_name, profile_parameters))
+            else:
+                patient_profiles.append(patient_library.get_profile(profile_name))
+        return patient_profiles
+
+    def get_patient_histories(self) -> tuple:
+        """
+        Return the logged departments, mortality rates and unmet demand of patients, grouped by row.
+        """
+        return self.group_log_by_row(self.flow_log), self.group_log_by_row(self.mortality_rate_log), self.group_log_by_row(self.unmet_demand_log)
+
+    @staticmethod
+    def group_log_by_row(log: PatientLog) -> dict:
+        """
+        Return a dict with rows as keys and, as values, the position of the records in the log followed by the logged columns, in the order of logging.
+        """
+        if log.length == 0:
+            return {}
+        rows, *columns = log.get_columns()
+        log_positions = np.arange(log.length)
+        order = np.argsort(rows, kind='stable')
+        rows = rows[order]
+        columns = [log_positions[order]] + [column[order] for column in columns]
+        boundaries = np.flatnonzero(np.diff(rows)) + 1
+        row_starts = np.concatenate([[0], boundaries])
+        grouped_columns = zip(*[np.split(column, boundaries) for column in columns])
+        return {int(rows[row_start]): group for row_start, group in zip(row_starts, grouped_columns)}
+
+    def create_patient_objects(self, row: int, patient_profile: Patient.PatientProfile, patient_histories: tuple) -> list:
+        patient = self.create_patient_object(row, patient_profile, patient_histories)
+        if self.has_random_key[row]:
+            patient.set_random_key(int(self.random_key[row]))
+        return [patient]
+
+    def create_patient_object(self, row: int, patient_profile: Patient.PatientProfile, patient_histories: tuple) -> Patient.PatientType:
+        flows, mortality_rate_records, unmet_demand_records = patient_histories
+        patient = Patient.PatientType(patient_profile)
+        patient.flow = []
+        if row in flows:
+            for department, entry_time_step, time_in_department, treated_count in zip(*flows[row][1:]):
+                patient.flow.append(self.create_flow_entry(department, entry_time_step, time_in_department, treated_count))
+        patient.flow.append(self.create_flow_entry(self.department[row], self.entry_time_step[row], self.time_in_department[row], self.treated_count[row]))
+        patient.treated = bool(self.treated[row])
+        patient.alive = bool(self.alive[row])
+        patient.mortality_rate_record = mortality_rate_records[row][1].tolist() if row in mortality_rate_records else []
+        patient.unmet_demand_info = {}
+        if row in unmet_demand_records:
+            for resource_id, time_step in zip(*unmet_demand_records[row][1:]):
+                patient.unmet_demand_info.setdefault(self.profiles.resource_names[resource_id], []).append(int(time_step))
+        if self.updated[row]:
+            patient.mortality_rate = float(self.mortality_rate[row])
+            patient.length_of_stay = float(self.length_of_stay[row])
+        return patient
+
+    def create_flow_entry(self, department: int, entry_time_step: int, time_in_department: int, treated_count: int) -> dict:
+        # treated time steps are the last ones at the department, only their number is tracked by the store
+        time_steps_at_department = list(range(int(entry_time_step), int(entry_time_step + time_in_department)))
+        return {'Department': self.profiles.department_names[department],
+                'TimeStepAtDepartment': time_steps_at_department,
+                'TimeStepTreated': time_steps_at_department[len(time_steps_at_department) - int(treated_count):]}
+
+
+class PatientCohortStore(PatientArrayStore):
+    """
+    Class to store identical patients as cohorts, i.e., one row with the number of patients it represents.
+
+    All patients of a patient type that arrive through a patient source in the same time step form one cohort.
+    A cohort is split only when its members are treated differently: when the priority-based resource distribution
+    meets the demand of only some of its members, or when only some of its members die.
+    Memory and work per time step then scale with the number of distinct patient states instead of the number of patients.
+
+    If patients have random keys, each cohort keeps the keys of its members, in the members' order, so death draws
+    are the same as if every patient had its own row.
+    Resource demand of a cohort is the demand of a patient multiplied by the cohort size, so totals can differ from
+    the sum over individual patients in the last digits.
+    """
+
+    def allocate_columns(self, capacity: int, number_of_resources: int) -> None:
+        super().allocate_columns(capacity, number_of_resources)
+        self.member_random_keys = np.empty(capacity, dtype=object)
+        # row the cohort was split from and the lengths of the flow, mortality rate and unmet demand logs at the split
+        self.parent_row = np.full(capacity, -1, dtype=np.int64)
+        self.split_log_lengths = np.zeros((capacity, 3), dtype=np.int64)
+        self.patient_column_names += ['member_random_keys', 'parent_row', 'split_log_lengths']
+
+    def add_patients(self, profile_name: str, profile_parameters: list, number_of_patients: int, component_id: int, random_keys=None) -> None:
+        if number_of_patients == 0:
+            return
+        new_row = self.add_rows(profile_name, profile_parameters, 1, component_id)[0]
+        self.count[new_row] = number_of_patients
+        if random_keys is not None:
+            self.has_random_key[new_row] = True
+            self.member_random_keys[new_row] = np.asarray(random_keys, dtype=np.uint64)
+
+    def split_row(self, row: int, members_to_split: np.ndarray) -> int:
+        """
+        Move the members of the cohort given by the boolean mask to a new cohort that directly follows the original one in its component.
+        """
+        self.reserve_rows(1)
+        new_row = self.number_of_patients
+        for column in self.get_patient_columns().values():
+            column[new_row] = column[row]
+        self.count[new_row] = np.count_nonzero(members_to_split)
+        self.count[row] -= self.count[new_row]
+        if self.has_random_key[row]:
+            member_random_keys = self.member_random_keys[row]
+            self.member_random_keys[new_row] = member_random_keys[members_to_split]
+            self.member_random_keys[row] = member_random_keys[~members_to_split]
+        self.parent_row[new_row] = row
+        self.split_log_lengths[new_row] = [self.flow_log.length, self.mortality_rate_log.length, self.unmet_demand_log.length]
+        rows_in_component = self.get_rows_in_component(self.location[row])
+        self.number_of_patients += 1
+        rows_in_component = np.insert(rows_in_component, np.flatnonzero(rows_in_component == row)[0] + 1, new_row)
+        self.sequence_number[rows_in_component] = np.arange(self.next_sequence_number, self.next_sequence_number + len(rows_in_component))
+        self.next_sequence_number += len(rows_in_component)
+        self.department_demand_cache.pop(self.location[row], None)
+        return new_row
+
+    def distribute_resource_among_patients_priority(self, component: Component.HospitalComponent, resource_name: str, percent_of_met_demand: float) -> None:
+        rows, _ = self.get_patients_with_demand(component, resource_name)
+        if len(rows) == 0:
+            return
+        number_of_patients_with_met_demand = int(self.count[rows].sum() * percent_of_met_demand)
+        prioritized_rows = rows[np.argsort(self.get_triage_categories(component, rows), kind='stable')]
+        number_of_patients_until_row = np.cumsum(self.count[prioritized_rows])
+        first_unmet = np.searchsorted(number_of_patients_until_row, number_of_patients_with_met_demand, side='right')
+        unmet_rows = prioritized_rows[first_unmet:]
+        if first_unmet < len(prioritized_rows):
+            row = prioritized_rows[first_unmet]
+            number_of_met_members = number_of_patients_with_met_demand - (number_of_patients_until_row[first_unmet] - self.count[row])
+            if number_of_met_members > 0:
+                new_row = self.split_row(row, np.arange(self.count[row]) >= number_of_met_members)
+                unmet_rows = np.concatenate([[new_row], prioritized_rows[first_unmet + 1:]])
+        self.demand_met[unmet_rows, self.profiles.resource_ids[resource_name]] = 0.0
+
+    def check_if_alive(self, rows: np.ndarray, mortality_rate: np.ndarray, length_of_stay: np.ndarray) -> tuple:
+        """
+        Override parent method by drawing death for each member of cohorts with random keys and splitting off the members that die.
+        """
+        dead = np.full(len(rows), RandomStreams.LEGACY_UNIFORM_DRAW) < mortality_rate
+        split_positions = []
+        new_rows = []
+        with_random_keys = np.flatnonzero(self.has_random_key[rows])
+        if len(with_random_keys) > 0:
+            counts = self.count[rows[with_random_keys]]
+            member_random_keys = np.concatenate(list(self.member_random_keys[rows[with_random_keys]]))
+            member_draws = RandomStreams.uniform_from_keys(member_random_keys, np.repeat(self.draw_counter[rows[with_random_keys]], counts))
+            members_dead = member_draws < np.repeat(mortality_rate[with_random_keys], counts)
+            number_of_dead_members = np.add.reduceat(members_dead.astype(np.int64), np.cumsum(counts) - counts)
+            dead[with_random_keys] = number_of_dead_members == counts
+            members_dead = np.split(members_dead, np.cumsum(counts)[:-1])
+            for i in np.flatnonzero((number_of_dead_members > 0) & (number_of_dead_members < counts)):
+                split_positions.append(with_random_keys[i])
+                new_rows.append(self.split_row(rows[with_random_keys[i]], members_dead[i]))
+        if len(new_rows) > 0:
+            rows = np.concatenate([rows, new_rows])
+            mortality_rate = np.concatenate([mortality_rate, mortality_rate[split_positions]])
+            length_of_stay = np.concatenate([length_of_stay, length_of_stay[split_positions]])
+            dead = np.concatenate([dead, np.ones(len(new_rows), dtype=bool)])
+        self.draw_counter[rows] += 1
+        self.set_dead(rows[dead])
+        return rows, mortality_rate, length_of_stay
+
+    def get_patient_histories(self) -> tuple:
+        """
+        Override parent method by adding the history of the cohort a cohort was split from, up to the split.
+        """
+        patient_histories = super().get_patient_histories()
+        for row in np.flatnonzero(self.parent_row[:self.number_of_patients] >= 0).tolist():
+            parent_row = self.parent_row[row]
+            for log_id, grouped_log in enumerate(patient_histories):
+                if parent_row not in grouped_log:
+                    continue
+                inherited = grouped_log[parent_row][0] < self.split_log_lengths[row, log_id]
+                parent_history = [column[inherited] for column in grouped_log[parent_row]]
+                if row in grouped_log:
+                    grouped_log[row] = [np.concatenate([inherited_column, column]) for inherited_column, column in zip(parent_history, grouped_log[row])]
+                else:
+                    grouped_log[row] = parent_history
+        return patient_histories
+
+    def create_patient_objects(self, row: int, patient_profile: Patient.PatientProfile, patient_histories: tuple) -> list:
+        """
+        Override parent method by creating one patient object per cohort member. Members share the flow and records of the cohort.
+        """
+        patient = self.create_patient_object(row, patient_profile, patient_histories)
+        patients = [copy.copy(patient) for _ in range(self.count[row])]
+        if self.has_random_key[row]:
+            for member, random_key in zip(patients, self.member_random_keys[row].tolist()):
+                member.set_random_key(random_key)
+        return patients
@@ -44,9 +44,11 @@ class Plotter():
         plt.savefig(savename, dpi=dpi)
     
     def add_warmup(self, warmup: int, lists_to_extend: list([list])):
+        if warmup == 0:
+            return lists_to_extend
         extended_lists = []
         for list_to_extend in lists_to_extend:
-            extended_lists.append([list_to_extend[0]] * warmup + list_to_extend)
+            extended_lists.append([list_to_extend[0]] * warmup + list(list_to_extend))
         return extended_lists       
 
     def setup_gantt_chart_fig(self, x_axis_label: str, components: list) -> plt.axis:
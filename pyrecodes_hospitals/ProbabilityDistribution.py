@@ -16,7 +16,8 @@ class Distribution(ABC):
 
 class Deterministic(Distribution):
 
-    def __init__(self, parameters: dict):
+    def __init__(self, parameters: dict, random_generator=None):
+        # random_generator is not used, so all distributions can be constructed in the same way
         self.set_parameters(parameters)
 
     def set_parameters(self, parameters: dict) -> None:
@@ -28,8 +29,16 @@ class Deterministic(Distribution):
 
 class Lognormal(Distribution):
 
-    def __init__(self, parameters: dict):
+    def __init__(self, parameters: dict, random_generator=None):
         self.set_parameters(parameters)
+        self.set_random_generator(random_generator)
+
+    def set_random_generator(self, random_generator: np.random.Generator) -> None:
+        # without a dedicated generator, numpy's global random state is used
+        if random_generator is None:
+            self.random_generator = np.random
+        else:
+            self.random_generator = random_generator
 
     def set_parameters(self, parameters: dict) -> None:
         self.median = parameters['Median']
@@ -37,4 +46,4 @@ class Lognormal(Distribution):
 
     def sample(self) -> float:
         mean_normal = math.log(self.median)
-        return np.random.lognormal(mean_normal, self.dispersion)
+        return self.random_generator.lognormal(mean_normal, self.dispersion)
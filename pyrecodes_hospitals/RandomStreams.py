@@ -0,0 +1,68 @@
+import zlib
+import numpy as np
+
+# Value of random.random() right after random.seed(1). Used as the death draw when no seed is defined,
+# which reproduces the results of the original implementation that reseeded the global RNG before every draw.
+LEGACY_UNIFORM_DRAW = 0.13436424411240122
+
+SPLITMIX64_GAMMA = 0x9E3779B97F4A7C15
+SPLITMIX64_MULTIPLIER_1 = 0xBF58476D1CE4E5B9
+SPLITMIX64_MULTIPLIER_2 = 0x94D049BB133111EB
+UINT64_MASK = 0xFFFFFFFFFFFFFFFF
+TO_UNIT_INTERVAL = 2.0 ** -53
+
+
+class RandomStreams():
+    """
+    Class to create independent and reproducible random number streams from a single root seed.
+
+    Streams are built on numpy.random.SeedSequence and identified by the replication id and the name of the subsystem that uses them,
+    so the stream a subsystem receives does not depend on the order in which streams are created or on the process that creates them.
+    If the seed is None, the streams are not seeded and the model uses its legacy deterministic behavior.
+    """
+
+    def __init__(self, seed=None, replication_id=0) -> None:
+        self.seed = seed
+        self.replication_id = replication_id
+
+    def is_seeded(self) -> bool:
+        return self.seed is not None
+
+    def for_replication(self, replication_id: int) -> 'RandomStreams':
+        return RandomStreams(self.seed, replication_id)
+
+    def get_seed_sequence(self, subsystem_name: str) -> np.random.SeedSequence:
+        # SeedSequence(seed, spawn_key=(i, j)) is the j-th child of the i-th child of SeedSequence(seed)
+        subsystem_id = zlib.crc32(subsystem_name.encode())
+        return np.random.SeedSequence(self.seed, spawn_key=(self.replication_id, subsystem_id))
+
+    def get_generator(self, subsystem_name: str) -> np.random.Generator:
+        return np.random.Generator(np.random.PCG64(self.get_seed_sequence(subsystem_name)))
+
+
+def draw_random_keys(random_generator: np.random.Generator, number_of_keys: int) -> np.ndarray:
+    """
+    Draw 64-bit keys that identify the counter-based random streams of individual entities (e.g., patients).
+    """
+    return random_generator.bit_generator.random_raw(number_of_keys)
+
+def uniform_from_key(key: int, counter: int) -> float:
+    """
+    Return the counter-th uniform draw from the stream identified by key (SplitMix64 output function).
+    The draw depends only on the key and the counter, not on the order in which draws are made.
+    """
+    z = (int(key) + (counter + 1) * SPLITMIX64_GAMMA) & UINT64_MASK
+    z = ((z ^ (z >> 30)) * SPLITMIX64_MULTIPLIER_1) & UINT64_MASK
+    z = ((z ^ (z >> 27)) * SPLITMIX64_MULTIPLIER_2) & UINT64_MASK
+    z = z ^ (z >> 31)
+    return (z >> 11) * TO_UNIT_INTERVAL
+
+def uniform_from_keys(keys: np.ndarray, counters: np.ndarray) -> np.ndarray:
+    """
+    Vectorized uniform_from_key. Returns exactly the same values as uniform_from_key for each key/counter pair.
+    """
+    z = np.asarray(keys, dtype=np.uint64) + (np.asarray(counters, dtype=np.uint64) + np.uint64(1)) * np.uint64(SPLITMIX64_GAMMA)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(SPLITMIX64_MULTIPLIER_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(SPLITMIX64_MULTIPLIER_2)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * TO_UNIT_INTERVAL
@@ -0,0 +1,126 @@
+import numpy as np
+
+
+class ResilienceAggregator():
+    """
+    Class to aggregate the system state once per time step for all resilience calculators.
+
+    Resilience calculators register the values they read: resource totals per resource and scope, and patient counts
+    per scope, i.e., per set of components. Each update fills all registered values in one pass, resource totals once per
+    resource and scope, and patients are counted once per component and added to the scopes the component is in.
+    Calculators with the same scope or patient types share the aggregated values.
+    If patients are kept in a patient store, they are counted from the store's columns instead of patient objects.
+    Time steps that repeat the last simulated one are filled at once, with the totals of resources whose supply changes kept per time step.
+    """
+
+    def __init__(self, resources: dict, components: list) -> None:
+        self.resources = resources
+        self.components = components
+        self.registered_resource_totals = {}
+        self.registered_patient_scopes = set()
+        # scopes of patient counts that each component is in, by component id
+        self.component_patient_scopes = [[] for _ in components]
+        self.patient_store = None
+        self.number_of_repeated_time_steps = 0
+        self.repeated_resource_totals = {}
+        self.update()
+        self.previous_patient_totals = self.patient_totals
+
+    @staticmethod
+    def get_scope_key(scope) -> tuple:
+        # scope is a list of component names, 'Locality X' or a single component name
+        return tuple(scope) if isinstance(scope, list) else scope
+
+    def register_resource_totals(self, resource_name: str, scope) -> tuple:
+        """
+        Register the supply, demand and consumption of the resource in the scope. Return the key of the totals in resource_totals.
+        """
+        key = (resource_name, self.get_scope_key(scope))
+        self.registered_resource_totals[key] = (resource_name, scope)
+        return key
+
+    def register_patient_counts(self, component_ids: tuple) -> tuple:
+        """
+        Register the patient counts of the components with the given ids. Return the key of the counts in patient_totals.
+        """
+        if component_ids not in self.registered_patient_scopes:
+            self.registered_patient_scopes.add(component_ids)
+            for component_id in component_ids:
+                self.component_patient_scopes[component_id].append(component_ids)
+        return component_ids
+
+    def counts_patients(self) -> bool:
+        return len(self.registered_patient_scopes) > 0
+
+    def update(self, resource_names=None) -> None:
+        """
+        Fill all registered values. If resource_names is given, only the totals of these resources are calculated again and the others are kept.
+        """
+        if resource_names is None:
+            self.resource_totals = {key: self.resources[resource_name]['DistributionModel'].get_totals(scope)
+                                    for key, (resource_name, scope) in self.registered_resource_totals.items()}
+        else:
+            for key, (resource_name, scope) in self.registered_resource_totals.items():
+                if resource_name in resource_names:
+                    self.resource_totals[key] = self.resources[resource_name]['DistributionModel'].get_totals(scope)
+        self.update_patient_totals()
+
+    def repeat_update(self, number_of_time_steps: int, supply_amounts: dict) -> None:
+        """
+        Fill all registered values for time steps that repeat the last one. The supply of resources in supply_amounts changes to the given
+        amounts ((component, amounts per time step) pairs per resource name), so their totals are kept for each time step in repeated_resource_totals.
+        Patients only leave departments at the last repeated time step, so the patient counts before it are kept in previous_patient_totals.
+        """
+        self.number_of_repeated_time_steps = number_of_time_steps
+        self.repeated_resource_totals = {}
+        for key, (resource_name, scope) in self.registered_resource_totals.items():
+            if resource_name in supply_amounts:
+                repeated_totals = self.resources[resource_name]['DistributionModel'].get_repeated_totals(scope, supply_amounts[resource_name])
+                self.repeated_resource_totals[key] = repeated_totals
+                self.resource_totals[key] = tuple(repeated_totals[-1])
+        self.previous_patient_totals = self.patient_totals
+        self.update_patient_totals()
+
+    def get_repeated_resource_totals(self, key: tuple) -> np.ndarray:
+        repeated_totals = self.repeated_resource_totals.get(key)
+        if repeated_totals is None:
+            return np.tile(self.resource_totals[key], (self.number_of_repeated_time_steps, 1))
+        return repeated_totals
+
+    def update_patient_totals(self) -> None:
+        self.patient_totals = {scope: {} for scope in self.registered_patient_scopes}
+        if not(self.counts_patients()):
+            return
+        component_patient_counts = self.patient_store.get_patient_counts() if self.patient_store is not None else None
+        for component_id, (component, patient_scopes) in enumerate(zip(self.components, self.component_patient_scopes)):
+            if len(patient_scopes) == 0:
+                continue
+            patient_counts = component_patient_counts[component_id] if component_patient_counts is not None else self.count_patients(component)
+            for patient_type, counts in patient_counts.items():
+                for patient_scope in patient_scopes:
+                    totals = self.patient_totals[patient_scope].setdefault(patient_type, [0, 0, 0])
+                    for count_id, count in enumerate(counts):
+                        totals[count_id] += count
+
+    def count_patients(self, component) -> dict:
+        """
+        Return the number of patients, treated patients and dead patients per patient type in the component.
+        """
+        patient_counts = {}
+        patient_archive = getattr(component, 'patient_archive', None)
+        if patient_archive is not None:
+            # archived patients are updated at EXIT, so they are all treated
+            for patient_type, number_of_patients in patient_archive.exited_patients.items():
+                patient_counts[patient_type] = [number_of_patients, number_of_patients, patient_archive.dead_patients.get(patient_type, 0)]
+            return patient_counts
+        for patient in component.patients:
+            counts = patient_counts.get(patient.name)
+            if counts is None:
+                counts = [0, 0, 0]
+                patient_counts[patient.name] = counts
+            counts[0] += 1
+            if patient.treated:
+                counts[1] += 1
+            if patient.alive == False:
+                counts[2] += 1
+        return patient_counts
@@ -4,6 +4,7 @@ import math
 import copy
 from pyrecodes_hospitals import Component
 from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import TimeSeries
 
 class ResilienceCalculator(ABC):
 
@@ -15,6 +16,21 @@ class ResilienceCalculator(ABC):
     def update(self):
         pass
 
+    def register_aggregated_values(self, aggregator) -> None:
+        # calculators that read aggregated values register them, so the aggregator fills them at each update
+        pass
+
+    def update_from_aggregator(self, aggregator) -> None:
+        self.update(aggregator.resources)
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        # time steps that repeat the last one are recorded one by one, unless the calculator records them at once
+        for _ in range(aggregator.number_of_repeated_time_steps):
+            self.update_from_aggregator(aggregator)
+
+    def set_number_of_time_steps(self, number_of_time_steps: int) -> None:
+        pass
+
 class FullRecoveryTimeResilienceCalculator(ResilienceCalculator):
 
     def calculate_resilience(self):
@@ -24,17 +40,26 @@ class FullRecoveryTimeResilienceCalculator(ResilienceCalculator):
         self.current_time_step = time_step
 
 class ReCoDeSResilienceCalculator(ResilienceCalculator):
+    """
+    Resilience calculator that records the supply, demand and consumption of resources in its scope at each time step.
+
+    Each quantity is stored in a time step x resource table. system_supply, system_demand and system_consumption
+    map resource names to the table's columns, which are read like lists and as NumPy arrays without copying.
+    """
     
     def __init__(self, parameters: dict) -> None:   
-        self.system_supply = {}
-        self.system_demand = {}
-        self.system_consumption = {}
         self.resources = parameters["Resources"]
         self.scope = parameters["Scope"]
-        for resource_name in self.resources:
-            self.system_supply[resource_name] = []
-            self.system_demand[resource_name] = []
-            self.system_consumption[resource_name] = []
+        self.supply_table = TimeSeries.TimeSeriesTable(self.resources)
+        self.demand_table = TimeSeries.TimeSeriesTable(self.resources)
+        self.consumption_table = TimeSeries.TimeSeriesTable(self.resources)
+        self.system_supply = self.supply_table.get_time_series()
+        self.system_demand = self.demand_table.get_time_series()
+        self.system_consumption = self.consumption_table.get_time_series()
+
+    def set_number_of_time_steps(self, number_of_time_steps: int) -> None:
+        for table in [self.supply_table, self.demand_table, self.consumption_table]:
+            table.set_number_of_time_steps(number_of_time_steps)
 
     def calculate_resilience(self) -> dict:
         self.lack_of_resilience = dict()
@@ -51,6 +76,31 @@ class ReCoDeSResilienceCalculator(ResilienceCalculator):
                 self.system_consumption[resource_name].append(
                     resource_parameters['DistributionModel'].get_total_consumption(scope=self.scope))
 
+    def register_aggregated_values(self, aggregator) -> None:
+        self.aggregated_column_ids = []
+        self.aggregated_keys = []
+        for resource_name in self.resources:
+            if resource_name in aggregator.resources:
+                self.aggregated_column_ids.append(self.supply_table.column_ids[resource_name])
+                self.aggregated_keys.append(aggregator.register_resource_totals(resource_name, self.scope))
+
+    def update_from_aggregator(self, aggregator) -> None:
+        if len(self.aggregated_keys) > 0:
+            supply, demand, consumption = zip(*[aggregator.resource_totals[key] for key in self.aggregated_keys])
+            column_ids = self.aggregated_column_ids
+            self.supply_table.append(column_ids, supply)
+            self.demand_table.append(column_ids, demand)
+            self.consumption_table.append(column_ids, consumption)
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        if len(self.aggregated_keys) > 0:
+            # time step x (supply, demand, consumption) x resource
+            repeated_totals = np.stack([aggregator.get_repeated_resource_totals(key) for key in self.aggregated_keys], axis=2)
+            column_ids = self.aggregated_column_ids
+            self.supply_table.append_rows(column_ids, repeated_totals[:, 0])
+            self.demand_table.append_rows(column_ids, repeated_totals[:, 1])
+            self.consumption_table.append_rows(column_ids, repeated_totals[:, 2])
+
 class NISTGoalsResilienceCalculator(ReCoDeSResilienceCalculator):
 
     def __init__(self, resilience_goals: list) -> None:
@@ -62,6 +112,18 @@ class NISTGoalsResilienceCalculator(ReCoDeSResilienceCalculator):
     def update(self, resources: dict):
         pass
 
+    def register_aggregated_values(self, aggregator) -> None:
+        pass
+
+    def update_from_aggregator(self, aggregator) -> None:
+        pass
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        pass
+
+    def set_number_of_time_steps(self, number_of_time_steps: int) -> None:
+        pass
+
     def calculate_resilience(self):
         pass
 
@@ -80,6 +142,9 @@ class PatientFlowCalculator(ReCoDeSResilienceCalculator):
             self.system_supply[patient_type].append(0)
         for component in components:
             if self.component_in_scope(component):
+                if getattr(component, 'patient_archive', None) is not None:
+                    self.add_archived_patients(component.patient_archive)
+                    continue
                 for patient in component.patients:  
                     if patient.name in self.resources:  
                         self.system_demand[patient.name][-1] += 1                  
@@ -87,6 +152,36 @@ class PatientFlowCalculator(ReCoDeSResilienceCalculator):
                             self.system_consumption[patient.name][-1] += 1
                             self.system_supply[patient.name][-1] += 1 
 
+    def add_archived_patients(self, patient_archive) -> None:
+        # archived patients are updated at EXIT, so they are all treated
+        for patient_type, number_of_patients in patient_archive.exited_patients.items():
+            if patient_type in self.resources:
+                self.system_demand[patient_type][-1] += number_of_patients
+                self.system_consumption[patient_type][-1] += number_of_patients
+                self.system_supply[patient_type][-1] += number_of_patients
+
+    def register_aggregated_values(self, aggregator) -> None:
+        self.patient_scope = aggregator.register_patient_counts(tuple(component_id for component_id, component in enumerate(aggregator.components)
+                                                                      if self.component_in_scope(component)))
+
+    def update_from_aggregator(self, aggregator) -> None:
+        patient_totals = aggregator.patient_totals[self.patient_scope]
+        counts = [patient_totals.get(patient_type, [0, 0, 0]) for patient_type in self.resources]
+        column_ids = [self.demand_table.column_ids[patient_type] for patient_type in self.resources]
+        self.demand_table.append(column_ids, [patients for patients, _, _ in counts])
+        self.consumption_table.append(column_ids, [treated_patients for _, treated_patients, _ in counts])
+        self.supply_table.append(column_ids, [treated_patients for _, treated_patients, _ in counts])
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        # patients only change at the last repeated time step, the time steps before repeat the previous counts
+        counts = np.asarray([[patient_totals.get(patient_type, [0, 0, 0]) for patient_type in self.resources]
+                             for patient_totals in [aggregator.previous_patient_totals[self.patient_scope], aggregator.patient_totals[self.patient_scope]]], dtype=float)
+        counts = counts[[0] * (aggregator.number_of_repeated_time_steps - 1) + [1]]
+        column_ids = [self.demand_table.column_ids[patient_type] for patient_type in self.resources]
+        self.demand_table.append_rows(column_ids, counts[:, :, 0])
+        self.consumption_table.append_rows(column_ids, counts[:, :, 1])
+        self.supply_table.append_rows(column_ids, counts[:, :, 1])
+
 class DeadPatientsCalculator(ResilienceCalculator):
 
     def __init__(self, parameters: dict) -> None:
@@ -98,9 +193,29 @@ class DeadPatientsCalculator(ResilienceCalculator):
         for dead_patients in self.dead_patients.values():
             dead_patients.append(0)
         for component in components:
+            if getattr(component, 'patient_archive', None) is not None:
+                for patient_type, number_of_patients in component.patient_archive.dead_patients.items():
+                    self.dead_patients[patient_type][-1] += number_of_patients
+                continue
             for patient in component.patients:
                 if patient.alive == False:
                     self.dead_patients[patient.name][-1] += 1
+
+    def register_aggregated_values(self, aggregator) -> None:
+        self.patient_scope = aggregator.register_patient_counts(tuple(range(len(aggregator.components))))
+
+    def update_from_aggregator(self, aggregator) -> None:
+        patient_totals = aggregator.patient_totals[self.patient_scope]
+        for patient_type, dead_patients in self.dead_patients.items():
+            dead_patients.append(patient_totals.get(patient_type, [0, 0, 0])[2])
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        # patients only die at the last repeated time step
+        previous_patient_totals = aggregator.previous_patient_totals[self.patient_scope]
+        patient_totals = aggregator.patient_totals[self.patient_scope]
+        for patient_type, dead_patients in self.dead_patients.items():
+            dead_patients += [previous_patient_totals.get(patient_type, [0, 0, 0])[2]] * (aggregator.number_of_repeated_time_steps - 1)
+            dead_patients.append(patient_totals.get(patient_type, [0, 0, 0])[2])
         
     def calculate_resilience(self):
         pass
@@ -109,16 +224,36 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
 
     ONE_DAY = 24 # define what is 24h considering the time step used in the simulation
     OPERATING_THEATER_NAME = 'OperatingTheater'
+    MORTALITY_CALCULATION_METHOD = 'serial_system_failing' # 'only_single_link_failing', 'serial_system_failing'
 
     def __init__(self, parameters: dict) -> None:
         self.scope = parameters['Scope']
         self.resources = parameters['Resources']
         self.measures_of_service = {}
+        # measures of service of archived patients per component, only kept if the calculator is updated during the simulation
+        self.archived_patient_measures = None
+        self.baseline_mortality_rates = {}
 
     def update(self, components: list):
         self.components = components
+        # baseline mortality rates are kept in the compiled patient library, so they are shared by calculators of the system
+        self.baseline_mortality_rates = components[0].compiled_patient_library.baseline_mortality_rates
+
+    def repeat_update_from_aggregator(self, aggregator) -> None:
+        # measures of service are only calculated from the last state of patients
+        self.update_from_aggregator(aggregator)
+
+    def update_from_aggregator(self, aggregator) -> None:
+        self.update(aggregator.components)
+        if self.archived_patient_measures is None:
+            self.archived_patient_measures = {}
+        for component in self.components:
+            if getattr(component, 'patient_archive', None) is not None:
+                self.accumulate_archived_patients(component)
 
     def calculate_resilience(self):
+        if self.archived_patient_measures is not None:
+            return self.calculate_resilience_from_patient_measures()
         self.measures_of_service['MortalityRateBefore24H'] = self.calculate_mortality_rate(self.components, time_interval=[0, self.ONE_DAY])
         self.measures_of_service['MortalityRateAfter24H'] = self.calculate_mortality_rate(self.components, time_interval=[self.ONE_DAY, math.inf])
         self.measures_of_service['AverageLengthOfStay'] = self.calculate_average_length_of_stay(self.components)
@@ -151,16 +286,35 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
         if len(all_patients) == 0:
             return self.calculate_baseline_mortality_rates_for_empty_departments(components)
         else:
-            baseline_mortality_rates = []
-            last_mortality_rates_per_time_step = []
-            for patient in all_patients:
-                mortality_rates_per_time_step = self.get_mortality_rates_per_time_step_during_entire_length_of_stay(patient)
-                if len(baseline_mortality_rates) > 0 and mortality_rates_per_time_step == last_mortality_rates_per_time_step:
-                    baseline_mortality_rates.append(baseline_mortality_rates[-1])
-                else:
-                    baseline_mortality_rates.append(self.get_mortality_rate_during_entire_length_of_stay(mortality_rates_per_time_step))
-                    last_mortality_rates_per_time_step = mortality_rates_per_time_step
-            return np.mean(baseline_mortality_rates)
+            return np.mean([self.get_baseline_mortality_rate(patient) for patient in all_patients])
+
+    def get_baseline_mortality_rate(self, patient: Patient.PatientType) -> float:
+        # the baseline mortality rate only depends on the patient's profile and the scope, so it is calculated once per profile
+        scope = tuple(self.scope) if isinstance(self.scope, list) else self.scope
+        baseline_mortality_rates = self.baseline_mortality_rates
+        key = (patient.name, scope, self.MORTALITY_CALCULATION_METHOD)
+        if key not in baseline_mortality_rates:
+            if self.MORTALITY_CALCULATION_METHOD == 'serial_system_failing':
+                baseline_mortality_rates[key] = self.calculate_baseline_mortality_rate_in_log_space(patient)
+            else:
+                baseline_mortality_rates[key] = self.get_mortality_rate_during_entire_length_of_stay(
+                    self.get_mortality_rates_per_time_step_during_entire_length_of_stay(patient))
+        return baseline_mortality_rates[key]
+
+    def calculate_baseline_mortality_rate_in_log_space(self, patient: Patient.PatientType) -> float:
+        # 1 - prod(1 - mortality rate) over all time steps of the stay, with each department's rate raised to its length of stay
+        if self.scope == ['All']:
+            department_ids = range(len(patient.departments))
+        else:
+            department_ids = [patient.departments.index(department) for department in self.scope]
+        log_probability_of_surviving = 0.0
+        for department_id in department_ids:
+            mortality_rate = patient.mortality_rates[department_id]
+            if mortality_rate >= 1 and patient.lengths_of_stay[department_id] > 0:
+                return 1.0
+            elif mortality_rate > 0:
+                log_probability_of_surviving += patient.lengths_of_stay[department_id] * math.log1p(-mortality_rate)
+        return -math.expm1(log_probability_of_surviving)
         
     def calculate_mortality_rate_based_on_recorded_data(self, components: list, time_interval: list) -> float:
         all_patients = self.collect_all_patients(components, time_interval=[0, math.inf])
@@ -229,7 +383,7 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
         return mortality_rates_per_time_step
     
     def get_mortality_rate_during_entire_length_of_stay(self, mortality_rates_per_time_step: list) -> float:   
-        CALCULATION_METHOD = 'serial_system_failing' # 'only_single_link_failing', 'serial_system_failing'
+        CALCULATION_METHOD = self.MORTALITY_CALCULATION_METHOD
         if CALCULATION_METHOD == 'only_single_link_failing':
             # Calculated as probability of a single link failing in a serial system and other links not failing
             total_prob_of_dying = 0
@@ -271,14 +425,23 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
         surgeries_performed = 0
         surgeries_cancelled = 0
         for patient in all_patients:
-            for department_info in patient.flow:
-                if department_info['Department'] == self.OPERATING_THEATER_NAME:
-                    if len(department_info['TimeStepTreated']) == patient.lengths_of_stay[patient.flow.index(department_info)]:
-                        surgeries_performed += 1
-                    elif self.patient_exits_hospital(patient):
-                        surgeries_cancelled += 1
-                    break
+            surgery_performed = self.check_if_surgery_performed(patient)
+            if surgery_performed == True:
+                surgeries_performed += 1
+            elif surgery_performed == False:
+                surgeries_cancelled += 1
         return surgeries_performed, surgeries_cancelled
+
+    def check_if_surgery_performed(self, patient: Patient.PatientType):
+        # True if the surgery is performed, False if it is cancelled and None if the patient is still waiting or not operated
+        for department_info in patient.flow:
+            if department_info['Department'] == self.OPERATING_THEATER_NAME:
+                if len(department_info['TimeStepTreated']) == patient.lengths_of_stay[patient.flow.index(department_info)]:
+                    return True
+                elif self.patient_exits_hospital(patient):
+                    return False
+                break
+        return None
     
     def patient_exits_hospital(self, patient: Patient.PatientType) -> bool:
         if patient.flow[-1]['Department'] == patient.EXIT and len(patient.flow[-1]['TimeStepAtDepartment']) > 0:
@@ -291,19 +454,21 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
         all_patients = []
         for component in components:
             for patient in component.patients:
-                if self.patient_type_considered(patient):
-                    if self.scope == ['All']:
-                        if time_interval[0] <= self.calculate_length_of_stay(patient, scope=['All']) < time_interval[1]:
-                            all_patients.append(patient)
-                    else:
-                        for department_info in patient.flow:
-                            if department_info['Department'] in self.scope:
-                                if len(department_info['TimeStepAtDepartment']) > 0:
-                                    if time_interval[0] <= self.calculate_length_of_stay(patient, scope=['All']) < time_interval[1]:
-                                        all_patients.append(patient)
-                                    break                        
-                     
+                if self.patient_type_considered(patient) and self.patient_admitted(patient):
+                    if time_interval[0] <= self.calculate_length_of_stay(patient, scope=['All']) < time_interval[1]:
+                        all_patients.append(patient)
         return all_patients
+
+    def patient_admitted(self, patient: Patient.PatientType, scope=None) -> bool:
+        # patients are admitted to a department once they spend a time step there
+        if scope is None:
+            scope = self.scope
+        if scope == ['All']:
+            return True
+        for department_info in patient.flow:
+            if department_info['Department'] in scope:
+                return len(department_info['TimeStepAtDepartment']) > 0
+        return False
     
     def calculate_length_of_stay(self, patient: Patient.PatientType, scope=None) -> int:
         if scope is None:
@@ -313,6 +478,106 @@ class HospitalMeasureOfServiceCalculator(ResilienceCalculator):
             if (department_info['Department'] in scope or scope == ['All']) and not(department_info['Department'] == patient.EXIT):
                 length_of_stay += len(department_info['TimeStepAtDepartment'])
         return length_of_stay
+
+    def initialize_patient_measures(self) -> dict:
+        # sums of the measures of admitted patients, averaged over the number of admitted patients
+        # mortality rates are summed in partials as in math.fsum, so the averages do not depend on the order in which patients are added
+        return {'NumberOfPatients': 0, 'NumberOfAdmittedPatients': 0, 'BaselineMortalityRate': [], 'MortalityRateBefore24H': [],
+                'MortalityRateAfter24H': [], 'LengthOfStay': 0, 'SurgeriesPerformed': 0, 'SurgeriesCancelled': 0}
+
+    @staticmethod
+    def add_to_partials(partials: list, value: float) -> None:
+        # partials are floats whose sum is exactly the sum of the added values, rounded once by math.fsum
+        value = float(value)
+        number_of_partials = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[number_of_partials] = low
+                number_of_partials += 1
+            value = high
+        partials[number_of_partials:] = [value]
+
+    def accumulate_patient_measures(self, patient: Patient.PatientType, patient_measures: dict) -> None:
+        if self.patient_type_considered(patient):
+            self.add_patient_measures(patient, patient_measures)
+
+    def add_patient_measures(self, patient: Patient.PatientType, patient_measures: dict) -> None:
+        if self.patient_admitted(patient):
+            patient_measures['NumberOfAdmittedPatients'] += 1
+            self.add_to_partials(patient_measures['BaselineMortalityRate'], self.get_baseline_mortality_rate(patient))
+            self.add_to_partials(patient_measures['MortalityRateBefore24H'], self.get_mortality_rate_during_entire_length_of_stay(
+                self.get_mortality_rates_record(patient, [0, self.ONE_DAY])))
+            self.add_to_partials(patient_measures['MortalityRateAfter24H'], self.get_mortality_rate_during_entire_length_of_stay(
+                self.get_mortality_rates_record(patient, [self.ONE_DAY, math.inf])))
+            patient_measures['LengthOfStay'] += self.calculate_length_of_stay(patient)
+        if (self.OPERATING_THEATER_NAME in self.scope or self.scope == ['All']) and self.patient_admitted(patient, scope=[self.OPERATING_THEATER_NAME]):
+            surgery_performed = self.check_if_surgery_performed(patient)
+            if surgery_performed == True:
+                patient_measures['SurgeriesPerformed'] += 1
+            elif surgery_performed == False:
+                patient_measures['SurgeriesCancelled'] += 1
+
+    def accumulate_archived_patients(self, component: Component.HospitalComponent) -> dict:
+        """
+        Add the measures of service of newly archived patients to the sums per patient type kept in the patient archive and return them.
+        Archived patients do not change anymore, so their measures are added once, after their first time step at EXIT.
+        The measures only depend on the scope, so the sums are shared by all calculators with the same scope.
+        """
+        patient_archive = component.patient_archive
+        scope = tuple(self.scope) if isinstance(self.scope, list) else self.scope
+        key = (scope, self.ONE_DAY, self.MORTALITY_CALCULATION_METHOD)
+        archived_patient_measures = patient_archive.patient_measures.get(key)
+        if archived_patient_measures is None:
+            archived_patient_measures = {'NumberOfPatients': 0, 'PatientTypes': {}}
+            patient_archive.patient_measures[key] = archived_patient_measures
+        patient_type_measures = archived_patient_measures['PatientTypes']
+        for patient in patient_archive.patients[archived_patient_measures['NumberOfPatients']:patient_archive.number_of_updated_patients]:
+            patient_measures = patient_type_measures.get(patient.name)
+            if patient_measures is None:
+                patient_measures = self.initialize_patient_measures()
+                patient_type_measures[patient.name] = patient_measures
+            self.add_patient_measures(patient, patient_measures)
+        archived_patient_measures['NumberOfPatients'] = max(archived_patient_measures['NumberOfPatients'], patient_archive.number_of_updated_patients)
+        self.archived_patient_measures[component.name] = archived_patient_measures
+        return archived_patient_measures
+
+    def calculate_resilience_from_patient_measures(self) -> dict:
+        """
+        Calculate the measures of service from the summed measures of archived patients and of patients that are still in the hospital.
+        """
+        patient_measures = self.initialize_patient_measures()
+        for component in self.components:
+            if getattr(component, 'patient_archive', None) is not None:
+                archived_patient_measures = self.accumulate_archived_patients(component)
+                for patient_type, patient_type_measures in archived_patient_measures['PatientTypes'].items():
+                    if self.resources == ['All'] or patient_type in self.resources:
+                        # partials of mortality rates are concatenated, which keeps their sum exact
+                        for measure_name, measure in patient_type_measures.items():
+                            patient_measures[measure_name] += measure
+                patients = component.patient_archive.patients[archived_patient_measures['NumberOfPatients']:]
+            else:
+                patients = component.patients
+            for patient in patients:
+                self.accumulate_patient_measures(patient, patient_measures)
+
+        number_of_admitted_patients = patient_measures['NumberOfAdmittedPatients']
+        if number_of_admitted_patients == 0:
+            baseline_mortality_rate = self.calculate_baseline_mortality_rates_for_empty_departments(self.components)
+            self.measures_of_service['MortalityRateBefore24H'] = baseline_mortality_rate
+            self.measures_of_service['MortalityRateAfter24H'] = baseline_mortality_rate
+            self.measures_of_service['AverageLengthOfStay'] = 0
+        else:
+            baseline_mortality_rate = math.fsum(patient_measures['BaselineMortalityRate']) / number_of_admitted_patients
+            self.measures_of_service['MortalityRateBefore24H'] = max(baseline_mortality_rate, math.fsum(patient_measures['MortalityRateBefore24H']) / number_of_admitted_patients)
+            self.measures_of_service['MortalityRateAfter24H'] = max(baseline_mortality_rate, math.fsum(patient_measures['MortalityRateAfter24H']) / number_of_admitted_patients)
+            self.measures_of_service['AverageLengthOfStay'] = patient_measures['LengthOfStay'] / number_of_admitted_patients
+        self.measures_of_service['SurgeriesPerformed'] = patient_measures['SurgeriesPerformed']
+        self.measures_of_service['SurgeriesCancelled'] = patient_measures['SurgeriesCancelled']
+        return self.measures_of_service
     
 class CauseOfDeathCalculator(HospitalMeasureOfServiceCalculator):
 
@@ -322,6 +587,9 @@ class CauseOfDeathCalculator(HospitalMeasureOfServiceCalculator):
     NOTE: List all patient types that are considered in the resources parameter in the system configuration file.
     """
 
+    def update_from_aggregator(self, aggregator) -> None:
+        self.update(aggregator.components)
+
     def calculate_resilience(self):
         if self.resources == ['All']:
             patient_types = list(self.components[0].patient_library.keys())
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from pyrecodes_hospitals import Relation
+import numpy as np
 
 class Resource(ABC):
     name: str
@@ -81,7 +82,17 @@ class ConsumableResource(ConcreteResource):
     """
 
     def update_supply_based_on_consumption(self, consumption: float) -> None:
-        self.current_amount = max(0, self.current_amount - consumption)
+        self.current_amount = self.get_amount_after_consumption(self.current_amount, consumption)
+
+    def get_amount_after_consumption(self, amount: float, consumption: float) -> float:
+        return max(0, amount - consumption)
+
+    def get_amounts_after_consumption(self, amount: float, consumption: float, number_of_time_steps: int) -> np.ndarray:
+        """
+        Return the amounts after each of the given number of time steps with the same consumption.
+        Cumulative sums subtract the consumption one time step after another, so the amounts are the same as after repeated updates.
+        """
+        return np.maximum(0, np.cumsum([amount] + [-consumption] * number_of_time_steps)[1:])
     
     def update_based_on_component_functionality(self, component_functionality_level: float) -> None:
         # Not sure what should happen with consumable resources when the functionality of the component changes
@@ -100,11 +111,14 @@ class TimeStepsOfAutonomyResource(ConsumableResource):
     def update_based_on_unmet_demand(self, resource_name: str, percent_of_met_demand: float) -> None:
         pass
 
-    def update_supply_based_on_consumption(self, consumption: float) -> None:
+    def get_amount_after_consumption(self, amount: float, consumption: float) -> float:
         """
-        Method is assumed to be called at each time step, so it reduces the current amount (time steps of autonomy) by 1.
+        Method is assumed to be called at each time step, so it reduces the amount (time steps of autonomy) by 1.
         """
-        self.current_amount = max(0, self.current_amount - 1)
+        return max(0, amount - 1)
+
+    def get_amounts_after_consumption(self, amount: float, consumption: float, number_of_time_steps: int) -> np.ndarray:
+        return super().get_amounts_after_consumption(amount, 1, number_of_time_steps)
 
 class MinMaxConstrainedResource(ConcreteResource):
     """
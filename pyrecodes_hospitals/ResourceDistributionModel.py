@@ -4,6 +4,7 @@ import numpy as np
 import math
 import copy
 import json
+import heapq
 import itertools 
 from pyrecodes_hospitals import Component
 from pyrecodes_hospitals import DistributionPriority
@@ -26,6 +27,30 @@ class ResourceDistributionModel(ABC):
     def get_total_consumption(self, scope: str) -> float:
         pass
 
+    def get_totals(self, scope: str) -> tuple:
+        return self.get_total_supply(scope), self.get_total_demand(scope), self.get_total_consumption(scope)
+
+    def get_repeated_totals(self, scope: str, supply_amounts: list) -> np.ndarray:
+        """
+        Return the supply, demand and consumption of the scope at each repeated time step, one row per time step, if the last distribution is repeated
+        while the supply of components changes to the given amounts ((component, amounts per time step) pairs).
+        By default, the totals are those of the last time step, as the distribution is only repeated while supply does not change it.
+        """
+        number_of_time_steps = len(supply_amounts[0][1]) if len(supply_amounts) > 0 else 1
+        return np.tile(self.get_totals(scope), (number_of_time_steps, 1))
+
+    def get_demand_met(self) -> np.ndarray:
+        """Return the fractions of met demand after the last distribution, or None if the model does not record them."""
+        return None
+
+    def repeat_last_distribution(self) -> None:
+        """Set the result of the last distribution again, when supply and demand did not change in a way that changes it. By default, the resource is distributed again."""
+        self.distribute()
+
+    def distribution_unchanged_by_supply(self, supply: float, changed_supply: float) -> bool:
+        """Return True if the resource is distributed in the same way when the supply of a supplier changes from supply to changed_supply."""
+        return supply == changed_supply
+
 class ResourceDistributionModelConstructor(ABC):
 
     @abstractmethod
@@ -72,6 +97,8 @@ class SingleResourceSystemMatrixCreator():
     matrix: np.ndarray
     NUM_COLUMN_SETS = 5  # start_locality/end_locality/supply/demand/demand_met
     ROWS_PER_COMPONENT = 2  # operation demand/recovery demand
+    # if set, the matrix is a view of the multi-resource system matrix
+    multi_resource_system_matrix = None
 
     def __init__(self, components: list([Component.Component]), resource_name: str):
         self.components = components
@@ -98,6 +125,9 @@ class SingleResourceSystemMatrixCreator():
         return self.NUM_COLUMN_SETS
 
     def fill_system_matrix(self):
+        if self.multi_resource_system_matrix is not None and self.multi_resource_system_matrix.filled:
+            self.multi_resource_system_matrix.update_resource_matrix(self.resource_name)
+            return
         for row, component in enumerate(self.components):
             self.fill_operation_demand_row(row, component)
             self.fill_recovery_demand_row(row, component)
@@ -141,6 +171,75 @@ class SingleResourceSystemMatrixCreator():
     def update_components(self, components: list([Component.Component])) -> None:
         self.components = components
 
+class MultiResourceSystemMatrixCreator(SingleResourceSystemMatrixCreator):
+    """
+    Class to keep the system matrices of several resources in a single resource x row x column array.
+
+    The array is filled in one pass over components before resources are distributed, and the matrix of each resource is a view of it.
+    Demand and localities do not change while resources are distributed, but unmet demand for a resource can reduce the supply of others,
+    so the supply of a resource is read again just before the resource is distributed.
+    """
+
+    def __init__(self, components: list([Component.Component]), system_matrices: dict) -> None:
+        self.components = components
+        self.RECOVERY_DEMAND_ROW_OFFSET = len(components)
+        self.set_system_matrix_column_ids()
+        self.system_matrices = system_matrices
+        self.resource_ids = {resource_name: resource_id for resource_id, resource_name in enumerate(system_matrices)}
+        self.matrix = np.zeros((len(self.resource_ids), self.calculate_num_rows_in_system_matrix(), self.calculate_num_columns_in_system_matrix()))
+        self.filled = False
+        for system_matrix in system_matrices.values():
+            system_matrix.multi_resource_system_matrix = self
+        self.set_resource_matrices()
+
+    def set_resource_matrices(self) -> None:
+        for resource_name, system_matrix in self.system_matrices.items():
+            system_matrix.matrix = self.matrix[self.resource_ids[resource_name]]
+
+    def fill_system_matrix(self) -> None:
+        self.set_resource_matrices()
+        self.matrix[:, :, self.SUPPLY_COL_ID] = 0.0
+        self.matrix[:, :, self.DEMAND_COL_ID] = 0.0
+        self.matrix[:, :, self.DEMAND_MET_COL_ID] = self.get_initial_demand_met_indicator()
+        # (resource id, row, amount) of all supply and demand, and the supply of each resource per row to read it again before distribution
+        supply_amounts = []
+        demand = []
+        self.supply_rows = [[] for _ in self.resource_ids]
+        localities = []
+        for row, component in enumerate(self.components):
+            locality = component.get_locality()
+            localities.append([locality[0], locality[-1]])
+            supply = component.supply[Component.StandardiReCoDeSComponent.SupplyTypes.SUPPLY.value]
+            for resource_name, resource in supply.items():
+                resource_id = self.resource_ids.get(resource_name)
+                if resource_id is not None:
+                    self.supply_rows[resource_id].append((row, supply))
+                    supply_amounts.append((resource_id, row, resource.current_amount))
+            for demand_type, row_offset in [(Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value, 0),
+                                            (Component.StandardiReCoDeSComponent.DemandTypes.RECOVERY_DEMAND.value, self.RECOVERY_DEMAND_ROW_OFFSET)]:
+                for resource_name, resource in component.demand[demand_type].items():
+                    resource_id = self.resource_ids.get(resource_name)
+                    if resource_id is not None:
+                        demand.append((resource_id, row + row_offset, resource.current_amount))
+        if len(localities) > 0:
+            localities = np.asarray(localities, dtype=float)
+            for row_offset in [0, self.RECOVERY_DEMAND_ROW_OFFSET]:
+                self.matrix[:, row_offset:row_offset + len(localities), self.START_LOCALITY_COL_ID] = localities[:, 0]
+                self.matrix[:, row_offset:row_offset + len(localities), self.END_LOCALITY_COL_ID] = localities[:, 1]
+        for amounts, column_id in [(supply_amounts, self.SUPPLY_COL_ID), (demand, self.DEMAND_COL_ID)]:
+            if len(amounts) > 0:
+                resource_ids, rows, amounts = zip(*amounts)
+                self.matrix[list(resource_ids), list(rows), column_id] = amounts
+        self.filled = True
+
+    def update_resource_matrix(self, resource_name: str) -> None:
+        resource_id = self.resource_ids[resource_name]
+        resource_matrix = self.matrix[resource_id]
+        resource_matrix[:, self.DEMAND_MET_COL_ID] = self.get_initial_demand_met_indicator()
+        supply_rows = self.supply_rows[resource_id]
+        if len(supply_rows) > 0:
+            resource_matrix[[row for row, _ in supply_rows], self.SUPPLY_COL_ID] = [supply[resource_name].current_amount for _, supply in supply_rows]
+
 class UtilityDistributionModel(ResourceDistributionModel):
     components: list([Component.Component])
     resource_name: str
@@ -151,11 +250,30 @@ class UtilityDistributionModel(ResourceDistributionModel):
         self.constructor = UtilityDistributionModelConstructor()
         self.constructor.construct(resource_name, resource_parameters, components, self)
         self.transfer_service_distribution_model = None #consider moving this into the constructor or finding a better solution-the point is to have an initial value for this property
+        self.compiled_scopes = {}
+        # inputs and unmet demand of the last distribution, reused if the inputs do not change
+        self.distribution_inputs = None
+        self.unmet_demand = []
+        self.number_of_distributions = 0
+        self.number_of_skipped_distributions = 0
 
     def distribute(self):
         self.fill_system_matrix()
+        if self.transfer_service_distribution_model is not None:
+            self.transfer_service_distribution_model.update_optimal_paths()
+
+        self.number_of_distributions += 1
+        if self.distribution_inputs_unchanged():
+            self.number_of_skipped_distributions += 1
+            self.set_unmet_demand_of_previous_distribution()
+            return
+        self.unmet_demand = []
+
+        component_priorities_by_row, component_demand_types = self.get_component_priorities()
 
-        component_priorities_by_row, component_demand_types = self.get_component_priorities()    
+        if self.supply_can_be_allocated_using_prefix_sums(component_priorities_by_row):
+            self.allocate_supply_using_prefix_sums(component_priorities_by_row, component_demand_types)
+            return
 
         suppliers = []
         for component_row_id, component_demand_type in zip(component_priorities_by_row, component_demand_types):
@@ -169,6 +287,84 @@ class UtilityDistributionModel(ResourceDistributionModel):
         self.system_matrix.update_components(self.components)
         self.system_matrix.fill_system_matrix()
 
+    def repeat_last_distribution(self) -> None:
+        """
+        Override parent method by filling the system matrix and setting the unmet demand of the last distribution without distributing the resource.
+        """
+        self.fill_system_matrix()
+        self.set_unmet_demand_of_previous_distribution()
+
+    def distribution_unchanged_by_supply(self, supply: float, changed_supply: float) -> bool:
+        """
+        Override parent method: without transfer services, a supplier whose supply exceeds the total demand meets the demand of every component
+        it supplies, whatever its supply. Supply must also stay an integer or not, which decides how supply is allocated (see supply_can_be_allocated_using_prefix_sums).
+        """
+        if supply == changed_supply:
+            return True
+        if self.transfer_service_distribution_model is not None:
+            return False
+        amounts = self.system_matrix.matrix[:, [self.system_matrix.SUPPLY_COL_ID, self.system_matrix.DEMAND_COL_ID]]
+        total_demand = np.sum(amounts[:, 1])
+        return bool(min(supply, changed_supply) > total_demand and float(supply).is_integer() == float(changed_supply).is_integer() and
+                    np.sum(np.abs(amounts)) + max(supply, changed_supply) < 2 ** 53)
+
+    def get_demand_met(self) -> np.ndarray:
+        return self.system_matrix.matrix[:, self.system_matrix.DEMAND_MET_COL_ID].copy()
+
+    def distribution_inputs_unchanged(self) -> bool:
+        """
+        The distribution only depends on components' supply and demand in the system matrix and on links' supply of the transfer service,
+        as priorities and localities do not change. Inputs are compared to the inputs of the last distribution and stored.
+        """
+        distribution_inputs = (self.system_matrix.matrix[:, [self.system_matrix.SUPPLY_COL_ID, self.system_matrix.DEMAND_COL_ID]].copy(),
+                               getattr(self.transfer_service_distribution_model, 'link_supplies', None))
+        inputs_unchanged = self.distribution_inputs is not None and \
+                           np.array_equal(distribution_inputs[0], self.distribution_inputs[0]) and \
+                           distribution_inputs[1] == self.distribution_inputs[1]
+        self.distribution_inputs = distribution_inputs
+        return inputs_unchanged
+
+    def set_unmet_demand_of_previous_distribution(self) -> None:
+        # components' and patients' state is updated at each time step, so the unmet demand is set again
+        for component_row_id, percent_of_met_demand, component_demand_type in self.unmet_demand:
+            self.apply_unmet_demand(component_row_id, percent_of_met_demand, component_demand_type)
+
+    def set_unmet_demand(self, component_row_id: int, percent_of_met_demand: float, component_demand_type: str) -> None:
+        self.unmet_demand.append((component_row_id, percent_of_met_demand, component_demand_type))
+        self.apply_unmet_demand(component_row_id, percent_of_met_demand, component_demand_type)
+
+    def apply_unmet_demand(self, component_row_id: int, percent_of_met_demand: float, component_demand_type: str) -> None:
+        self.set_demand_met_indicator(component_row_id, percent_of_met_demand)
+        if component_demand_type == Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value:
+            self.reduce_component_supply(component_row_id, percent_of_met_demand)
+        elif component_demand_type == Component.StandardiReCoDeSComponent.DemandTypes.RECOVERY_DEMAND.value:
+            self.set_unmet_demand_for_recovery_activities(component_row_id, percent_of_met_demand)
+
+    def supply_can_be_allocated_using_prefix_sums(self, component_row_ids: list) -> bool:
+        """
+        Without transfer services, every supplier can deliver to every component, so only the amount of supply left matters.
+        Cumulative sums give the same result as distributing supply component by component only if they are exact,
+        i.e., if all supply and demand amounts are integers.
+        """
+        if self.transfer_service_distribution_model is not None:
+            return False
+        amounts = self.system_matrix.matrix[component_row_ids][:, [self.system_matrix.SUPPLY_COL_ID, self.system_matrix.DEMAND_COL_ID]]
+        return bool(np.all(np.mod(amounts, 1) == 0) and np.sum(np.abs(amounts)) < 2 ** 53)
+
+    def allocate_supply_using_prefix_sums(self, component_row_ids: list, component_demand_types: list) -> None:
+        component_row_ids = np.asarray(component_row_ids, dtype=int)
+        supply = np.maximum(self.system_matrix.matrix[component_row_ids, self.system_matrix.SUPPLY_COL_ID], 0.0)
+        demand = np.maximum(self.system_matrix.matrix[component_row_ids, self.system_matrix.DEMAND_COL_ID], 0.0)
+        # supply left after each component is max(0, supply left before + supply - demand), which is a running minimum of cumulative sums
+        cumulative_supply_surplus = np.cumsum(supply - demand)
+        supply_left = cumulative_supply_surplus - np.minimum(np.minimum.accumulate(cumulative_supply_surplus), 0.0)
+        available_supply = np.concatenate(([0.0], supply_left[:-1])) + supply
+        component_demand_after_distribution = demand - available_supply
+        for priority_id in np.flatnonzero(component_demand_after_distribution > 0.0):
+            component_row_id = int(component_row_ids[priority_id])
+            percent_of_met_demand = float(1 - (component_demand_after_distribution[priority_id] / demand[priority_id]))
+            self.set_unmet_demand(component_row_id, percent_of_met_demand, component_demand_types[priority_id])
+
     def get_component_priorities(self):
         component_priorities_id, component_demand_types = self.priority.get_component_priorities()
         component_row_in_system_matrix = self.set_component_row_based_on_demand_type(component_priorities_id,
@@ -213,11 +409,7 @@ class UtilityDistributionModel(ResourceDistributionModel):
 
             if component_demand_after_distribution > 0.0:
                 percent_of_met_demand = 1 - (component_demand_after_distribution / component_demand)
-                self.set_demand_met_indicator(component_row_id, percent_of_met_demand)
-                if component_demand_type == Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value:
-                    self.reduce_component_supply(component_row_id, percent_of_met_demand)
-                elif component_demand_type == Component.StandardiReCoDeSComponent.DemandTypes.RECOVERY_DEMAND.value:
-                    self.set_unmet_demand_for_recovery_activities(component_row_id, percent_of_met_demand)     
+                self.set_unmet_demand(component_row_id, percent_of_met_demand, component_demand_type)
 
         return suppliers
 
@@ -318,18 +510,27 @@ class UtilityDistributionModel(ResourceDistributionModel):
         else:
             return math.inf, None
     
-    def get_scope(self, scope=['All']) -> list:
+    def get_scope(self, scope=['All']) -> np.ndarray:
+        # rows of a scope only depend on components' names and localities, so they are compiled once per scope
+        scope_key = tuple(scope) if isinstance(scope, list) else scope
+        component_rows = self.compiled_scopes.get(scope_key)
+        if component_rows is None:
+            component_rows = self.compile_scope(scope)
+            self.compiled_scopes[scope_key] = component_rows
+        return component_rows
+
+    def compile_scope(self, scope: list) -> np.ndarray:
         if scope == ['All']:
-            return list(range(self.system_matrix.matrix.shape[0]))
+            return np.arange(self.system_matrix.matrix.shape[0])
         elif "Locality" in scope:
             locality_id = int(scope[-1])
-            component_rows_in_locality = np.where(np.logical_or(self.system_matrix.matrix[:, self.system_matrix.START_LOCALITY_COL_ID] == locality_id, 
-                                                  self.system_matrix.matrix[:, self.system_matrix.END_LOCALITY_COL_ID] == locality_id))
-            return component_rows_in_locality
+            # operation and recovery demand rows of components that start or end in the locality
+            component_localities = [component.get_locality() for component in self.components] * self.system_matrix.ROWS_PER_COMPONENT
+            return np.asarray([row for row, locality in enumerate(component_localities) if locality[0] == locality_id or locality[-1] == locality_id], dtype=int)
         # TODO: Fix this, it's vague. Anything can be in a list. Use a dict instead.
         elif isinstance(scope, list):
             # TODO: This assumes that the order of components in the system matrix is the same as the order of components in the self.components.
-            return [i for i, component in enumerate(self.components) if component.name in scope]
+            return np.asarray([i for i, component in enumerate(self.components) if component.name in scope], dtype=int)
         else:
             raise ValueError('Scope of the Re-CoDeS Resilience Calculator not well defined: All or Locality X or List of Departments.')
 
@@ -355,6 +556,35 @@ class UtilityDistributionModel(ResourceDistributionModel):
             return np.sum(np.multiply(self.system_matrix.matrix[components_to_include, self.system_matrix.DEMAND_COL_ID],
                                   self.system_matrix.matrix[components_to_include, self.system_matrix.DEMAND_MET_COL_ID]))
 
+    def get_totals(self, scope: str) -> tuple:
+        # supply, demand and consumption of the scope, selecting the scope's rows only once
+        components_to_include = self.get_scope(scope)
+        if len(components_to_include) == 0:
+            return 0.0, 0.0, 0.0
+        rows = self.system_matrix.matrix[components_to_include]
+        demand = rows[:, self.system_matrix.DEMAND_COL_ID]
+        return (np.sum(rows[:, self.system_matrix.SUPPLY_COL_ID]), np.sum(demand),
+                np.sum(np.multiply(demand, rows[:, self.system_matrix.DEMAND_MET_COL_ID])))
+
+    def get_repeated_totals(self, scope: str, supply_amounts: list) -> np.ndarray:
+        """
+        Override parent method: only the supply column of the system matrix changes, so the supply of the scope is summed for all time steps at once.
+        Rows are summed in the same order as the scope's rows, so the totals are the same as if the matrix were filled at each time step.
+        """
+        totals = super().get_repeated_totals(scope, supply_amounts)
+        components_to_include = self.get_scope(scope)
+        if len(components_to_include) == 0 or len(supply_amounts) == 0:
+            return totals
+        scope_positions = {row: position for position, row in enumerate(components_to_include.tolist())}
+        supply = np.tile(self.system_matrix.matrix[components_to_include, self.system_matrix.SUPPLY_COL_ID], (len(totals), 1))
+        component_rows = {id(component): row for row, component in enumerate(self.components)}
+        for supplier, amounts in supply_amounts:
+            position = scope_positions.get(component_rows.get(id(supplier)))
+            if position is not None:
+                supply[:, position] = amounts
+        totals[:, 0] = np.sum(supply, axis=1)
+        return totals
+
 
 class TimeStepsOfAutonomyDistributionModel(ResourceDistributionModel):
     """
@@ -367,6 +597,7 @@ class TimeStepsOfAutonomyDistributionModel(ResourceDistributionModel):
         self.constructor = ConcreteResourceDistributionModelConstructor()
         self.constructor.construct(resource_name, resource_parameters, components, self)
         self.transfer_service_distribution_model = None
+        self.compiled_scopes = {}
         self.find_suppliers()
     
     def find_suppliers(self):
@@ -378,6 +609,10 @@ class TimeStepsOfAutonomyDistributionModel(ResourceDistributionModel):
     def distribute(self) -> None:
         supply_exists = self.check_if_supply_exists()
         self.update_user_operation_demand(supply_exists)
+
+    def distribution_unchanged_by_supply(self, supply: float, changed_supply: float) -> bool:
+        # only whether there is supply matters
+        return (supply > 0) == (changed_supply > 0)
         
     def check_if_supply_exists(self):
         supply_exists = False
@@ -394,6 +629,12 @@ class TimeStepsOfAutonomyDistributionModel(ResourceDistributionModel):
                 component.update_supply_based_on_unmet_demand(self.resource_name, percent_of_met_demand=0)
 
     def get_scope(self, scope=['All']) -> list:
+        scope_key = tuple(scope) if isinstance(scope, list) else scope
+        if scope_key not in self.compiled_scopes:
+            self.compiled_scopes[scope_key] = self.compile_scope(scope)
+        return self.compiled_scopes[scope_key]
+
+    def compile_scope(self, scope: list) -> list:
         if scope == ['All']:
             return self.components
         elif isinstance(scope, list):
@@ -418,7 +659,74 @@ class TimeStepsOfAutonomyDistributionModel(ResourceDistributionModel):
     def get_total_consumption(self, scope: str) -> float:
         return min(self.get_total_supply(scope), self.get_total_demand(scope))
 
-class TransferServiceDistributionModelPotentialPathSets(ResourceDistributionModel): 
+class TransferServiceDistributionModel(ResourceDistributionModel):
+    """
+    Abstract class for transfer services, which provide paths between localities to utility resources.
+
+    Optimal paths are cached per locality pair and the cache is cleared when the transfer service supply of any link changes.
+    """
+    components: list([Component.Component])
+    resource_name: str
+    links: list([Component.Component])
+    optimal_paths: dict
+
+    @abstractmethod
+    def set_links(self) -> None:
+        pass
+
+    @abstractmethod
+    def find_optimal_path(self, start_locality: int, end_locality: int) -> tuple:
+        pass
+
+    def distribute(self):
+        """Distribute method updates the potential paths between all locality pairs.
+        This is done implicitly when using the potential path sets,
+        as components' transfer service supply is updated in the system class.
+        Optimal paths found in the previous time step are discarded if links' supply changed. """
+        self.update_optimal_paths()
+
+    def update_optimal_paths(self) -> None:
+        """Clear the cache of optimal paths if the transfer service supply of any link changed since it was filled."""
+        link_supplies = [self.get_link_supply(link) for link in self.links]
+        if link_supplies != self.link_supplies:
+            self.link_supplies = link_supplies
+            self.reset_optimal_paths()
+
+    def reset_optimal_paths(self) -> None:
+        self.optimal_paths = {}
+
+    def get_optimal_path(self, start_locality: int, end_locality: int) -> tuple:
+        """Method returns the optimal path between two localities.
+            Optimal paths are cached per locality pair, as links' supply does not change while a resource is distributed."""
+        locality_pair = (int(start_locality), int(end_locality))
+        optimal_path = self.optimal_paths.get(locality_pair, None)
+        if optimal_path is None:
+            optimal_path = self.find_optimal_path(*locality_pair)
+            self.optimal_paths[locality_pair] = optimal_path
+        return optimal_path
+
+    def get_path_supply(self, path: list([Component.Component])) -> float:
+        """Get the supply capacity of a path as the minimum of links supply."""    
+        return min([self.get_link_supply(link) for link in path])
+
+    def get_link_supply(self, link: Component.Component) -> float:
+        return link.get_current_resource_amount(Component.SupplyOrDemand.SUPPLY.value, 
+                                                Component.StandardiReCoDeSComponent.SupplyTypes.SUPPLY.value, 
+                                                self.resource_name)
+
+    def get_total_supply(self, scope: str) -> float:
+        print(f'System supply for transfer service {self.resource_name} not defined yet.')
+        return None
+
+    def get_total_demand(self, scope: str) -> float:
+        print(f'System demand for transfer service {self.resource_name} not defined yet.')
+        return None
+
+    def get_total_consumption(self, scope: str) -> float:
+        print(f'System consumption for transfer service {self.resource_name} not defined yet.')   
+        return None
+
+class TransferServiceDistributionModelPotentialPathSets(TransferServiceDistributionModel): 
     components: list([Component.Component])
     resource_name: str
     potential_paths: dict
@@ -428,6 +736,9 @@ class TransferServiceDistributionModelPotentialPathSets(ResourceDistributionMode
         self.constructor.construct(resource_name, resource_parameters, components, self)
         self.set_potential_paths(resource_parameters["PathSetsFile"])
         self.create_potential_paths() 
+        self.set_links()
+        self.optimal_paths = {}
+        self.link_supplies = None
 
     def set_potential_paths(self, filename: str):
         with open(filename, 'r') as file:
@@ -467,13 +778,16 @@ class TransferServiceDistributionModelPotentialPathSets(ResourceDistributionMode
                 self.potential_paths[path_string][-1].append(component)
                 break
 
-    def distribute(self):
-        """Distribute method updates the potential paths between all locality pairs.
-        This is done implicitly when using the potential path sets,
-        as components' transfer service supply is updated in the system class. """
-        pass                                                                                    
-                        
-    def get_optimal_path(self, start_locality: int, end_locality: int) -> tuple:
+    def set_links(self) -> None:
+        """Set the list of distinct links used in potential paths."""
+        links = {}
+        for potential_path_links in self.potential_paths.values():
+            for path in potential_path_links:
+                for link in path:
+                    links[id(link)] = link
+        self.links = list(links.values())
+
+    def find_optimal_path(self, start_locality: int, end_locality: int) -> tuple:
         """Method finds the optimal path, from all potential paths between two localities.
             Optimality is defined as maximizing the transfer service supply.
             Transfer service supply of a path is the minimal supply among its constitutive links."""   
@@ -496,20 +810,75 @@ class TransferServiceDistributionModelPotentialPathSets(ResourceDistributionMode
             
             return optimal_transfer_supply, optimal_path      
 
-    def get_path_supply(self, path: list([Component.Component])) -> float:
-        """Get the supply capacity of a path as the minimum of links supply."""    
-        return min([link.get_current_resource_amount(Component.SupplyOrDemand.SUPPLY.value, 
-                                                    Component.StandardiReCoDeSComponent.SupplyTypes.SUPPLY.value, 
-                                                    self.resource_name) for link in path])       
-
-    def get_total_supply(self, scope: str) -> float:
-        print(f'System supply for transfer service {self.resource_name} not defined yet.')
-        return None
+class TransferServiceDistributionModelWidestPath(TransferServiceDistributionModel):
+    """
+    Transfer service distribution model that finds optimal paths on the network of links, without predefined potential paths.
 
-    def get_total_demand(self, scope: str) -> float:
-        print(f'System demand for transfer service {self.resource_name} not defined yet.')
-        return None
+    Links are components that supply the transfer service and connect two localities (locality: [start, end]).
+    The optimal path between two localities is the path with the maximal transfer service supply of its weakest link (widest path).
+    Widest paths from a locality to all other localities are found at once using a Dijkstra-like search and cached until links' supply changes.
+    """
+    components: list([Component.Component])
+    resource_name: str
+    adjacent_links: dict
+    widest_paths: dict
 
-    def get_total_consumption(self, scope: str) -> float:
-        print(f'System consumption for transfer service {self.resource_name} not defined yet.')   
-        return None
+    def __init__(self, resource_name: str, resource_parameters: dict, components: list([Component.Component])) -> None:
+        self.constructor = ConcreteResourceDistributionModelConstructor()
+        self.constructor.construct(resource_name, resource_parameters, components, self)
+        self.set_links()
+        self.optimal_paths = {}
+        self.widest_paths = {}
+        self.link_supplies = None
+
+    def set_links(self) -> None:
+        """Set links and, for each locality, the links that start in it."""
+        self.links = []
+        self.adjacent_links = {}
+        for component in self.components:
+            start_locality, end_locality = int(component.locality[0]), int(component.locality[-1])
+            if start_locality != end_locality and component.has_resource_supply(self.resource_name):
+                self.links.append(component)
+                self.adjacent_links.setdefault(start_locality, []).append((end_locality, component))
+
+    def reset_optimal_paths(self) -> None:
+        super().reset_optimal_paths()
+        self.widest_paths = {}
+
+    def find_optimal_path(self, start_locality: int, end_locality: int) -> tuple:
+        """Method returns the transfer service supply of the widest path between two localities and the links that form it.
+            If there is no path with positive supply, supply is 0 and the path is None."""
+        if start_locality not in self.widest_paths:
+            self.widest_paths[start_locality] = self.find_widest_paths(start_locality)
+        path_supplies, previous_links = self.widest_paths[start_locality]
+        if end_locality not in path_supplies:
+            return 0.0, None
+        return path_supplies[end_locality], self.get_path_links(previous_links, end_locality)
+
+    def find_widest_paths(self, start_locality: int) -> tuple:
+        """Find the supply of widest paths from a locality to all reachable localities, and the last link of each path."""
+        path_supplies = {start_locality: math.inf}
+        previous_links = {start_locality: None}
+        localities_to_visit = [(-math.inf, start_locality)]
+        visited_localities = set()
+        while len(localities_to_visit) > 0:
+            negative_path_supply, locality = heapq.heappop(localities_to_visit)
+            if locality in visited_localities:
+                continue
+            visited_localities.add(locality)
+            for next_locality, link in self.adjacent_links.get(locality, []):
+                path_supply = min(-negative_path_supply, self.get_link_supply(link))
+                if path_supply > path_supplies.get(next_locality, 0.0):
+                    path_supplies[next_locality] = path_supply
+                    previous_links[next_locality] = link
+                    heapq.heappush(localities_to_visit, (-path_supply, next_locality))
+        return path_supplies, previous_links
+
+    def get_path_links(self, previous_links: dict, end_locality: int) -> list([Component.Component]):
+        path = []
+        link = previous_links[end_locality]
+        while link is not None:
+            path.append(link)
+            link = previous_links[int(link.locality[0])]
+        path.reverse()
+        return path
@@ -1,10 +1,18 @@
 from abc import ABC, abstractmethod
 import math
+import numpy as np
 from pyrecodes_hospitals import SystemCreator
 from pyrecodes_hospitals import DamageInput
 from pyrecodes_hospitals import Component
+from pyrecodes_hospitals import Resource
 import pickle
 from pyrecodes_hospitals import ResilienceCalculator
+from pyrecodes_hospitals import RandomStreams
+from pyrecodes_hospitals import PatientStore
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientRouter
+from pyrecodes_hospitals import ResilienceAggregator
+from pyrecodes_hospitals import ResourceDistributionModel
 
 class System(ABC):
     components: list([Component.Component])
@@ -100,6 +108,76 @@ class DistributionListCreator():
         num_resources = len(interdependent_resources)
         return interdependent_resources * num_resources
 
+    def get_resource_distribution_groups(self) -> tuple:
+        """
+        Alternative to the resource distribution list, used to distribute interdependent resources until their distribution converges.
+        Returns the list of resources distributed once and the groups of interdependent resources with the maximum number of repetitions of each group.
+        """
+        resource_distribution_list = []
+        resource_distribution_list += self.get_resource_group('BridgeService')
+        resource_distribution_list += self.get_resource_group('TransferService')
+        independent_resources, interdependent_resources = self.get_independent_interdependent_resources(
+            resource_distribution_list)
+        resource_distribution_list += independent_resources
+        return resource_distribution_list, self.form_resource_distribution_groups(interdependent_resources)
+
+    def form_resource_distribution_groups(self, interdependent_resources: list([str])) -> list:
+        """
+        Groups interdependent resources into strongly connected components of the resource dependency graph, ordered so that a group is distributed after the groups it depends on.
+        Groups with a cycle are repeated at most as many times as interdependent resources are repeated in the resource distribution list, other groups are distributed once.
+        """
+        resource_dependencies = self.get_resource_dependencies(interdependent_resources)
+        resource_distribution_groups = []
+        for resource_group in self.get_strongly_connected_resource_groups(interdependent_resources, resource_dependencies):
+            group_has_cycle = len(resource_group) > 1 or resource_group[0] in resource_dependencies[resource_group[0]]
+            resource_distribution_groups.append((resource_group, len(interdependent_resources) if group_has_cycle else 1))
+        return resource_distribution_groups
+
+    def get_resource_dependencies(self, resource_names: list([str])) -> dict:
+        """
+        Resource B depends on resource A if a component that supplies B has operation demand for A, as unmet demand for A can reduce the supply of B.
+        Returns, for each resource, the resources that depend on it.
+        """
+        resource_dependencies = {resource_name: [] for resource_name in resource_names}
+        for component in self.components:
+            operation_demand = component.demand[Component.StandardiReCoDeSComponent.DemandTypes.OPERATION_DEMAND.value]
+            for demanded_resource_name in resource_dependencies:
+                if demanded_resource_name in operation_demand:
+                    for supplied_resource_name in resource_names:
+                        if component.has_resource_supply(supplied_resource_name) and not (supplied_resource_name in resource_dependencies[demanded_resource_name]):
+                            resource_dependencies[demanded_resource_name].append(supplied_resource_name)
+        return resource_dependencies
+
+    def get_strongly_connected_resource_groups(self, resource_names: list([str]), resource_dependencies: dict) -> list:
+        """
+        Tarjan's algorithm. Groups are found in reverse topological order, so they are reversed before returning.
+        """
+        resource_index = {}
+        lowest_reachable_index = {}
+        resource_stack = []
+        resource_groups = []
+
+        def visit(resource_name: str) -> None:
+            resource_index[resource_name] = len(resource_index)
+            lowest_reachable_index[resource_name] = resource_index[resource_name]
+            resource_stack.append(resource_name)
+            for dependent_resource_name in resource_dependencies[resource_name]:
+                if not (dependent_resource_name in resource_index):
+                    visit(dependent_resource_name)
+                    lowest_reachable_index[resource_name] = min(lowest_reachable_index[resource_name], lowest_reachable_index[dependent_resource_name])
+                elif dependent_resource_name in resource_stack:
+                    lowest_reachable_index[resource_name] = min(lowest_reachable_index[resource_name], resource_index[dependent_resource_name])
+            if lowest_reachable_index[resource_name] == resource_index[resource_name]:
+                resource_group = []
+                while not (resource_name in resource_group):
+                    resource_group.append(resource_stack.pop())
+                resource_groups.append(sorted(resource_group, key=resource_names.index))
+
+        for resource_name in resource_names:
+            if not (resource_name in resource_index):
+                visit(resource_name)
+        return resource_groups[::-1]
+
 class HospitalResourceDistributionListCreator(DistributionListCreator):
 
     def get_independent_interdependent_resources(self, resource_distribution_list: list([str])):
@@ -133,6 +211,16 @@ class CompleteDamageRecoveryTargetChecker(RecoveryTargetChecker):
         return True
 
 
+class HospitalRecoveryTargetChecker(RecoveryTargetChecker):
+    """
+    The hospital has recovered once it has no patients in departments and no disaster, patient arrivals or other predefined resource dynamics are left.
+    Consumables are still used in the remaining time steps, which are filled when the assessment is finished.
+    """
+
+    def recovery_target_met(self, system: System) -> bool:
+        return system.hospital_is_empty() and system.get_next_scheduled_event_time_step() > system.MAX_TIME_STEP
+
+
 class BuiltEnvironmentSystem(System):
     """
     iRe-CoDeS model of the Built Environment viewed as an assembly of components that exchange resources.
@@ -142,6 +230,9 @@ class BuiltEnvironmentSystem(System):
     resources: dict
     system_creator: SystemCreator.SystemCreator
     FINISH = False
+    # groups of interdependent resources distributed until convergence, used if DISTRIBUTION_CONVERGENCE_TOLERANCE is a system constant
+    resource_distribution_groups = []
+    distribution_convergence_tolerance = None
 
     def __init__(self, configuration_file: str, component_library: dict, system_creator: SystemCreator.SystemCreator):
         self.set_configuration_file(configuration_file)
@@ -171,19 +262,42 @@ class BuiltEnvironmentSystem(System):
         self.resilience_calculators = self.system_creator.get_resilience_calculators()
         self.START_TIME_STEP = self.system_creator.START_TIME_STEP
         self.MAX_TIME_STEP = self.system_creator.MAX_TIME_STEP
+        for resilience_calculator in self.resilience_calculators:
+            resilience_calculator.set_number_of_time_steps(self.MAX_TIME_STEP - self.START_TIME_STEP + 1)
         self.DISASTER_TIME_STEP = self.system_creator.DISASTER_TIME_STEP
         self.recovery_target_checker = CompleteDamageRecoveryTargetChecker()
         self.set_resource_distribution_list()
         self.set_damage_input()
+        self.set_random_streams(RandomStreams.RandomStreams(getattr(self.system_creator, 'RANDOM_SEED', None)))
 
     def set_resource_distribution_list(self):
         distribution_list_creator = DistributionListCreator(self.components, self.resources)
-        self.resource_distribution_list = distribution_list_creator.get_resource_distribution_list()
+        self.distribution_convergence_tolerance = getattr(self.system_creator, 'DISTRIBUTION_CONVERGENCE_TOLERANCE', None)
+        if self.distribution_convergence_tolerance is None:
+            self.resource_distribution_list = distribution_list_creator.get_resource_distribution_list()
+        else:
+            self.resource_distribution_list, self.resource_distribution_groups = distribution_list_creator.get_resource_distribution_groups()
+        self.distribution_iterations = []
     
     def set_damage_input(self):
         target_damage_input_class = getattr(DamageInput, self.system_creator.get_damage_input_type())
         self.damage_input = target_damage_input_class(self.system_creator.get_damage_input_parameters())        
 
+    def set_random_streams(self, random_streams: RandomStreams.RandomStreams) -> None:
+        """
+        Set the random streams of the replication. If they are seeded, repair durations and random distribution priorities
+        are sampled again from their own streams, so replications differ and each one is reproducible.
+        """
+        self.random_streams = random_streams
+        if not(random_streams.is_seeded()):
+            return
+        for component_id, component in enumerate(self.components):
+            component.recovery_model.set_random_generator(random_streams.get_generator(f'{component_id}/{component.name}/recovery'))
+        for resource_name, resource_parameters in self.resources.items():
+            priority = getattr(resource_parameters['DistributionModel'], 'priority', None)
+            if priority is not None:
+                priority.set_random_generator(random_streams.get_generator(f'{resource_name}/priority'))
+
     def start_resilience_assessment(self):
 
         for self.time_step in range(self.START_TIME_STEP, self.MAX_TIME_STEP):
@@ -220,6 +334,44 @@ class BuiltEnvironmentSystem(System):
     def distribute_resources(self) -> None:
         for resource_name in self.resource_distribution_list:
             self.resources[resource_name]['DistributionModel'].distribute()
+        if len(self.resource_distribution_groups) > 0:
+            self.distribution_iterations.append([self.distribute_until_converged(resource_group, max_iterations)
+                                                 for resource_group, max_iterations in self.resource_distribution_groups])
+
+    def distribute_until_converged(self, resource_group: list([str]), max_iterations: int) -> int:
+        """
+        Distribute a group of interdependent resources until the demand met fractions of all resources in the group change less than the tolerance.
+        Returns the number of iterations.
+        """
+        previous_demand_met = None
+        for iteration in range(1, max_iterations + 1):
+            for resource_name in resource_group:
+                self.resources[resource_name]['DistributionModel'].distribute()
+            demand_met = [self.resources[resource_name]['DistributionModel'].get_demand_met() for resource_name in resource_group]
+            if previous_demand_met is not None and self.demand_met_converged(previous_demand_met, demand_met):
+                break
+            previous_demand_met = demand_met
+        return iteration
+
+    def get_distribution_counters(self) -> dict:
+        """
+        Return the number of distributions of each resource and the number of distributions skipped because supply and demand did not change.
+        """
+        distribution_counters = {}
+        for resource_name, resource_parameters in self.resources.items():
+            distribution_model = resource_parameters['DistributionModel']
+            if hasattr(distribution_model, 'number_of_skipped_distributions'):
+                distribution_counters[resource_name] = {'Distributions': distribution_model.number_of_distributions,
+                                                        'SkippedDistributions': distribution_model.number_of_skipped_distributions}
+        return distribution_counters
+
+    def demand_met_converged(self, previous_demand_met: list, demand_met: list) -> bool:
+        for previous_resource_demand_met, resource_demand_met in zip(previous_demand_met, demand_met):
+            if previous_resource_demand_met is None or resource_demand_met is None:
+                return False
+            if np.max(np.abs(resource_demand_met - previous_resource_demand_met), initial=0.0) > self.distribution_convergence_tolerance:
+                return False
+        return True
 
     def recover(self) -> None:
         for component in self.components:
@@ -236,10 +388,14 @@ class BuiltEnvironmentSystem(System):
         return resilience_metrics
     
     def save_as_pickle(self, savename='./system_object.pickle') -> None:
+        """
+        Save the system, e.g., as a checkpoint of a stopped resilience assessment that is resumed after loading it.
+        """
         with open(savename, 'wb') as file:
-            pickle.dump(self, file) 
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL) 
     
-    def load_as_pickle(self, loadname='./system_object.pickle') -> None:
+    @staticmethod
+    def load_as_pickle(loadname='./system_object.pickle') -> System:
         with open(loadname, 'rb') as file:
             system = pickle.load(file) 
         return system
@@ -249,33 +405,375 @@ class HospitalSystem(BuiltEnvironmentSystem):
     Class to assess resilience of a hospital.
     """
 
+    patient_store = None
+    patient_router = None
+    resilience_aggregator = None
+    multi_resource_system_matrix = None
+    # if True, time steps without events in a steady hospital are not simulated (see advance_to_next_event)
+    next_event_time_advance = False
+    system_is_steady = False
+
+    def create_system(self):
+        super().create_system()
+        self.resilience_aggregator = ResilienceAggregator.ResilienceAggregator(self.resources, self.components)
+        for resilience_calculator in self.resilience_calculators:
+            resilience_calculator.register_aggregated_values(self.resilience_aggregator)
+        self.set_multi_resource_system_matrix()
+        self.set_patient_store(getattr(self.system_creator, 'PATIENT_STORE', None))
+        self.next_event_time_advance = getattr(self.system_creator, 'NEXT_EVENT_TIME_ADVANCE', False)
+        self.system_state = None
+        self.consumable_state = []
+        self.skipped_time_steps = []
+        self.set_recovery_target_checker(getattr(self.system_creator, 'EARLY_TERMINATION', False))
+        # the assessment starts or, if it was stopped, resumes at this time step
+        self.next_time_step = self.START_TIME_STEP
+
+    def set_recovery_target_checker(self, early_termination: bool) -> None:
+        """
+        Set the recovery target checker. If early termination is not used, the assessment runs until MAX_TIME_STEP.
+        """
+        if early_termination:
+            self.recovery_target_checker = HospitalRecoveryTargetChecker()
+        else:
+            self.recovery_target_checker = None
+
     def set_resource_distribution_list(self):
         distribution_list_creator = HospitalResourceDistributionListCreator(self.components, self.resources)
         self.resource_distribution_list = distribution_list_creator.get_resource_distribution_list()
 
-    def start_resilience_assessment(self, progressBar=None, app=None):
+    def set_multi_resource_system_matrix(self) -> None:
+        # system matrices of utility resources are filled together, once per time step
+        system_matrices = {}
+        for resource_name, resource_parameters in self.resources.items():
+            distribution_model = resource_parameters['DistributionModel']
+            if isinstance(distribution_model, ResourceDistributionModel.UtilityDistributionModel) and distribution_model.components is self.components:
+                system_matrices[resource_name] = distribution_model.system_matrix
+        self.multi_resource_system_matrix = ResourceDistributionModel.MultiResourceSystemMatrixCreator(self.components, system_matrices)
+
+    def distribute_resources(self) -> None:
+        """
+        Override parent method by filling the system matrices of all utility resources in one pass before resources are distributed.
+        """
+        self.multi_resource_system_matrix.fill_system_matrix()
+        super().distribute_resources()
+        self.multi_resource_system_matrix.filled = False
+
+    def set_patient_store(self, patient_store_type: str) -> None:
+        """
+        Set the store of patients. If None, patients are PatientType objects in components' patient lists.
+        Otherwise, patients are stored in an instance of the given class from the PatientStore module.
+        """
+        if patient_store_type is None:
+            self.patient_store = None
+            for component in self.components:
+                if isinstance(component, Component.HospitalComponent):
+                    component.patient_store = None
+        else:
+            target_patient_store_class = getattr(PatientStore, patient_store_type)
+            self.patient_store = target_patient_store_class(self.components)
+        # patients in a store are counted from its columns, so patient objects are only created when the assessment finishes
+        self.resilience_aggregator.patient_store = self.patient_store
+        # patient objects are routed only if they are not stored in a patient store
+        self.set_patient_router(patient_store_type is None)
+
+    def set_patient_router(self, use_patient_router: bool) -> None:
+        """
+        Set the router that moves patient objects between components and archives patients that exit the hospital.
+        If not used, all components are scanned for patients that move.
+        """
+        for component in self.components:
+            if isinstance(component, Component.HospitalComponent):
+                component.patient_router = None
+                component.patient_archive = None
+        if use_patient_router:
+            self.patient_router = PatientRouter.PatientRouter(self.components)
+        else:
+            self.patient_router = None
+
+    def set_random_streams(self, random_streams: RandomStreams.RandomStreams) -> None:
+        """
+        Override parent method by passing the random streams to patient sources, which draw the random keys of new patients.
+        """
+        super().set_random_streams(random_streams)
+        for component in self.components:
+            if isinstance(component, Component.PatientSource):
+                component.set_random_streams(random_streams)
+
+    def start_resilience_assessment(self, progressBar=None, app=None, stop_time_step=None):
         """
-        Override parent method by removing the recovery_target_checker and not recovering components.
+        Override parent method by checking the recovery target only if early termination is used and not recovering components.
         Component's change their supply and demand based on predefined resource dynamics, not change in damage.
+
+        If stop_time_step is given, the assessment stops after that time step, e.g., to save a checkpoint, and resumes when the method is called again.
         """
-        for self.time_step in range(self.START_TIME_STEP, self.MAX_TIME_STEP+1):
+        for self.time_step in range(self.next_time_step, self.MAX_TIME_STEP+1):
 
             self.update_progress_bar(progressBar, app)
+
+            if self.time_step < self.next_time_step:
+                # time steps that repeat the last simulated time step were filled when the time was advanced
+                continue
             
-            if self.time_step == self.DISASTER_TIME_STEP:
-                self.set_initial_damage()
+            self.simulate_time_step()
 
-            self.receive_patients()
+            if self.recovery_target_met():
+                self.finish_resilience_assessment()
+                self.update_progress_bar(progressBar, app)
+                break
 
-            self.update()
+            self.next_time_step = self.advance_time()
 
-            self.distribute_resources()
+            if stop_time_step is not None and self.time_step >= stop_time_step:
+                return
 
-            self.update_patients()           
+        self.complete_archived_patients()
+        self.synchronize_patients()
+        print('Resilience assessment finished.')
 
-            self.update_resilience_calculators()
+    def simulate_time_step(self) -> None:
+        if self.time_step == self.DISASTER_TIME_STEP:
+            self.set_initial_damage()
 
-        print('Resilience assessment finished.')
+        self.receive_patients()
+
+        self.update()
+
+        self.distribute_resources()
+
+        self.update_patients()           
+
+        self.update_resilience_calculators()
+
+        self.update_system_state()
+
+    def advance_time(self) -> int:
+        """
+        Return the next time step to simulate. In next-event mode, time steps until the next event are filled without simulating them (see advance_to_next_event).
+        """
+        if not(self.next_event_time_advance):
+            return self.time_step + 1
+        return self.advance_to_next_event()
+
+    def advance_to_next_event(self) -> int:
+        """
+        If the hospital is steady, every time step until the next event repeats the last one: consumables are used at the same rate and
+        the unmet demand of patients is the same. These time steps are filled without distributing resources and the next time step to simulate is returned.
+        """
+        if not(self.system_is_steady):
+            return self.time_step + 1
+        return self.repeat_time_steps(range(self.time_step + 1, self.get_next_event_time_step()))
+
+    def update_system_state(self) -> None:
+        """
+        Check if the hospital is steady: the last time step did not change the state of components and patients in departments,
+        apart from the supply of consumables used at a constant rate, and no patient leaves its department.
+        Only checked if the next-event time advance or early termination is used and resources are not distributed until convergence.
+        """
+        if not(self.next_event_time_advance or self.recovery_target_checker is not None) or len(self.resource_distribution_groups) > 0:
+            return
+        system_state = self.get_system_state()
+        consumable_state = [(resource.current_amount, self.get_last_consumption(resource.name)) for resource in self.get_consumable_supply()]
+        self.system_is_steady = self.system_state == system_state and not(self.patients_leave_departments()) and \
+                                self.consumables_used_at_constant_rate(self.consumable_state, consumable_state)
+        self.system_state = system_state
+        self.consumable_state = consumable_state
+
+    def consumables_used_at_constant_rate(self, previous_consumable_state: list, consumable_state: list) -> bool:
+        # consumables were only reduced by the consumption, not by unmet demand, and their consumption did not change
+        if len(previous_consumable_state) != len(consumable_state):
+            return False
+        for resource, (previous_amount, previous_consumption), (amount, consumption) in zip(self.get_consumable_supply(), previous_consumable_state, consumable_state):
+            if consumption != previous_consumption or amount != self.get_amount_after_consumption(resource, previous_amount, previous_consumption):
+                return False
+        return True
+
+    def recovery_target_met(self) -> bool:
+        if self.recovery_target_checker is None:
+            return False
+        return super().recovery_target_met()
+
+    def finish_resilience_assessment(self) -> None:
+        """
+        Fill the remaining time steps and finish the assessment. The hospital is empty and nothing is scheduled, so once it is steady,
+        every time step repeats the last one until the supply of a consumable changes its distribution: these time steps are filled at once,
+        with consumables reduced in closed form (see repeat_time_steps). Only the time steps that change the hospital, e.g., when a consumable runs out, are simulated,
+        so the results are the same as if all time steps were simulated.
+        """
+        next_time_step = self.advance_to_next_event()
+        while next_time_step <= self.MAX_TIME_STEP:
+            self.time_step = next_time_step
+            self.simulate_time_step()
+            next_time_step = self.advance_to_next_event()
+        self.time_step = self.MAX_TIME_STEP
+        self.FINISH = True
+
+    def get_system_state(self) -> tuple:
+        """
+        Return the state that decides how resources are distributed at the next time step: components' functionality and resources,
+        except the amount of consumables, which is checked separately, and the patients in departments.
+        """
+        component_states = []
+        for component in self.components:
+            component_states.append(component.functionality_level)
+            for resources in component.supply.values():
+                for resource in resources.values():
+                    if isinstance(resource, Resource.ConsumableResource):
+                        component_states.append(resource.initial_amount)
+                    else:
+                        component_states.append((resource.initial_amount, resource.current_amount))
+            for resources in component.demand.values():
+                for resource in resources.values():
+                    component_states.append((getattr(resource, 'initial_amount', None), getattr(resource, 'current_amount', resource)))
+            if isinstance(component, Component.HospitalComponent) and component.patient_archive is None and self.patient_store is None:
+                component_states.append(tuple(id(patient) for patient in component.patients))
+        if self.patient_store is not None:
+            component_states.append(self.patient_store.get_state())
+        return component_states
+
+    def get_consumable_supply(self) -> list:
+        consumable_supply = []
+        for component in self.components:
+            if not(isinstance(component, Component.PatientSource)):
+                for resource in component.supply[Component.StandardiReCoDeSComponent.SupplyTypes.SUPPLY.value].values():
+                    if isinstance(resource, Resource.ConsumableResource):
+                        consumable_supply.append(resource)
+        return consumable_supply
+
+    def get_last_consumption(self, resource_name: str) -> float:
+        # consumables are reduced by the last consumption recorded by the first resilience calculator (see update)
+        system_consumption = self.resilience_calculators[0].system_consumption
+        if resource_name in system_consumption and len(system_consumption[resource_name]) > 0:
+            return system_consumption[resource_name][-1]
+        return None
+
+    @staticmethod
+    def get_amount_after_consumption(resource: Resource.ConsumableResource, amount: float, consumption: float) -> float:
+        if consumption is None:
+            return amount
+        return resource.get_amount_after_consumption(amount, consumption)
+
+    def hospital_is_empty(self) -> bool:
+        if self.patient_store is not None:
+            return self.patient_store.get_number_of_patients_in_departments() == 0
+        for component in self.get_departments():
+            if len(component.patients) > 0:
+                return False
+        return True
+
+    def get_departments(self) -> list:
+        # patients that exited the hospital are archived or, if they are not routed, stay at the EXIT component
+        return [component for component in self.components if isinstance(component, Component.HospitalComponent) and
+                component.patient_archive is None and component.name != Patient.PatientType.EXIT]
+
+    def patients_leave_departments(self) -> bool:
+        if self.patient_store is not None:
+            return self.patient_store.patients_leave_departments()
+        if self.patient_router is None:
+            # patients that leave are only known if they are routed, so scanned components are only steady when the hospital is empty
+            return not(self.hospital_is_empty())
+        return len(self.patient_router.leaving_patients) > 0
+
+    def get_next_event_time_step(self) -> int:
+        """
+        Return the next time step at which the state of a steady hospital changes: the disaster, patient arrivals and other predefined resource dynamics,
+        the end of a patient's stay in a department and a consumable whose supply changes the distribution of the resource.
+        """
+        return min(self.get_next_scheduled_event_time_step(), self.get_next_stay_end_time_step(), self.get_next_depletion_time_step())
+
+    def get_next_scheduled_event_time_step(self) -> int:
+        next_event_time_step = self.MAX_TIME_STEP + 1
+        if self.DISASTER_TIME_STEP > self.time_step:
+            next_event_time_step = min(next_event_time_step, self.DISASTER_TIME_STEP)
+        for component in self.components:
+            if isinstance(component, Component.HospitalComponent):
+                next_event_time_step = min(next_event_time_step, component.get_next_resource_dynamics_time_step(self.time_step))
+        return next_event_time_step
+
+    def get_next_stay_end_time_step(self) -> int:
+        # patients treated at the last time step are treated at every repeated time step and move at the time step after their stay ends,
+        # patients that were not treated stay until their unmet demand changes
+        next_stay_end_time_step = self.MAX_TIME_STEP + 1
+        if self.patient_store is not None:
+            return self.patient_store.get_next_stay_end_time_step(self.time_step, next_stay_end_time_step)
+        for component in self.get_departments():
+            for patient in component.patients:
+                if not(patient.treated):
+                    continue
+                time_steps_to_stay = math.ceil(patient.length_of_stay - patient.get_current_length_of_treatment())
+                next_stay_end_time_step = min(next_stay_end_time_step, self.time_step + time_steps_to_stay + 1)
+        return next_stay_end_time_step
+
+    def get_next_depletion_time_step(self) -> int:
+        """
+        Return the first time step at which the supply of a consumable, reduced by the constant consumption at each time step, changes the distribution of the resource.
+        """
+        next_depletion_time_step = self.MAX_TIME_STEP + 1
+        for resource in self.get_consumable_supply():
+            if resource.name not in self.resources:
+                continue
+            distribution_model = self.resources[resource.name]['DistributionModel']
+            consumption = self.get_last_consumption(resource.name)
+            amount = resource.current_amount
+            for time_step in range(self.time_step + 1, next_depletion_time_step):
+                next_amount = self.get_amount_after_consumption(resource, amount, consumption)
+                if next_amount == amount:
+                    break
+                amount = next_amount
+                if not(distribution_model.distribution_unchanged_by_supply(resource.current_amount, amount)):
+                    next_depletion_time_step = time_step
+                    break
+        return next_depletion_time_step
+
+    def repeat_time_steps(self, time_steps: range) -> int:
+        """
+        Fill time steps that repeat the last simulated time step and return the next time step to simulate.
+
+        Resources are not distributed again: the unmet demand of the last distribution is set again and patients are updated at each time step.
+        If a patient leaves its department, e.g., because it died, the next time step is simulated.
+        Consumables are then reduced by the same consumption for all repeated time steps at once and resilience calculators are updated
+        with the rows of all repeated time steps in one go.
+        """
+        repeated_time_steps = []
+        for self.time_step in time_steps:
+            self.repeat_resource_distribution()
+            self.update_patients()
+            repeated_time_steps.append(self.time_step)
+            if self.patients_leave_departments():
+                break
+        if len(repeated_time_steps) == 0:
+            return time_steps.start
+        for component in self.components:
+            if not(isinstance(component, Component.PatientSource)):
+                for time_step in repeated_time_steps:
+                    component.check_if_functional(time_step)
+        supply_amounts = self.advance_consumables(len(repeated_time_steps))
+        self.resilience_aggregator.repeat_update(len(repeated_time_steps), supply_amounts)
+        for resilience_calculator in self.resilience_calculators:
+            resilience_calculator.repeat_update_from_aggregator(self.resilience_aggregator)
+        self.skipped_time_steps += repeated_time_steps
+        return self.time_step + 1
+
+    def advance_consumables(self, number_of_time_steps: int) -> dict:
+        """
+        Reduce consumables by the last consumption at each of the given number of time steps and
+        return their amounts after each time step, as (component, amounts) pairs per resource name.
+        """
+        system_consumption = self.resilience_calculators[0].system_consumption
+        supply_amounts = {}
+        for component in self.components:
+            if not(isinstance(component, Component.PatientSource)):
+                amounts_after_consumption = component.advance_supply_based_on_consumption(system_consumption, number_of_time_steps)
+                for resource_name, amounts in amounts_after_consumption.items():
+                    supply_amounts.setdefault(resource_name, []).append((component, amounts))
+        return supply_amounts
+
+    def repeat_resource_distribution(self) -> None:
+        # the system matrices are not filled again, only the supply of the resources is read again
+        self.multi_resource_system_matrix.set_resource_matrices()
+        self.multi_resource_system_matrix.filled = True
+        for resource_name in self.resource_distribution_list:
+            self.resources[resource_name]['DistributionModel'].repeat_last_distribution()
+        self.multi_resource_system_matrix.filled = False
 
     def update(self) -> None:
         """
@@ -289,10 +787,16 @@ class HospitalSystem(BuiltEnvironmentSystem):
         """
         Method to distribute the patients to departments based on their length of stay and met demand.
         """
+        if self.patient_store is not None:
+            self.patient_store.receive_patients(self.time_step)
+            return
         for component in self.components:
             if isinstance(component, Component.PatientSource):
                 component.create_patients(self.time_step)
-        
+
+        if self.patient_router is not None:
+            self.patient_router.move_patients()
+            return
         patients_to_move = []
         for component in self.components:
             patients_to_move += component.get_patients_that_move()
@@ -301,16 +805,30 @@ class HospitalSystem(BuiltEnvironmentSystem):
             component.set_new_patients(patients_to_move)
             
     def update_patients(self) -> None:
+        if self.patient_store is not None:
+            self.patient_store.update_patients(self.time_step)
+            return
         for component in self.components:
             component.update_patient_status(self.time_step)
-    
+
+    def synchronize_patients(self) -> None:
+        # components' patient lists are only needed by resilience calculators that use patient objects
+        if self.patient_store is not None:
+            self.patient_store.synchronize_components()
+
+    def complete_archived_patients(self) -> None:
+        # the stay at EXIT of archived patients is only recorded when the assessment is finished
+        if self.patient_router is not None and self.patient_router.patient_archive is not None:
+            self.patient_router.patient_archive.complete_stays()
+
     def update_resilience_calculators(self) -> None:
-        # TODO: Refactor - input for all resilience calculators should be the same!
+        """
+        Override parent method by aggregating the system state once, in a single pass, and updating all resilience calculators from it,
+        so that resource totals and patient counts are calculated once per time step.
+        """
+        self.resilience_aggregator.update()
         for resilience_calculator in self.resilience_calculators:
-            if isinstance(resilience_calculator, ResilienceCalculator.PatientFlowCalculator) or isinstance(resilience_calculator, ResilienceCalculator.DeadPatientsCalculator) or isinstance(resilience_calculator, ResilienceCalculator.HospitalMeasureOfServiceCalculator):
-                resilience_calculator.update(self.components)
-            else:
-                resilience_calculator.update(self.resources)
+            resilience_calculator.update_from_aggregator(self.resilience_aggregator)
     
     def update_progress_bar(self, progressBar, app):
         if progressBar is not None:
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+class TimeSeriesTable():
+    """
+    Class to store time series of several quantities (e.g., resources) in a preallocated 2-D array.
+
+    Rows are time steps and columns are quantities. Each column is recorded independently, so columns can have different lengths.
+    If the number of time steps is not known or is exceeded, the array is doubled.
+    """
+
+    def __init__(self, column_names: list, number_of_time_steps=1) -> None:
+        self.column_names = list(column_names)
+        self.column_ids = {column_name: column_id for column_id, column_name in enumerate(self.column_names)}
+        self.values = np.zeros((max(number_of_time_steps, 1), len(self.column_names)))
+        self.lengths = np.zeros(len(self.column_names), dtype=int)
+
+    def __getstate__(self) -> dict:
+        # only the recorded time steps are pickled, the array is reallocated to its number of time steps when unpickled
+        state = self.__dict__.copy()
+        state['values'] = self.get_values().copy()
+        state['number_of_time_steps'] = self.values.shape[0]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        number_of_time_steps = state.pop('number_of_time_steps')
+        recorded_values = state.pop('values')
+        self.__dict__.update(state)
+        self.values = np.zeros((number_of_time_steps, len(self.column_names)))
+        self.values[:len(recorded_values)] = recorded_values
+
+    def get_time_series(self) -> dict:
+        return {column_name: TimeSeries(self, column_id) for column_name, column_id in self.column_ids.items()}
+
+    def set_number_of_time_steps(self, number_of_time_steps: int) -> None:
+        if number_of_time_steps > self.values.shape[0]:
+            values = np.zeros((number_of_time_steps, len(self.column_names)))
+            values[:self.values.shape[0]] = self.values
+            self.values = values
+
+    def append(self, column_ids: list, values: list) -> None:
+        rows = self.lengths[column_ids]
+        if len(rows) > 0 and rows.max() >= self.values.shape[0]:
+            self.set_number_of_time_steps(max(2 * self.values.shape[0], rows.max() + 1))
+        self.values[rows, column_ids] = values
+        self.lengths[column_ids] += 1
+
+    def append_rows(self, column_ids: list, values: np.ndarray) -> None:
+        """
+        Append several time steps at once, with values given as a time step x column array.
+        """
+        rows = self.lengths[column_ids]
+        number_of_rows = len(values)
+        if len(rows) > 0 and rows.max() + number_of_rows > self.values.shape[0]:
+            self.set_number_of_time_steps(max(2 * self.values.shape[0], rows.max() + number_of_rows))
+        self.values[rows + np.arange(number_of_rows)[:, None], column_ids] = values
+        self.lengths[column_ids] += number_of_rows
+
+    def append_value(self, column_id: int, value: float) -> None:
+        row = self.lengths[column_id]
+        if row >= self.values.shape[0]:
+            self.set_number_of_time_steps(2 * self.values.shape[0])
+        self.values[row, column_id] = value
+        self.lengths[column_id] = row + 1
+
+    def get_values(self) -> np.ndarray:
+        """
+        Return the recorded time steps of all columns as a view of the array, without copying.
+        """
+        return self.values[:self.lengths.max(initial=0)]
+
+    def get_column(self, column_id: int) -> np.ndarray:
+        return self.values[:self.lengths[column_id], column_id]
+
+
+class TimeSeries():
+    """
+    Class to access a column of a time series table as a list of values per time step.
+
+    Values are appended and read like in a list, and NumPy reads the column as a view of the table, without copying.
+    """
+
+    def __init__(self, table: TimeSeriesTable, column_id: int) -> None:
+        self.table = table
+        self.column_id = column_id
+
+    def append(self, value: float) -> None:
+        self.table.append_value(self.column_id, value)
+
+    def __len__(self) -> int:
+        return int(self.table.lengths[self.column_id])
+
+    def __getitem__(self, index):
+        return self.table.get_column(self.column_id)[index]
+
+    def __setitem__(self, index, value) -> None:
+        self.table.get_column(self.column_id)[index] = value
+
+    def __iter__(self):
+        return iter(self.table.get_column(self.column_id).tolist())
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        column = self.table.get_column(self.column_id)
+        if dtype is not None:
+            return column.astype(dtype, copy=bool(copy))
+        return column.copy() if copy else column
+
+    def __eq__(self, other) -> bool:
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def tolist(self) -> list:
+        return self.table.get_column(self.column_id).tolist()
@@ -1,6 +1,8 @@
 from pyrecodes_hospitals import ComponentLibraryCreator
 from pyrecodes_hospitals import SystemCreator
 from pyrecodes_hospitals import System
+from pyrecodes_hospitals import Ensemble
+import argparse
 import json
 import pandas as pd
 import numpy as np
@@ -406,6 +408,12 @@ def run(main_file: str) -> System.System:
     system.start_resilience_assessment()
     return system
 
+def run_ensemble(main_file: str, number_of_replications: int, number_of_workers=1, additional_data_location='', seed=None) -> Ensemble.EnsembleResult:
+    input_dict = read_main_file(main_file, additional_data_location)
+    system = create_system(input_dict)
+    ensemble_runner = Ensemble.EnsembleRunner(system, number_of_replications, number_of_workers, seed)
+    return ensemble_runner.run()
+
 def read_main_file(main_file: str, additional_data_location: str) -> dict:
     input_dict = read_file(main_file)
     input_dict['System']['SystemConfigurationFile'] = additional_data_location + input_dict['System']['SystemConfigurationFile']
@@ -431,4 +439,24 @@ def read_excel_input(input_filename: str) -> dict:
 def run_from_gui(input_filename: str, MCI_scenario_parameters:dict, additional_data_location: str, progressBar=None, app=None):
     input_data = read_excel_input(input_filename)
     system = run_from_excel(input_data, MCI_scenario_parameters, additional_data_location, progressBar=progressBar, app=app)
-    return system
\ No newline at end of file
+    return system
+
+def parse_command_line_arguments(arguments=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run a Monte Carlo ensemble of hospital resilience assessments.')
+    parser.add_argument('main_file', help='Main JSON file defining the component library and the system configuration.')
+    parser.add_argument('--additional-data-location', default='', help='Folder with the component library and the system configuration files listed in the main file.')
+    parser.add_argument('--replications', type=int, default=1, help='Number of replications.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+    parser.add_argument('--seed', type=int, default=None, help='Root seed of the random streams of all replications.')
+    parser.add_argument('--output', default=None, help='JSON file to save the aggregated results to.')
+    return parser.parse_args(arguments)
+
+if __name__ == '__main__':
+    arguments = parse_command_line_arguments()
+    ensemble_result = run_ensemble(arguments.main_file, arguments.replications, arguments.workers, arguments.additional_data_location, arguments.seed)
+    summary = ensemble_result.summarize()
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            json.dump(summary, file, indent=4)
+    else:
+        print(json.dumps(summary, indent=4))
@@ -11,6 +11,8 @@ from pyrecodes_hospitals import Relation
 from pyrecodes_hospitals import System
 from pyrecodes_hospitals import Component
 from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientRouter
+from pyrecodes_hospitals import RandomStreams
 from pyrecodes_hospitals import main
 
 random.seed(1)
@@ -61,6 +63,20 @@ class TestHospitalComponent():
         component = Component.HospitalComponent()
         component.set_predefined_resource_dynamics(self.RESOURCE_DYNAMICS)  
         assert component.predefined_resource_dynamics == self.RESOURCE_DYNAMICS
+
+    def test_compile_resource_dynamics(self):
+        component = Component.HospitalComponent()
+        component.set_predefined_resource_dynamics(self.RESOURCE_DYNAMICS)
+        assert component.resource_dynamics_time_steps == [0, 1, 2, 5, 10]
+        assert component.resource_dynamics_schedule[0] == [(self.RESOURCE_DYNAMICS[0], 50), (self.RESOURCE_DYNAMICS[1], 10)]
+        assert component.resource_dynamics_schedule[1] == [(self.RESOURCE_DYNAMICS[1], 5)]
+        assert component.resource_dynamics_schedule[2] == [(self.RESOURCE_DYNAMICS[0], 30), (self.RESOURCE_DYNAMICS[1], 15)]
+        assert component.resource_dynamics_schedule[5] == [(self.RESOURCE_DYNAMICS[0], 10), (self.RESOURCE_DYNAMICS[1], 0)]
+        assert component.resource_dynamics_schedule[10] == [(self.RESOURCE_DYNAMICS[0], 20)]
+        assert 3 not in component.resource_dynamics_schedule
+        assert component.get_next_resource_dynamics_time_step(0) == 1
+        assert component.get_next_resource_dynamics_time_step(2) == 5
+        assert component.get_next_resource_dynamics_time_step(10) == math.inf
     
     def test_update(self):
         component = Component.HospitalComponent()
@@ -137,33 +153,6 @@ class TestHospitalComponent():
         assert component.supply['Supply']['Resource_1'].current_amount == 20 + 140
         assert component.demand['OperationDemand']['Resource_2'].current_amount == 0 + 40
 
-    def test_get_resource_amount_based_on_time_step(self):
-        component = Component.HospitalComponent()
-        component.form('ExampleComponent', self.COMPONENT_PARAMETERS)
-        component.set_predefined_resource_dynamics(self.RESOURCE_DYNAMICS)
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 0) == 50 + 50
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 1) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 2) == 30 + 50
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 3) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 4) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 5) == 10 + 50
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 6) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 7) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 8) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 9) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 10) == 20 + 50
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 11) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[0], 12) == None
-
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 0) == 10 + 10
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 1) == 5 + 10
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 2) == 15 + 10
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 3) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 4) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 5) == 0 + 10
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 6) == None
-        assert component.get_resource_amount_based_on_time_step(self.RESOURCE_DYNAMICS[1], 7) == None
-    
     def test_update_supply_based_on_consumption(self):
         component = Component.HospitalComponent()
         system_consumption = {'Resource_1': [10]}
@@ -201,6 +190,32 @@ class TestHospitalComponent():
         assert component.demand['OperationDemand']['Resource_3'].current_amount == 5
         assert component.demand['OperationDemand']['Resource_4'].current_amount == 1
         assert component.demand['OperationDemand']['Resource_5'].current_amount == 5
+
+    def test_update_operation_demand_based_on_routed_patients(self):
+        department_1 = Component.HospitalComponent()
+        department_1.form('Department_1', self.COMPONENT_PARAMETERS)
+        department_2 = Component.HospitalComponent()
+        department_2.form('Department_2', self.COMPONENT_PARAMETERS)
+        patient_router = PatientRouter.PatientRouter([department_1, department_2])
+        patient = Patient.PatientType()
+        patient.set_parameters('ExamplePatient', self.PATIENT_PARAMETERS_SIMPLE)
+        for _ in range(2):
+            department_1.add_patient(copy.deepcopy(patient))
+        department_1.update_operation_demand_based_on_patients()
+        assert department_1.demand['OperationDemand']['Resource_1'].current_amount == 20
+        assert department_1.demand['OperationDemand']['Resource_2'].current_amount == 20
+        assert department_1.demand['OperationDemand']['Resource_3'].current_amount == 10
+        # running totals are updated when patients change their demand and move to the next department
+        for time_step in range(8):
+            department_1.update_patient_status(time_step)
+            patient_router.move_patients()
+        assert department_1.patients == []
+        assert department_1.patient_demand == {}
+        department_1.update_operation_demand_based_on_patients()
+        department_2.update_operation_demand_based_on_patients()
+        assert department_1.demand['OperationDemand']['Resource_1'].current_amount == 0
+        assert department_2.demand['OperationDemand']['Resource_4'].current_amount == 2
+        assert department_2.demand['OperationDemand']['Resource_5'].current_amount == 10
     
     def test_set_current_operation_demand(self):
         component = Component.HospitalComponent()
@@ -494,6 +509,39 @@ class TestHospitalComponent():
         patients_with_demand = component.get_patients_with_demand('Resource_0')
         assert len(patients_with_demand) == 0
         
+    def test_get_categorized_patients_with_demand(self):
+        component = Component.HospitalComponent()
+        component.form('Department_1', self.COMPONENT_PARAMETERS)
+        PatientRouter.PatientRouter([component])
+        for patient_type_name in ['ExamplePatient Green', 'ExamplePatient Red', 'ExamplePatient Green']:
+            patient = Patient.PatientType()
+            patient.set_parameters(patient_type_name, self.PATIENT_PARAMETERS_SIMPLE)
+            component.add_patient(patient)
+        categorized_patients = component.get_categorized_patients_with_demand('Resource_2')
+        assert {category: list(patients) for category, patients in categorized_patients.items()} == component.categorize_patients(component.patients)
+        assert list(component.get_categorized_patients_with_demand('Resource_4')['Green']) == []
+        # patients that start demanding a resource keep the order of the patients list
+        for moving_patient in [component.patients[2], component.patients[0]]:
+            resource_demand = moving_patient.get_resource_demand()
+            moving_patient.move_to_next_department()
+            component.change_patient_demand(moving_patient, resource_demand, moving_patient.get_resource_demand())
+        assert list(component.get_categorized_patients_with_demand('Resource_2')['Red']) == [component.patients[1]]
+        assert list(component.get_categorized_patients_with_demand('Resource_2')['Green']) == []
+        assert list(component.get_categorized_patients_with_demand('Resource_4')['Green']) == [component.patients[0], component.patients[2]]
+        component.remove_patients(component.patients)
+        assert list(component.get_categorized_patients_with_demand('Resource_4')['Green']) == []
+
+    def test_distribute_resource_among_categorized_patients_priority(self):
+        component = Component.HospitalComponent()
+        component.form('ExampleComponent', self.COMPONENT_PARAMETERS)
+        patients = []
+        for patient_type_name in ['ExamplePatient Green', 'ExamplePatient Red', 'ExamplePatient Green', 'ExamplePatient Red']:
+            patient = Patient.PatientType()
+            patient.set_parameters(patient_type_name, self.PATIENT_PARAMETERS_SIMPLE)
+            patients.append(patient)
+        component.distribute_resource_among_categorized_patients_priority('Resource_2', 0.75, component.categorize_patients(patients))
+        assert [patient.demand_met[0]['Resource_2'] for patient in patients] == [1.0, 1.0, 0.0, 1.0]
+
     def test_get_patients_that_move(self):
         component = Component.HospitalComponent()
         component.form('Department_1', self.COMPONENT_PARAMETERS)
@@ -618,13 +666,30 @@ class TestPatientSource():
         assert component.demand['OperationDemand']['Green'].current_amount == 0
         assert component.demand['OperationDemand']['Red'].current_amount == 0
 
-    def test_get_resource_amount_based_on_time_step(self):
+    def test_compile_resource_dynamics(self):
         component = Component.PatientSource()
         component.form('PatientSource', self.COMPONENT_PARAMETERS)
-        assert component.get_resource_amount_based_on_time_step(self.PATIENT_ARRIVAL_DYNAMICS[0], 0) == 0
-        assert component.get_resource_amount_based_on_time_step(self.PATIENT_ARRIVAL_DYNAMICS[0], 2) == 10
-        assert component.get_resource_amount_based_on_time_step(self.PATIENT_ARRIVAL_DYNAMICS[0], 5) == 15
+        # the last resource dynamic of a patient type sets its number of patients
+        red_arrivals = {"Resource": "Red", "SupplyOrDemand": "demand", "SupplyOrDemandType": "OperationDemand", "AtTimeStep": [2], "Amount": [7]}
+        component.set_predefined_resource_dynamics(self.PATIENT_ARRIVAL_DYNAMICS + [red_arrivals])
+        assert component.resource_dynamics_schedule[0] == [(self.PATIENT_ARRIVAL_DYNAMICS[1], 0)]
+        assert component.resource_dynamics_schedule[2] == [(red_arrivals, 7), (self.PATIENT_ARRIVAL_DYNAMICS[1], 20)]
+        assert component.resource_dynamics_schedule[5] == [(self.PATIENT_ARRIVAL_DYNAMICS[1], 0)]
+        assert component.resource_dynamics_to_reset == [red_arrivals, self.PATIENT_ARRIVAL_DYNAMICS[1]]
     
+    def test_get_next_resource_dynamics_time_step(self):
+        component = Component.PatientSource()
+        component.form('PatientSource', self.COMPONENT_PARAMETERS)
+        component.set_predefined_resource_dynamics([{"Resource": "Red", "SupplyOrDemand": "demand", "SupplyOrDemandType": "OperationDemand", "AtTimeStep": [2, 5], "Amount": [10, 15]},
+                                                    {"Resource": "Green", "SupplyOrDemand": "demand", "SupplyOrDemandType": "OperationDemand", "AtTimeStep": [0, 3], "Amount": [0, 0]}])
+        assert component.patient_arrival_time_steps == [2, 5]
+        next_time_steps = []
+        for time_step in range(7):
+            component.create_patients(time_step)
+            next_time_steps.append(component.get_next_resource_dynamics_time_step(time_step))
+        # the time step after patients arrived resets the number of patients
+        assert next_time_steps == [2, 2, 3, 5, 5, 6, math.inf]
+
     def test_create_patients(self):
         component = Component.PatientSource()
         component.form('PatientSource', self.COMPONENT_PARAMETERS)
@@ -643,6 +708,36 @@ class TestPatientSource():
         assert len(component.patients) == 100 + 110 + 110 + 60 + 65
         component.create_patients(6)
         assert len(component.patients) == 100 + 110 + 110 + 60 + 65 + 65
+        assert all([patient.random_key is None for patient in component.patients])
+
+    def test_create_patients_at_listed_time_steps(self):
+        component = Component.PatientSource()
+        component.form('PatientSource', self.COMPONENT_PARAMETERS)
+        component.set_predefined_resource_dynamics([{"Resource": "Red", "SupplyOrDemand": "demand", "SupplyOrDemandType": "OperationDemand", "AtTimeStep": [2, 5], "Amount": [10, 15]}])
+        component.demand['OperationDemand']['Red'].set_initial_amount(3)
+        number_of_patients = []
+        for time_step in range(7):
+            component.create_patients(time_step)
+            number_of_patients.append(len(component.patients))
+        # patients only arrive at the listed time steps
+        assert number_of_patients == [0, 0, 10, 10, 10, 25, 25]
+
+    def test_create_patients_with_random_streams(self):
+        component = Component.PatientSource()
+        component.form('PatientSource', self.COMPONENT_PARAMETERS)
+        component.set_predefined_resource_dynamics(self.STRESS_SCENARIO)
+        component.set_random_streams(RandomStreams.RandomStreams(5))
+        for time_step in range(4):
+            component.create_patients(time_step)
+        random_keys = [patient.random_key for patient in component.patients]
+        assert None not in random_keys
+        assert len(set(random_keys)) == len(random_keys)
+        # the same seed gives the same patient streams
+        component.patients = []
+        component.set_random_streams(RandomStreams.RandomStreams(5))
+        for time_step in range(4):
+            component.create_patients(time_step)
+        assert [patient.random_key for patient in component.patients] == random_keys
    
 class TestStandardiReCoDeSComponent_SingleRecoveryActivity():
     component_library_file = "./tests/test_inputs/test_inputs_ThreeLocalitiesCommunity_ComponentLibrary.json"
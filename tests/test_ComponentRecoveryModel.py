@@ -399,6 +399,19 @@ class TestMultipleRecoveryActivitiesComponentRecoveryModel:
 
         assert all(bool_list)
 
+    def test_set_random_generator(self, recovery_model: ComponentRecoveryModel.RecoveryModel):
+        parameters = copy.deepcopy(self.recovery_model_parameters['Parameters'])
+        parameters['Repair']['Duration'] = {'Lognormal': {'Median': 10, 'Dispersion': 0.5}}
+        recovery_model.set_parameters(parameters)
+        recovery_model.set_random_generator(np.random.default_rng(1))
+        repair_activity = recovery_model.recovery_activities['Repair']
+        duration = repair_activity.duration
+        assert math.isclose(repair_activity.rate, 1 / duration)
+        recovery_model.set_random_generator(np.random.default_rng(1))
+        assert repair_activity.duration == duration
+        recovery_model.set_random_generator(np.random.default_rng(2))
+        assert repair_activity.duration != duration
+
     def test_set_initial_damage_level(self, recovery_model: ComponentRecoveryModel.RecoveryModel):
         damage_level = 1.0
         recovery_model.set_parameters(self.recovery_model_parameters['Parameters'])
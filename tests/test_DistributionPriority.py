@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from pyrecodes_hospitals import main
 from pyrecodes_hospitals import DistributionPriority
 from pyrecodes_hospitals import System
@@ -89,4 +90,24 @@ class TestComponentTypeBasedPriority(TestDistributionPriority):
 
     def test_set_distribution_priority(self, distribution_priority: DistributionPriority.DistributionPriority):
         assert distribution_priority.get_component_priorities() == ([1, 4, 7], ['OperationDemand', 'OperationDemand', 'OperationDemand'])
-        
\ No newline at end of file
+        
+class TestRandomPriority(TestDistributionPriority):
+
+    FILENAME = './tests/test_inputs/test_inputs_ThreeLocalitiesCommunity_Main.json'
+    PARAMETERS = {'Seed': 1, 'DemandType': ['OperationDemand', 'RecoveryDemand']}
+
+    @pytest.fixture
+    def distribution_priority(self, system: System.System):
+        return DistributionPriority.RandomPriority('ElectricPower', self.PARAMETERS, system.components)
+
+    def test_set_random_generator(self, distribution_priority: DistributionPriority.RandomPriority, system: System.System):
+        seeded_priorities = distribution_priority.get_component_priorities()
+        assert DistributionPriority.RandomPriority('ElectricPower', self.PARAMETERS, system.components).get_component_priorities() == seeded_priorities
+        distribution_priority.set_random_generator(np.random.default_rng(5))
+        stream_priorities = distribution_priority.get_component_priorities()
+        distribution_priority.set_random_generator(np.random.default_rng(5))
+        assert distribution_priority.get_component_priorities() == stream_priorities
+        # suppliers stay on top and every component is prioritized once per demand type
+        assert stream_priorities[0][0] == seeded_priorities[0][0] == 1
+        assert sorted(stream_priorities[0]) == sorted(seeded_priorities[0])
+        assert stream_priorities[1] == seeded_priorities[1]
@@ -0,0 +1,78 @@
+import pytest
+import copy
+from pyrecodes_hospitals import main
+from pyrecodes_hospitals import Ensemble
+from pyrecodes_hospitals import ResilienceCalculator
+from pyrecodes_hospitals import RandomStreams
+
+class TestEnsemble():
+
+    MAIN_FILE = './tests/test_inputs/test_inputs_Hospital_Main.json'
+    ADDITIONAL_DATA_LOCATION = './tests/test_inputs/'
+    EXCEL_INPUT_1 = './tests/test_inputs/test_inputs_Hospital_ExcelInput1.xlsx'
+
+    def create_system(self, excel_input):
+        excel_input = main.read_excel_input(excel_input)
+        input_dict = main.read_main_file(self.MAIN_FILE, self.ADDITIONAL_DATA_LOCATION)
+        main.format_input_from_excel(excel_input, {}, input_dict, self.ADDITIONAL_DATA_LOCATION,
+                                     default_patient_library_file='test_inputs_Hospital_PatientTypeLibrary.json',
+                                     default_stress_scenario_file='test_inputs_Hospital_StressScenario.json')
+        system = main.create_system(input_dict)
+        return system
+
+    def test_run_serial(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        ensemble_result = Ensemble.EnsembleRunner(system, number_of_replications=3, seed=10).run()
+        assert ensemble_result.number_of_replications == 3
+        assert ensemble_result.seed == 10
+        for replication_id, replication_output in enumerate(ensemble_result.replication_outputs):
+            single_run_system = copy.deepcopy(system)
+            single_run_system.set_random_streams(RandomStreams.RandomStreams(10, replication_id))
+            single_run_system.start_resilience_assessment()
+            assert replication_output == single_run_system.calculate_resilience()
+        # the template system is not changed by running the ensemble
+        assert system.components[0].patients == []
+
+    def test_run_parallel(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        serial_result = Ensemble.EnsembleRunner(system, number_of_replications=4, seed=3).run()
+        parallel_result = Ensemble.EnsembleRunner(system, number_of_replications=4, number_of_workers=2, seed=3).run()
+        assert parallel_result.replication_outputs == serial_result.replication_outputs
+        assert parallel_result.summarize() == serial_result.summarize()
+
+    def test_set_seed(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        assert Ensemble.EnsembleRunner(system, number_of_replications=2, seed=7).seed == 7
+        system.set_random_streams(RandomStreams.RandomStreams(11))
+        assert Ensemble.EnsembleRunner(system, number_of_replications=2).seed == 11
+        system.set_random_streams(RandomStreams.RandomStreams())
+        assert Ensemble.EnsembleRunner(system, number_of_replications=2).seed is not None
+
+    def test_summarize(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        ensemble_result = Ensemble.EnsembleRunner(system, number_of_replications=2, seed=1).run()
+        summary = ensemble_result.summarize()
+        summarized_calculators = [resilience_calculator for resilience_calculator in system.resilience_calculators if isinstance(resilience_calculator, Ensemble.EnsembleResult.SUMMARIZED_CALCULATORS)]
+        assert len(summary) == len(summarized_calculators)
+        for calculator_summary in summary:
+            if calculator_summary['ResilienceCalculator'] == 'HospitalMeasureOfServiceCalculator':
+                assert set(calculator_summary['Summary'].keys()) == {'MortalityRateBefore24H', 'MortalityRateAfter24H', 'AverageLengthOfStay', 'SurgeriesPerformed', 'SurgeriesCancelled'}
+                assert calculator_summary['Summary']['AverageLengthOfStay']['Std'] >= 0.0
+
+    def test_summarize_values(self):
+        ensemble_result = Ensemble.EnsembleResult([], [])
+        summary = ensemble_result.summarize_values([1.0, 2.0, 3.0])
+        assert summary['Mean'] == 2.0
+        assert summary['Std'] == 1.0
+        assert summary['Min'] == 1.0
+        assert summary['Max'] == 3.0
+        assert summary['ConfidenceInterval'][0] == pytest.approx(2.0 - 2.4842, abs=1e-4)
+        assert summary['ConfidenceInterval'][1] == pytest.approx(2.0 + 2.4842, abs=1e-4)
+        summary = ensemble_result.summarize_values([5.0])
+        assert summary['ConfidenceInterval'] == [5.0, 5.0]
+
+    def test_summarize_outputs_with_missing_keys(self):
+        ensemble_result = Ensemble.EnsembleResult([], [])
+        summary = ensemble_result.summarize_outputs([{'Red': {'Oxygen': 2}}, {'Red': {'Oxygen': 4, 'Blood': 2}}])
+        assert summary['Red']['Oxygen']['Mean'] == 3.0
+        assert summary['Red']['Blood']['Mean'] == 1.0
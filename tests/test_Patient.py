@@ -1,6 +1,10 @@
 import random
 import math
+import copy
+import pickle
+import pytest
 from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import RandomStreams
 
 random.seed(1)
 
@@ -32,8 +36,8 @@ class TestPatientType():
         assert patient.name == self.PATIENT_NAME
         assert patient.demand == [{'Resource_1': 10, 'Stretcher': 1, 'Resource_2': 5, 'Resource_3': 5}, {'Stretcher': 1, 'Resource_4': 1, 'Resource_5': 5, 'Resource_6': 5}, {}]
         assert patient.departments == ['Department_1', 'Department_2', 'EXIT']
-        assert patient.mortality_rates == [0.01, 0.0, 0.0]
-        assert patient.lengths_of_stay == [8, 5, 1000]
+        assert patient.mortality_rates == (0.01, 0.0, 0.0)
+        assert patient.lengths_of_stay == (8, 5, 1000)
         assert patient.flow == [{'Department': 'Department_1', 'TimeStepAtDepartment': [], 'TimeStepTreated': []}]
         assert patient.treated == False
         assert patient.alive == True
@@ -53,21 +57,58 @@ class TestPatientType():
         resource_demand = patient.get_resource_demand()
         assert resource_demand == {}
 
-    def test_update_consumable_demand(self):
+    def test_demand_of_one_time_consumables(self):
         patient = Patient.PatientType()
         patient.set_parameters(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
-        patient.update_consumable_demand()
         assert patient.demand[0]['Stretcher'] == 1
         patient.flow[0]['TimeStepAtDepartment'] = [1]
-        patient.update_consumable_demand()
         assert patient.demand[0]['Stretcher'] == 0
         patient.flow.append({'Department': 'Department_2', 'TimeStepAtDepartment': [], 'TimeStepTreated': []})
-        patient.update_consumable_demand()
         assert patient.demand[1]['Stretcher'] == 1
         patient.flow[1]['TimeStepAtDepartment'] = [1]
-        patient.update_consumable_demand()
         assert patient.demand[1]['Stretcher'] == 0
 
+    def test_triage_category(self):
+        assert Patient.PatientProfile('Patient Red', self.PATIENT_PARAMETERS_SIMPLE).triage_category == 'Red'
+        assert Patient.PatientProfile('Patient Green', self.PATIENT_PARAMETERS_SIMPLE).triage_category == 'Green'
+        assert Patient.PatientProfile(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE).triage_category == 'Rest'
+        assert Patient.PatientProfile.find_triage_category('Patient Green', ['Red', 'Other']) == 'Other'
+
+    def test_shared_patient_profile(self):
+        patient_profile = Patient.PatientProfile(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
+        patient_1 = Patient.PatientType(patient_profile)
+        patient_2 = copy.deepcopy(patient_1)
+        assert patient_2.profile is patient_profile
+        assert patient_2.flow is not patient_1.flow
+        patient_1.flow[0]['TimeStepAtDepartment'] = [1]
+        assert patient_1.get_resource_demand()['Stretcher'] == 0
+        assert patient_2.get_resource_demand()['Stretcher'] == 1
+        with pytest.raises(TypeError):
+            patient_1.get_resource_demand()['Stretcher'] = 1
+        with pytest.raises(AttributeError):
+            patient_1.new_attribute = 1
+        unpickled_patient = pickle.loads(pickle.dumps(patient_1))
+        assert unpickled_patient.demand == patient_1.demand
+        assert unpickled_patient.flow == patient_1.flow
+
+    def test_patient_library(self):
+        patient_library = Patient.PatientLibrary({self.PATIENT_NAME: self.PATIENT_PARAMETERS_SIMPLE})
+        patient_profile = patient_library.get_profile(self.PATIENT_NAME)
+        assert patient_library.get_profile(self.PATIENT_NAME) is patient_profile
+        assert patient_profile.lengths_of_stay == (8, 5, 1000)
+        with pytest.raises(TypeError):
+            patient_profile.mortality_rates[0] = 0.5
+        unpickled_patient_library = pickle.loads(pickle.dumps(patient_library))
+        assert unpickled_patient_library.get_profile(self.PATIENT_NAME).mortality_rates == patient_profile.mortality_rates
+
+    def test_demand_met_created_when_demand_not_met(self):
+        patient = Patient.PatientType(Patient.PatientProfile(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE))
+        assert patient.resource_demand_met()
+        assert patient._demand_met is None
+        patient.update_resource_demand_met('Resource_1', 0.5)
+        assert patient.demand_met[0] == {'Resource_1': 0.5, 'Stretcher': 1.0, 'Resource_2': 1.0, 'Resource_3': 1.0}
+        assert not(patient.resource_demand_met())
+
     def test_get_current_department(self):
         patient = Patient.PatientType()
         patient.set_parameters(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
@@ -310,7 +351,6 @@ class TestPatientType():
         patient.set_current_baseline_length_of_stay() 
         patient.check_consequences_of_unmet_demand(time_step=0)
         assert patient.length_of_stay == 5 * 1.2  
-        patient.lengths_of_stay[1] = 5
         patient.demand_met[1]['Resource_6'] = 0.2 # random value below 1
         patient.check_consequences_of_unmet_demand(time_step=0)        
         assert patient.length_of_stay == 5 * 1.2**4
@@ -386,7 +426,9 @@ class TestPatientType():
         output = patient.update_patient_when_nurses_missing('Resource_1', 1.2, 0.9, patient.lengths_of_stay[0])
         assert output == 8 * 1.2
 
-        patient.demand = [{'Resource_1': 10, 'Stretcher': 1, 'Resource_2': 5, 'Resource_3': 0.25}, {'Stretcher': 1, 'Resource_4': 1, 'Resource_5': 5, 'Resource_6': 5}, {}]
+        patient_parameters = copy.deepcopy(self.PATIENT_PARAMETERS_SIMPLE)
+        patient_parameters[0]['Department_1']['ResourcesRequired'][3]['ResourceAmount'] = 0.25
+        patient.set_profile(Patient.PatientProfile(self.PATIENT_NAME, patient_parameters))
         output = patient.update_patient_when_nurses_missing('Resource_3', 0.9, 1.0, patient.lengths_of_stay[0])
         assert output == 8
         output = patient.update_patient_when_nurses_missing('Resource_3', 1.0, 0.5, patient.lengths_of_stay[0])
@@ -430,6 +472,29 @@ class TestPatientType():
         patient.check_if_alive()
         assert patient.alive == False  
 
+    def test_draw_uniform(self):
+        patient = Patient.PatientType()
+        patient.set_parameters(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
+        assert patient.draw_uniform() == RandomStreams.LEGACY_UNIFORM_DRAW
+        patient.set_random_key(12345)
+        first_draw = patient.draw_uniform()
+        assert first_draw == RandomStreams.uniform_from_key(12345, 0)
+        assert patient.draw_uniform() == first_draw
+        patient.mortality_rate = 0.0
+        patient.record_mortality_rate()
+        assert patient.draw_uniform() == RandomStreams.uniform_from_key(12345, 1)
+
+    def test_check_if_alive_with_random_key(self):
+        patient = Patient.PatientType()
+        patient.set_parameters(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
+        patient.set_random_key(12345)
+        patient.mortality_rate = patient.draw_uniform()
+        patient.check_if_alive()
+        assert patient.alive == True
+        patient.mortality_rate = patient.draw_uniform() + 1e-9
+        patient.check_if_alive()
+        assert patient.alive == False
+
     def test_get_current_length_of_stay(self):
         patient = Patient.PatientType()
         patient.set_parameters(self.PATIENT_NAME, self.PATIENT_PARAMETERS_SIMPLE)
@@ -0,0 +1,55 @@
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientArchive
+
+class TestPatientArchive():
+
+    PATIENT_PARAMETERS = [{'Department_1': {'BaselineLengthOfStay': 2, 'BaselineMortalityRate': 0.0,
+                                            'ResourcesRequired': [{'ResourceName': 'Resource_1', 'ResourceAmount': 1, 'ConsequencesOfUnmetDemand': [{'None': 0}]}]}}]
+
+    def create_exited_patient(self, alive=True):
+        patient = Patient.PatientType()
+        patient.set_parameters('ExamplePatient', self.PATIENT_PARAMETERS)
+        patient.alive = alive
+        patient.move_to_next_department()
+        return patient
+
+    def test_archive_patient(self):
+        patient_archive = PatientArchive.PatientArchive()
+        patient_archive.archive_patient(self.create_exited_patient())
+        patient_archive.archive_patient(self.create_exited_patient(alive=False))
+        assert len(patient_archive.patients) == 2
+        assert patient_archive.exited_patients == {'ExamplePatient': 2}
+        assert patient_archive.dead_patients == {'ExamplePatient': 1}
+
+    def test_update(self):
+        patient_archive = PatientArchive.PatientArchive()
+        first_patient = self.create_exited_patient()
+        patient_archive.archive_patient(first_patient)
+        patient_archive.update(3)
+        second_patient = self.create_exited_patient()
+        patient_archive.archive_patient(second_patient)
+        patient_archive.update(4)
+        patient_archive.update(5)
+        # archived patients are only updated at their first time step at EXIT
+        assert first_patient.flow[-1]['TimeStepAtDepartment'] == [3]
+        assert second_patient.flow[-1]['TimeStepAtDepartment'] == [4]
+        assert first_patient.treated and second_patient.treated
+
+    def test_complete_stays(self):
+        patient_archive = PatientArchive.PatientArchive()
+        first_patient = self.create_exited_patient()
+        patient_archive.archive_patient(first_patient)
+        patient_archive.update(3)
+        patient_archive.update(4)
+        second_patient = self.create_exited_patient()
+        patient_archive.archive_patient(second_patient)
+        patient_archive.complete_stays()
+        assert first_patient.flow[-1]['TimeStepAtDepartment'] == [3, 4]
+        assert second_patient.flow[-1]['TimeStepAtDepartment'] == []
+        patient_archive.update(5)
+        patient_archive.update(6)
+        patient_archive.complete_stays()
+        patient_archive.complete_stays()
+        assert first_patient.flow[-1]['TimeStepAtDepartment'] == [3, 4, 5, 6]
+        assert first_patient.flow[-1]['TimeStepTreated'] == [3, 4, 5, 6]
+        assert second_patient.flow[-1]['TimeStepAtDepartment'] == [5, 6]
@@ -0,0 +1,36 @@
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientList
+
+class TestPatientList():
+
+    PATIENT_PARAMETERS = [{'Department_1': {'BaselineLengthOfStay': 2, 'BaselineMortalityRate': 0.0,
+                                            'ResourcesRequired': [{'ResourceName': 'Resource_1', 'ResourceAmount': 1, 'ConsequencesOfUnmetDemand': [{'None': 0}]}]}}]
+
+    def create_patients(self, number_of_patients):
+        patients = []
+        for _ in range(number_of_patients):
+            patient = Patient.PatientType()
+            patient.set_parameters('ExamplePatient', self.PATIENT_PARAMETERS)
+            patients.append(patient)
+        return patients
+
+    def test_keep_order_of_arrival(self):
+        patients = self.create_patients(4)
+        patient_list = PatientList.PatientList(patients[:2])
+        patient_list += patients[2:3]
+        patient_list.append(patients[3])
+        assert patient_list == patients
+        assert len(patient_list) == 4
+        assert patient_list[1] is patients[1]
+        assert patient_list[-2:] == patients[-2:]
+
+    def test_remove(self):
+        patients = self.create_patients(4)
+        patient_list = PatientList.PatientList(patients)
+        patient_list.remove(patients[1])
+        assert patients[1] not in patient_list
+        # removing a patient keeps the order of the remaining patients
+        assert patient_list == [patients[0], patients[2], patients[3]]
+        # a removed patient that arrives again is last
+        patient_list.append(patients[1])
+        assert patient_list == [patients[0], patients[2], patients[3], patients[1]]
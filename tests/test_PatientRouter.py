@@ -0,0 +1,96 @@
+import copy
+from pyrecodes_hospitals import main
+from pyrecodes_hospitals import Component
+from pyrecodes_hospitals import Patient
+from pyrecodes_hospitals import PatientRouter
+
+class TestPatientRouter():
+
+    MAIN_FILE = './tests/test_inputs/test_inputs_Hospital_Main.json'
+    ADDITIONAL_DATA_LOCATION = './tests/test_inputs/'
+    EXCEL_INPUT_1 = './tests/test_inputs/test_inputs_Hospital_ExcelInput1.xlsx'
+    COMPONENT_PARAMETERS = {'ComponentClass': 'HospitalComponent',
+                            'RecoveryModel': {'Type': 'NoRecoveryActivity',
+                                              'Parameters': {},
+                                              'DamageFunctionalityRelation': {'Type': 'Constant'}},
+                            'Supply': {},
+                            'OperationDemand': {'Resource_1': {'Amount': 0, 'ResourceClassName': 'ConcreteResource', 'FunctionalityToAmountRelation': 'Constant'}}}
+    PATIENT_PARAMETERS = [{'Department_1': {'BaselineLengthOfStay': 8, 'BaselineMortalityRate': 0.0,
+                                            'ResourcesRequired': [{'ResourceName': 'Resource_1', 'ResourceAmount': 1, 'ConsequencesOfUnmetDemand': [{'None': 0}]}]}},
+                          {'Department_2': {'BaselineLengthOfStay': 5, 'BaselineMortalityRate': 0.0,
+                                            'ResourcesRequired': [{'ResourceName': 'Resource_1', 'ResourceAmount': 1, 'ConsequencesOfUnmetDemand': [{'None': 0}]}]}}]
+
+    def create_system(self, excel_input):
+        excel_input = main.read_excel_input(excel_input)
+        input_dict = main.read_main_file(self.MAIN_FILE, self.ADDITIONAL_DATA_LOCATION)
+        main.format_input_from_excel(excel_input, {}, input_dict, self.ADDITIONAL_DATA_LOCATION,
+                                     default_patient_library_file='test_inputs_Hospital_PatientTypeLibrary.json',
+                                     default_stress_scenario_file='test_inputs_Hospital_StressScenario.json')
+        return main.create_system(input_dict)
+
+    def create_departments(self):
+        departments = []
+        for department_name in ['Department_1', 'Department_2']:
+            department = Component.HospitalComponent()
+            department.form(department_name, self.COMPONENT_PARAMETERS)
+            departments.append(department)
+        return departments
+
+    def add_patients(self, department, number_of_patients):
+        patient = Patient.PatientType()
+        patient.set_parameters('ExamplePatient', self.PATIENT_PARAMETERS)
+        for _ in range(number_of_patients):
+            department.add_patient(copy.deepcopy(patient))
+
+    def test_move_patients(self):
+        department_1, department_2 = self.create_departments()
+        patient_router = PatientRouter.PatientRouter([department_1, department_2])
+        assert department_1.patient_router is patient_router
+        assert patient_router.departments == {'Department_1': department_1, 'Department_2': department_2}
+        self.add_patients(department_1, 5)
+        patients_that_move = [department_1.patients[1], department_1.patients[3]]
+        for patient in patients_that_move:
+            patient.move_to_next_department()
+        # only reported patients are moved
+        patient_router.move_patients()
+        assert len(department_1.patients) == 5
+        department_1.report_leaving_patients(department_1.patients)
+        patient_router.move_patients()
+        assert len(department_1.patients) == 3
+        assert department_2.patients == patients_that_move
+        assert patient_router.leaving_patients == {}
+
+    def test_archive_exited_patients(self):
+        department_1, exit_component = self.create_departments()
+        exit_component.name = Patient.PatientType.EXIT
+        patient_router = PatientRouter.PatientRouter([department_1, exit_component])
+        assert exit_component.patient_archive is patient_router.patient_archive
+        self.add_patients(department_1, 2)
+        department_1.patients[0].flow.append({'Department': Patient.PatientType.EXIT, 'TimeStepAtDepartment': [], 'TimeStepTreated': []})
+        department_1.patients[0].alive = False
+        department_1.report_leaving_patients(department_1.patients)
+        patient_router.move_patients()
+        assert len(exit_component.patients) == 1
+        assert patient_router.patient_archive.patients == exit_component.patients
+        assert patient_router.patient_archive.dead_patients == {'ExamplePatient': 1}
+
+    def test_remove_patients(self):
+        department_1, _ = self.create_departments()
+        self.add_patients(department_1, 3)
+        patient_that_moves = department_1.patients[2]
+        patient_that_moves.move_to_next_department()
+        # patients that are still in the component are kept and patients reported twice are removed once
+        patients_that_move = department_1.remove_patients([department_1.patients[0], patient_that_moves, patient_that_moves])
+        assert patients_that_move == [patient_that_moves]
+        assert len(department_1.patients) == 2
+
+    def test_same_results_as_scanning_all_components(self):
+        routed_system = self.create_system(self.EXCEL_INPUT_1)
+        scanned_system = copy.deepcopy(routed_system)
+        scanned_system.set_patient_router(False)
+        routed_system.start_resilience_assessment()
+        scanned_system.start_resilience_assessment()
+        assert routed_system.calculate_resilience() == scanned_system.calculate_resilience()
+        for routed_component, scanned_component in zip(routed_system.components, scanned_system.components):
+            assert [patient.flow for patient in routed_component.patients] == [patient.flow for patient in scanned_component.patients]
+            assert [patient.alive for patient in routed_component.patients] == [patient.alive for patient in scanned_component.patients]
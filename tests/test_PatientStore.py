@@ -0,0 +1,265 @@
+import pytest
+import copy
+import pickle
+import numpy as np
+from pyrecodes_hospitals import main
+from pyrecodes_hospitals import Component
+from pyrecodes_hospitals import PatientStore
+from pyrecodes_hospitals import RandomStreams
+from pyrecodes_hospitals import ResilienceCalculator
+
+class TestPatientArrayStore():
+
+    MAIN_FILE = './tests/test_inputs/test_inputs_Hospital_Main.json'
+    ADDITIONAL_DATA_LOCATION = './tests/test_inputs/'
+    EXCEL_INPUT_1 = './tests/test_inputs/test_inputs_Hospital_ExcelInput1.xlsx'
+    EXCEL_INPUT_2 = './tests/test_inputs/test_inputs_Hospital_ExcelInput2.xlsx'
+
+    def create_system(self, excel_input):
+        excel_input = main.read_excel_input(excel_input)
+        input_dict = main.read_main_file(self.MAIN_FILE, self.ADDITIONAL_DATA_LOCATION)
+        main.format_input_from_excel(excel_input, {}, input_dict, self.ADDITIONAL_DATA_LOCATION,
+                                     default_patient_library_file='test_inputs_Hospital_PatientTypeLibrary.json',
+                                     default_stress_scenario_file='test_inputs_Hospital_StressScenario.json')
+        return main.create_system(input_dict)
+
+    def run_object_and_array_models(self, excel_input, random_streams, patient_store_type='PatientArrayStore'):
+        object_system = self.create_system(excel_input)
+        object_system.set_random_streams(random_streams)
+        array_system = copy.deepcopy(object_system)
+        array_system.set_patient_store(patient_store_type)
+        object_system.start_resilience_assessment()
+        array_system.start_resilience_assessment()
+        return object_system, array_system
+
+    def assert_same_patients(self, object_system, array_system):
+        for object_component, array_component in zip(object_system.components, array_system.components):
+            assert len(object_component.patients) == len(array_component.patients)
+            for object_patient, array_patient in zip(object_component.patients, array_component.patients):
+                assert object_patient.name == array_patient.name
+                assert object_patient.alive == array_patient.alive
+                assert object_patient.treated == array_patient.treated
+                assert object_patient.mortality_rate_record == array_patient.mortality_rate_record
+                assert object_patient.unmet_demand_info == array_patient.unmet_demand_info
+                assert [department_info['Department'] for department_info in object_patient.flow] == [department_info['Department'] for department_info in array_patient.flow]
+                assert [department_info['TimeStepAtDepartment'] for department_info in object_patient.flow] == [department_info['TimeStepAtDepartment'] for department_info in array_patient.flow]
+                assert [len(department_info['TimeStepTreated']) for department_info in object_patient.flow] == [len(department_info['TimeStepTreated']) for department_info in array_patient.flow]
+
+    def assert_same_resilience(self, object_system, array_system):
+        assert object_system.calculate_resilience() == array_system.calculate_resilience()
+        for object_calculator, array_calculator in zip(object_system.resilience_calculators, array_system.resilience_calculators):
+            if hasattr(object_calculator, 'system_supply'):
+                for series_name in ['system_supply', 'system_demand', 'system_consumption']:
+                    for resource_name, object_series in getattr(object_calculator, series_name).items():
+                        # cohort demand is multiplied by the cohort size instead of summed patient by patient
+                        if isinstance(array_system.patient_store, PatientStore.PatientCohortStore):
+                            assert getattr(array_calculator, series_name)[resource_name] == pytest.approx(object_series, rel=1e-12, abs=1e-12)
+                        else:
+                            assert getattr(array_calculator, series_name)[resource_name] == object_series
+
+    @pytest.mark.parametrize('excel_input', [EXCEL_INPUT_1, EXCEL_INPUT_2])
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_same_results_as_patient_objects(self, excel_input, patient_store_type):
+        object_system, array_system = self.run_object_and_array_models(excel_input, RandomStreams.RandomStreams(), patient_store_type)
+        self.assert_same_patients(object_system, array_system)
+        self.assert_same_resilience(object_system, array_system)
+
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_same_results_as_patient_objects_with_seed(self, patient_store_type):
+        object_system, array_system = self.run_object_and_array_models(self.EXCEL_INPUT_1, RandomStreams.RandomStreams(5, 2), patient_store_type)
+        self.assert_same_patients(object_system, array_system)
+        self.assert_same_resilience(object_system, array_system)
+
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_same_results_as_patient_objects_with_compacted_logs(self, patient_store_type, monkeypatch):
+        monkeypatch.setattr(PatientStore.PatientLog, 'COMPACTION_THRESHOLD', 2)
+        object_system, array_system = self.run_object_and_array_models(self.EXCEL_INPUT_1, RandomStreams.RandomStreams(5, 2), patient_store_type)
+        assert len(array_system.patient_store.mortality_rate_log.compacted_entries) < 2
+        self.assert_same_patients(object_system, array_system)
+
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_count_patients_without_patient_objects(self, patient_store_type):
+        object_system = self.create_system(self.EXCEL_INPUT_1)
+        patient_types = list(object_system.components[0].patient_library.keys())
+        patient_calculators = [ResilienceCalculator.PatientFlowCalculator({'Scope': ['All'], 'Resources': patient_types}),
+                               ResilienceCalculator.DeadPatientsCalculator({'Resources': patient_types})]
+        for resilience_calculator in patient_calculators:
+            resilience_calculator.set_number_of_time_steps(object_system.MAX_TIME_STEP - object_system.START_TIME_STEP + 1)
+            resilience_calculator.register_aggregated_values(object_system.resilience_aggregator)
+        object_system.resilience_calculators += patient_calculators
+        array_system = copy.deepcopy(object_system)
+        array_system.set_patient_store(patient_store_type)
+        array_system.start_resilience_assessment(stop_time_step=5)
+        # patient objects are not created while the assessment runs
+        assert all(len(component.patients) == 0 for component in array_system.components)
+        array_system.start_resilience_assessment()
+        object_system.start_resilience_assessment()
+        object_flow_calculator, object_dead_patients_calculator = object_system.resilience_calculators[-2:]
+        array_flow_calculator, array_dead_patients_calculator = array_system.resilience_calculators[-2:]
+        assert object_flow_calculator.system_demand == array_flow_calculator.system_demand
+        assert object_flow_calculator.system_consumption == array_flow_calculator.system_consumption
+        assert object_dead_patients_calculator.dead_patients == array_dead_patients_calculator.dead_patients
+        assert sum(sum(dead_patients) for dead_patients in object_dead_patients_calculator.dead_patients.values()) > 0
+
+    def test_set_patient_store(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        assert system.patient_store is None
+        system.set_patient_store('PatientArrayStore')
+        hospital_components = [component for component in system.components if isinstance(component, Component.HospitalComponent)]
+        assert isinstance(system.patient_store, PatientStore.PatientArrayStore)
+        assert all(component.patient_store is system.patient_store for component in hospital_components)
+        system.set_patient_store(None)
+        assert system.patient_store is None
+        assert all(component.patient_store is None for component in hospital_components)
+
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_get_number_of_patients_in_departments(self, patient_store_type):
+        object_system = self.create_system(self.EXCEL_INPUT_1)
+        array_system = self.create_system(self.EXCEL_INPUT_1)
+        array_system.set_patient_store(patient_store_type)
+        for stop_time_step in [0, 2, 5, 10]:
+            object_system.start_resilience_assessment(stop_time_step=stop_time_step)
+            array_system.start_resilience_assessment(stop_time_step=stop_time_step)
+            number_of_patients_in_departments = sum(len(component.patients) for component in object_system.components
+                                                    if isinstance(component, Component.HospitalComponent) and component.patient_archive is None)
+            assert array_system.patient_store.get_number_of_patients_in_departments() == number_of_patients_in_departments
+            assert array_system.hospital_is_empty() == object_system.hospital_is_empty()
+
+    def test_add_patients_resizes_columns(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        patient_store = PatientStore.PatientArrayStore(system.components)
+        patient_library = system.components[0].patient_library
+        profile_name = list(patient_library.keys())[0]
+        patient_store.add_patients(profile_name, patient_library[profile_name], patient_store.INITIAL_CAPACITY + 1, component_id=1)
+        assert patient_store.number_of_patients == patient_store.INITIAL_CAPACITY + 1
+        assert patient_store.capacity >= patient_store.number_of_patients
+        assert patient_store.demand_met.shape == (patient_store.capacity, len(patient_store.profiles.resource_names))
+        assert np.all(patient_store.sequence_number[:patient_store.number_of_patients] == np.arange(patient_store.number_of_patients))
+
+    @pytest.mark.parametrize('patient_store_type', ['PatientArrayStore', 'PatientCohortStore'])
+    def test_pickle_only_rows_of_patients(self, patient_store_type):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        system.set_patient_store(patient_store_type)
+        system.start_resilience_assessment(stop_time_step=3)
+        patient_store = system.patient_store
+        unpickled_patient_store = pickle.loads(pickle.dumps(patient_store))
+        assert 0 < patient_store.number_of_patients < patient_store.capacity
+        assert len(pickle.dumps(patient_store)) < len(pickle.dumps(patient_store.__dict__))
+        assert unpickled_patient_store.capacity == patient_store.capacity
+        for name, column in patient_store.get_patient_columns().items():
+            unpickled_column = getattr(unpickled_patient_store, name)
+            assert unpickled_column.shape == column.shape
+            assert unpickled_column.dtype == column.dtype
+            if column.dtype != object:
+                assert np.array_equal(unpickled_column, column)
+
+    def test_update_unmet_demand_record(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        patient_store = PatientStore.PatientArrayStore(system.components)
+        patient_library = system.components[0].patient_library
+        profile_name = list(patient_library.keys())[0]
+        patient_store.add_patients(profile_name, patient_library[profile_name], 1, component_id=1)
+        rows = np.array([0])
+        # same as PatientType.length_of_last_n_elements_with_difference_one for [3], [3, 4], [3, 4, 6], [3, 4, 6, 7], [3, 4, 6, 7, 8]
+        for time_step, time_steps_in_a_row in zip([3, 4, 6, 7, 8], [0, 2, 1, 2, 3]):
+            assert patient_store.update_unmet_demand_record(rows, 0, time_step)[0] == time_steps_in_a_row
+
+class TestPatientLog():
+
+    def test_append_and_compact(self):
+        patient_log = PatientStore.PatientLog()
+        patient_log.COMPACTION_THRESHOLD = 2
+        for time_step in range(5):
+            patient_log.append((np.array([0, time_step]), np.full(2, time_step)))
+        assert patient_log.length == 10
+        assert len(patient_log.compacted_entries) + len(patient_log.pending_entries) < 5
+        rows, time_steps = patient_log.get_columns()
+        assert rows.tolist() == [0, 0, 0, 1, 0, 2, 0, 3, 0, 4]
+        assert time_steps.tolist() == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4]
+
+    def test_group_log_by_row(self):
+        patient_log = PatientStore.PatientLog()
+        patient_log.COMPACTION_THRESHOLD = 2
+        for time_step in range(3):
+            patient_log.append((np.array([1, 0]), np.full(2, time_step)))
+        grouped_log = PatientStore.PatientArrayStore.group_log_by_row(patient_log)
+        assert [column.tolist() for column in grouped_log[0]] == [[1, 3, 5], [0, 1, 2]]
+        assert [column.tolist() for column in grouped_log[1]] == [[0, 2, 4], [0, 1, 2]]
+
+class TestPatientProfileTable():
+
+    PATIENT_PROFILE = [{'EmergencyDepartment': {'BaselineMortalityRate': 0.01, 'BaselineLengthOfStay': 2,
+                                                'ResourcesRequired': [{'ResourceName': 'Stretcher', 'ResourceAmount': 1, 'ConsequencesOfUnmetDemand': [{'None': 0}]},
+                                                                      {'ResourceName': 'Nurse', 'ResourceAmount': 0.5, 'ConsequencesOfUnmetDemand': [{'Mortality Rate Increase [per missing nurse]': 1.1}]}]}},
+                       {'RestOfHospital': {'BaselineMortalityRate': 0.0, 'BaselineLengthOfStay': 5,
+                                           'ResourcesRequired': [{'ResourceName': 'Nurse', 'ResourceAmount': 0.2, 'ConsequencesOfUnmetDemand': [{'Death In [hours]': 4}]}]}}]
+
+    def test_add_profile(self):
+        profiles = PatientStore.PatientProfileTable(['PatientSource', 'EmergencyDepartment'])
+        profile_id = profiles.get_profile_id('Yellow', self.PATIENT_PROFILE)
+        assert profile_id == 0
+        assert profiles.get_profile_id('Yellow', self.PATIENT_PROFILE) == 0
+        assert profiles.department_names == ['EXIT', 'PatientSource', 'EmergencyDepartment', 'RestOfHospital']
+        assert profiles.resource_names == ['Stretcher', 'Nurse']
+        assert profiles.demand.tolist() == [[1.0, 0.5], [0.0, 0.2]]
+        assert profiles.has_resource.tolist() == [[True, True], [False, True]]
+        assert profiles.one_time_consumable.tolist() == [True, False]
+        assert profiles.key_consequences[1] == [(1, [(4, 4)])]
+        assert profiles.get_keys(np.array([0, 0, 0]), np.array([0, 1, 2])).tolist() == [0, 1, -1]
+        assert profiles.get_departments(np.array([0, 0, 0]), np.array([0, 1, 2])).tolist() == [2, 3, 0]
+
+class TestPatientCohortStore():
+
+    MAIN_FILE = './tests/test_inputs/test_inputs_Hospital_Main.json'
+    ADDITIONAL_DATA_LOCATION = './tests/test_inputs/'
+    EXCEL_INPUT_1 = './tests/test_inputs/test_inputs_Hospital_ExcelInput1.xlsx'
+
+    @pytest.fixture
+    def system(self):
+        return TestPatientArrayStore().create_system(self.EXCEL_INPUT_1)
+
+    def add_cohort(self, system, number_of_patients, random_keys=None):
+        patient_store = PatientStore.PatientCohortStore(system.components)
+        emergency_department_id = patient_store.component_ids['EmergencyDepartment']
+        patient_library = system.components[0].patient_library
+        patient_store.add_patients('Patient 1', patient_library['Patient 1'], number_of_patients, emergency_department_id, random_keys)
+        return patient_store, system.components[emergency_department_id]
+
+    def test_add_patients(self, system):
+        patient_store, _ = self.add_cohort(system, 5, random_keys=np.arange(5, dtype=np.uint64))
+        assert patient_store.number_of_patients == 1
+        assert patient_store.count[0] == 5
+        assert patient_store.member_random_keys[0].tolist() == [0, 1, 2, 3, 4]
+        patient_store.add_patients('Patient 1', system.components[0].patient_library['Patient 1'], 0, component_id=1)
+        assert patient_store.number_of_patients == 1
+
+    def test_distribute_resource_among_patients_priority(self, system):
+        patient_store, emergency_department = self.add_cohort(system, 5, random_keys=np.arange(5, dtype=np.uint64))
+        patient_store.distribute_resource_among_patients_priority(emergency_department, 'Oxygen', 0.4)
+        oxygen_id = patient_store.profiles.resource_ids['Oxygen']
+        rows = patient_store.get_rows_in_component(patient_store.component_ids['EmergencyDepartment'])
+        assert rows.tolist() == [0, 1]
+        assert patient_store.count[rows].tolist() == [2, 3]
+        assert patient_store.demand_met[rows, oxygen_id].tolist() == [1.0, 0.0]
+        assert patient_store.member_random_keys[1].tolist() == [2, 3, 4]
+        assert patient_store.parent_row[1] == 0
+
+    def test_check_if_alive(self, system):
+        random_keys = np.arange(20, dtype=np.uint64)
+        patient_store, _ = self.add_cohort(system, 20, random_keys=random_keys)
+        patient_store.has_random_key[0] = True
+        rows, mortality_rate, _ = patient_store.check_if_alive(np.array([0]), np.array([0.5]), np.array([2.0]))
+        members_dead = RandomStreams.uniform_from_keys(random_keys, np.zeros(20)) < 0.5
+        assert rows.tolist() == [0, 1]
+        assert mortality_rate.tolist() == [0.5, 0.5]
+        assert patient_store.count[:2].tolist() == [20 - members_dead.sum(), members_dead.sum()]
+        assert patient_store.alive[:2].tolist() == [True, False]
+        assert patient_store.member_random_keys[1].tolist() == random_keys[members_dead].tolist()
+        assert patient_store.draw_counter[:2].tolist() == [1, 1]
+
+    def test_synchronize_components(self, system):
+        patient_store, emergency_department = self.add_cohort(system, 3)
+        patient_store.synchronize_components()
+        assert len(emergency_department.patients) == 3
+        assert all(patient.name == 'Patient 1' for patient in emergency_department.patients)
+        assert all(patient.profile is system.components[0].get_patient_profile('Patient 1') for patient in emergency_department.patients)
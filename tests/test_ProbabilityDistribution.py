@@ -24,3 +24,9 @@ class TestProbabilityDistribution():
             bool_list.append(math.isclose(target_median, np.median(samples), abs_tol=0.03))
             bool_list.append(math.isclose(target_dispersion, np.std(np.log(samples)), abs_tol=0.03))
         assert all(bool_list)
+
+    def test_lognormal_with_random_generator(self):
+        parameters = {'Median': 5, 'Dispersion': 0.5}
+        samples = [ProbabilityDistribution.Lognormal(parameters, np.random.default_rng(3)).sample() for _ in range(2)]
+        assert samples[0] == samples[1]
+        assert samples[0] == np.random.default_rng(3).lognormal(math.log(5), 0.5)
@@ -0,0 +1,43 @@
+import numpy as np
+from pyrecodes_hospitals import RandomStreams
+
+class TestRandomStreams():
+
+    def test_is_seeded(self):
+        assert RandomStreams.RandomStreams().is_seeded() == False
+        assert RandomStreams.RandomStreams(0).is_seeded() == True
+
+    def test_get_seed_sequence(self):
+        random_streams = RandomStreams.RandomStreams(42, replication_id=3)
+        seed_sequence = random_streams.get_seed_sequence('PatientSource/Red')
+        # the seed sequence of a subsystem is a child of the seed sequence of its replication
+        replication_seed_sequence = np.random.SeedSequence(42).spawn(4)[3]
+        assert seed_sequence.spawn_key[:1] == replication_seed_sequence.spawn_key
+        assert seed_sequence.entropy == replication_seed_sequence.entropy
+
+    def test_get_generator(self):
+        random_streams = RandomStreams.RandomStreams(42)
+        # streams do not depend on the order in which they are created
+        first_draws = random_streams.get_generator('A').random(5)
+        random_streams.get_generator('B').random(5)
+        assert np.array_equal(first_draws, random_streams.get_generator('A').random(5))
+        assert not np.array_equal(first_draws, random_streams.get_generator('B').random(5))
+        assert not np.array_equal(first_draws, random_streams.for_replication(1).get_generator('A').random(5))
+
+    def test_draw_random_keys(self):
+        random_keys = RandomStreams.draw_random_keys(RandomStreams.RandomStreams(1).get_generator('A'), 3)
+        assert len(random_keys) == 3
+        assert len(set(random_keys)) == 3
+
+    def test_uniform_from_key(self):
+        draws = [RandomStreams.uniform_from_key(123456789, counter) for counter in range(10000)]
+        assert all([0.0 <= draw < 1.0 for draw in draws])
+        assert abs(np.mean(draws) - 0.5) < 0.01
+        assert RandomStreams.uniform_from_key(123456789, 5) == draws[5]
+        assert RandomStreams.uniform_from_key(123456788, 5) != draws[5]
+
+    def test_uniform_from_keys(self):
+        keys = RandomStreams.draw_random_keys(RandomStreams.RandomStreams(1).get_generator('A'), 50)
+        counters = np.arange(50)
+        draws = RandomStreams.uniform_from_keys(keys, counters)
+        assert all([draw == RandomStreams.uniform_from_key(int(key), int(counter)) for draw, key, counter in zip(draws, keys, counters)])
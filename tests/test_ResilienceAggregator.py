@@ -0,0 +1,102 @@
+import copy
+from pyrecodes_hospitals import main
+from pyrecodes_hospitals import ResilienceAggregator
+from pyrecodes_hospitals import ResilienceCalculator
+
+INPUT_DICT = './tests/test_inputs/test_inputs_Hospital_Main.json'
+EXCEL_INPUT_2 = './tests/test_inputs/test_inputs_Hospital_ExcelInput2.xlsx'
+ADDITIONAL_DATA_LOCATION = './tests/test_inputs/'
+
+def initiate_system(excel_input_file_name: str, additional_data_location: str):
+    excel_input_data = main.read_excel_input(excel_input_file_name)
+    input_dict = main.read_main_file(INPUT_DICT, additional_data_location)
+    main.format_input_from_excel(excel_input_data, {}, input_dict, additional_data_location,
+                                 default_patient_library_file='test_inputs_Hospital_PatientLibrary.json',
+                                 default_stress_scenario_file='test_inputs_Hospital_StressScenario.json')
+    return main.create_system(input_dict)
+
+def run_system_time_step(system, time_step: int):
+    system.time_step = time_step
+    system.receive_patients()
+    system.update()
+    system.distribute_resources()
+    system.update_patients()
+    system.update_resilience_calculators()
+    return system
+
+class TestResilienceAggregator():
+
+    def run_system(self, number_of_time_steps: int):
+        system = initiate_system(EXCEL_INPUT_2, ADDITIONAL_DATA_LOCATION)
+        system.set_initial_damage()
+        for time_step in range(number_of_time_steps):
+            system = run_system_time_step(system, time_step)
+        return system
+
+    def test_update_resource_totals(self):
+        system = self.run_system(3)
+        aggregator = ResilienceAggregator.ResilienceAggregator(system.resources, system.components)
+        keys = {}
+        for resource_name in system.resources:
+            for scope in [['All'], ['EmergencyDepartment'], ['EmergencyDepartment', 'OperatingTheater']]:
+                keys[(resource_name, tuple(scope))] = aggregator.register_resource_totals(resource_name, scope)
+        assert aggregator.register_resource_totals('Nurse', ['All']) == keys[('Nurse', ('All',))]
+        assert aggregator.resource_totals == {}
+        aggregator.update()
+        assert len(aggregator.resource_totals) == len(keys)
+        for (resource_name, scope), key in keys.items():
+            distribution_model = system.resources[resource_name]['DistributionModel']
+            assert aggregator.resource_totals[key] == (distribution_model.get_total_supply(list(scope)),
+                                                       distribution_model.get_total_demand(list(scope)),
+                                                       distribution_model.get_total_consumption(list(scope)))
+
+    def test_update_totals_of_given_resources(self):
+        system = self.run_system(3)
+        aggregator = ResilienceAggregator.ResilienceAggregator(system.resources, system.components)
+        water_key = aggregator.register_resource_totals('Water', ['All'])
+        nurse_key = aggregator.register_resource_totals('Nurse', ['All'])
+        aggregator.update()
+        aggregator.resource_totals[nurse_key] = None
+        aggregator.update({'Water'})
+        assert aggregator.resource_totals[nurse_key] is None
+        assert aggregator.resource_totals[water_key] == system.resources['Water']['DistributionModel'].get_totals(['All'])
+
+    def test_update_patient_totals(self):
+        system = self.run_system(3)
+        aggregator = ResilienceAggregator.ResilienceAggregator(system.resources, system.components)
+        all_components = aggregator.register_patient_counts(tuple(range(len(system.components))))
+        emergency_department = aggregator.register_patient_counts((1,))
+        assert aggregator.counts_patients()
+        aggregator.update()
+        all_patients = []
+        for component in system.components:
+            if getattr(component, 'patient_archive', None) is not None:
+                all_patients += component.patient_archive.patients
+            else:
+                all_patients += component.patients
+        for patient_scope, patients in [(all_components, all_patients), (emergency_department, system.components[1].patients)]:
+            patient_totals = aggregator.patient_totals[patient_scope]
+            for patient_type in set(patient.name for patient in patients):
+                patients_of_type = [patient for patient in patients if patient.name == patient_type]
+                assert patient_totals[patient_type][0] == len(patients_of_type)
+                assert patient_totals[patient_type][2] == sum(patient.alive == False for patient in patients_of_type)
+            assert sum(counts[0] for counts in patient_totals.values()) == len(patients)
+
+    def test_same_results_as_updating_calculators_with_components(self):
+        system = initiate_system(EXCEL_INPUT_2, ADDITIONAL_DATA_LOCATION)
+        system.set_initial_damage()
+        patient_flow_calculator = ResilienceCalculator.PatientFlowCalculator({'Scope': ['All'], 'Resources': ['Red', 'Green']})
+        dead_patients_calculator = ResilienceCalculator.DeadPatientsCalculator({'Resources': ['Red', 'Yellow', 'Blue', 'Green']})
+        aggregated_calculators = [copy.deepcopy(patient_flow_calculator), copy.deepcopy(dead_patients_calculator)]
+        for resilience_calculator in aggregated_calculators:
+            resilience_calculator.register_aggregated_values(system.resilience_aggregator)
+        for time_step in range(5):
+            system = run_system_time_step(system, time_step)
+            patient_flow_calculator.update(system.components)
+            dead_patients_calculator.update(system.components)
+            system.resilience_aggregator.update()
+            for resilience_calculator in aggregated_calculators:
+                resilience_calculator.update_from_aggregator(system.resilience_aggregator)
+        assert aggregated_calculators[0].system_demand == patient_flow_calculator.system_demand
+        assert aggregated_calculators[0].system_consumption == patient_flow_calculator.system_consumption
+        assert aggregated_calculators[1].dead_patients == dead_patients_calculator.dead_patients
@@ -3,6 +3,7 @@ from pyrecodes_hospitals import main
 from pyrecodes_hospitals import ResilienceCalculator
 from pyrecodes_hospitals import Patient
 import math
+import pytest
 import random
 
 INPUT_DICT = './tests/test_inputs/test_inputs_Hospital_Main.json'
@@ -546,6 +547,30 @@ class TestHospitalMeasuresOfServiceCalculator:
         assert math.isclose(resilience_calculator_OT.calculate_baseline_mortality_rate(system.components), 0)
         assert math.isclose(resilience_calculator_OT_YELLOW.calculate_baseline_mortality_rate(system.components), 0)
 
+    def test_get_baseline_mortality_rate(self):
+        system = initiate_system(EXCEL_INPUT_4, ADDITIONAL_DATA_LOCATION)
+        system.set_initial_damage()
+        for time_step in range(0, 2):
+            system = run_system_time_step(system, time_step)
+        resilience_calculator = ResilienceCalculator.HospitalMeasureOfServiceCalculator(self.PARAMETERS_ALL_PATIENTS)
+        resilience_calculator_ED = ResilienceCalculator.HospitalMeasureOfServiceCalculator(self.PARAMETERS_ED)
+        cause_of_death_calculator = ResilienceCalculator.CauseOfDeathCalculator(self.PARAMETERS_ALL_PATIENTS)
+        for calculator in [resilience_calculator, resilience_calculator_ED, cause_of_death_calculator]:
+            calculator.update(system.components)
+        for patient in system.components[1].patients:
+            for calculator in [resilience_calculator, resilience_calculator_ED]:
+                mortality_rates_per_time_step = calculator.get_mortality_rates_per_time_step_during_entire_length_of_stay(patient)
+                assert math.isclose(calculator.get_baseline_mortality_rate(patient), calculator.get_mortality_rate_during_entire_length_of_stay(mortality_rates_per_time_step), abs_tol=1e-15)
+        patient = system.components[1].patients[0]
+        baseline_mortality_rates = system.components[0].compiled_patient_library.baseline_mortality_rates
+        assert cause_of_death_calculator.baseline_mortality_rates is baseline_mortality_rates
+        assert (patient.name, ('All',), 'serial_system_failing') in baseline_mortality_rates
+        assert (patient.name, ('EmergencyDepartment',), 'serial_system_failing') in baseline_mortality_rates
+        assert not(hasattr(patient.profile, 'baseline_mortality_rates'))
+        baseline_mortality_rates[(patient.name, ('All',), 'serial_system_failing')] = 0.5
+        assert resilience_calculator.get_baseline_mortality_rate(patient) == 0.5
+        assert cause_of_death_calculator.get_baseline_mortality_rate(patient) == 0.5
+
     def test_calculate_mortality_rate_based_on_recorded_data(self):
         system = initiate_system(EXCEL_INPUT_4, ADDITIONAL_DATA_LOCATION)
         resilience_calculator = ResilienceCalculator.HospitalMeasureOfServiceCalculator(self.PARAMETERS_ALL_PATIENTS)
@@ -701,6 +726,38 @@ class TestHospitalMeasuresOfServiceCalculator:
         assert math.isclose(measures_of_service['SurgeriesCancelled'], 0)
         assert math.isclose(measures_of_service['AverageLengthOfStay'], 3.0)
 
+    def test_add_to_partials(self):
+        values = [0.1, 1e16, 0.3, -1e16, 0.2] * 3
+        partials, reversed_partials = [], []
+        for value in values:
+            ResilienceCalculator.HospitalMeasureOfServiceCalculator.add_to_partials(partials, value)
+        for value in reversed(values):
+            ResilienceCalculator.HospitalMeasureOfServiceCalculator.add_to_partials(reversed_partials, value)
+        assert math.fsum(partials) == math.fsum(reversed_partials) == math.fsum(values)
+
+    def test_calculate_resilience_from_patient_measures(self):
+        random.seed(0)
+        system = initiate_system(EXCEL_INPUT_4, ADDITIONAL_DATA_LOCATION)
+        system.set_initial_damage()
+        system.components[12].supply['Supply']['Oxygen'].current_amount = 3120
+        system.components[12].supply['Supply']['Oxygen'].initial_amount = 3120
+        resilience_calculators = [ResilienceCalculator.HospitalMeasureOfServiceCalculator(parameters) for parameters in
+                                  [self.PARAMETERS_ALL_PATIENTS, self.PARAMETERS_RED, self.PARAMETERS_GREEN, self.PARAMETERS_ED_RED]]
+        for time_step in range(10):
+            system = run_system_time_step(system, time_step)
+            for resilience_calculator in resilience_calculators:
+                resilience_calculator.update_from_aggregator(system.resilience_aggregator)
+        assert system.components[-1].patient_archive.number_of_updated_patients > 0
+        # calculators with the same scope share the sums of archived patients' measures
+        assert resilience_calculators[0].archived_patient_measures['EXIT'] is resilience_calculators[2].archived_patient_measures['EXIT']
+        assert resilience_calculators[0].archived_patient_measures['EXIT'] is not resilience_calculators[3].archived_patient_measures['EXIT']
+        for resilience_calculator in resilience_calculators:
+            assert resilience_calculator.archived_patient_measures['EXIT']['NumberOfPatients'] == system.components[-1].patient_archive.number_of_updated_patients
+            measures_of_service = dict(resilience_calculator.calculate_resilience())
+            resilience_calculator.archived_patient_measures = None
+            # sums of measures can differ from the mean of all patients' measures in the last digits
+            assert measures_of_service == pytest.approx(resilience_calculator.calculate_resilience(), rel=1e-12)
+
 class TestCauseOfDeathCalculator():
 
     PARAMETERS = {
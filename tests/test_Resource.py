@@ -151,6 +151,20 @@ class TestConsumableResource():
         assert resource.current_amount == 0.0
         assert resource.initial_amount == 5.0
 
+    def test_get_amount_after_consumption(self, resource: Resource.ConsumableResource):
+        assert resource.get_amount_after_consumption(5.0, 0.5) == 4.5
+        assert resource.get_amount_after_consumption(5.0, 10.0) == 0.0
+        assert resource.current_amount == 5.0
+
+    def test_get_amounts_after_consumption(self, resource: Resource.ConsumableResource):
+        amounts = []
+        amount = 5.0
+        for _ in range(60):
+            amount = resource.get_amount_after_consumption(amount, 0.1)
+            amounts.append(amount)
+        assert resource.get_amounts_after_consumption(5.0, 0.1, 60).tolist() == amounts
+        assert resource.current_amount == 5.0
+
     def test_update_based_on_component_functionality(self, resource: Resource.ConsumableResource):
         resource.update_based_on_component_functionality(0.0)
         assert resource.current_amount == 5.0
@@ -196,6 +210,13 @@ class TestTimeStepsOfAutonomyResource():
         assert resource.current_amount == 5.0
         assert resource.initial_amount == 5.0
 
+    def test_get_amount_after_consumption(self, resource: Resource.TimeStepsOfAutonomyResource):
+        assert resource.get_amount_after_consumption(5.0, 10.0) == 4.0
+        assert resource.get_amount_after_consumption(0.0, 0.0) == 0.0
+
+    def test_get_amounts_after_consumption(self, resource: Resource.TimeStepsOfAutonomyResource):
+        assert resource.get_amounts_after_consumption(3.0, 10.0, 5).tolist() == [2.0, 1.0, 0.0, 0.0, 0.0]
+
     def test_update_supply_based_on_consumption(self, resource: Resource.TimeStepsOfAutonomyResource):
         resource.update_supply_based_on_consumption(0)
         assert resource.current_amount == 4.0
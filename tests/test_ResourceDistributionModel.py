@@ -7,6 +7,7 @@ from pyrecodes_hospitals import DistributionPriority
 from pyrecodes_hospitals import System
 from pyrecodes_hospitals import SystemCreator
 from pyrecodes_hospitals import main
+from pyrecodes_hospitals import ResourceDistributionModel
 
 def set_bsu_communication_resource_name(components):
     for component in components:
@@ -447,6 +448,21 @@ class TestUtilityDistributionModel_ThreeLocalitiesCommunity():
 
         assert all(bool_list)
 
+    def test_get_scope(self, distribution_models: dict):
+        distribution_model = distribution_models['ElectricPower']
+        distribution_model.fill_system_matrix()
+        matrix = distribution_model.system_matrix.matrix
+        assert distribution_model.get_scope(['All']).tolist() == list(range(matrix.shape[0]))
+        for locality_id in [1, 2, 3]:
+            target_rows = np.where(np.logical_or(matrix[:, distribution_model.system_matrix.START_LOCALITY_COL_ID] == locality_id,
+                                                 matrix[:, distribution_model.system_matrix.END_LOCALITY_COL_ID] == locality_id))[0]
+            assert distribution_model.get_scope(f'Locality {locality_id}').tolist() == target_rows.tolist()
+        component_names = [distribution_model.components[0].name]
+        assert distribution_model.get_scope(component_names).tolist() == [0]
+        assert distribution_model.get_scope(component_names) is distribution_model.get_scope(list(component_names))
+        with pytest.raises(ValueError):
+            distribution_model.get_scope('Hospital')
+
 class TestHospitalDistributionModel():
 
     MAIN_FILE = './tests/test_inputs/test_inputs_Hospital_Main.json'
@@ -512,8 +528,106 @@ class TestUtilityDistributionModel_Hospital(TestHospitalDistributionModel):
         system.update()  
         distribution_model.distribute() 
         assert system.components[1].patients[0].demand_met[0]['Nurse'] == 1.0
-        assert math.isclose(system.components[2].patients[0].demand_met[1]['Nurse'], 1/1.5, abs_tol=1e-5) 
-        
+        assert math.isclose(system.components[2].patients[0].demand_met[1]['Nurse'], 1/1.5, abs_tol=1e-5)
+
+    def test_skip_distribution_with_unchanged_inputs(self):
+        system = self.initiate_system(self.EXCEL_INPUT_1)
+        distribution_model = system.resources['Nurse']['DistributionModel']
+        distribution_model.components[9].supply['Supply']['Nurse'].current_amount = 0
+        distribution_model.components[9].supply['Supply']['Nurse'].initial_amount = 0
+        system.set_initial_damage()
+        system.time_step = 1
+        system.receive_patients()
+        system.update()
+        distribution_model.distribute()
+        assert distribution_model.number_of_skipped_distributions == 0
+        demand_met = distribution_model.get_demand_met()
+        system.components[1].patients[0].set_all_demand_as_met()
+        distribution_model.distribute()
+        assert distribution_model.number_of_distributions == 2
+        assert distribution_model.number_of_skipped_distributions == 1
+        assert np.array_equal(distribution_model.get_demand_met(), demand_met)
+        assert system.components[1].patients[0].demand_met[0]['Nurse'] == 0
+
+        distribution_model.components[9].supply['Supply']['Nurse'].current_amount = 6
+        system.components[1].patients[0].set_all_demand_as_met()
+        distribution_model.distribute()
+        assert distribution_model.number_of_skipped_distributions == 1
+        assert system.components[1].patients[0].demand_met[0]['Nurse'] == 1.0
+        distribution_model.distribute()
+        assert distribution_model.number_of_skipped_distributions == 2
+        assert system.components[1].patients[0].demand_met[0]['Nurse'] == 1.0
+        assert system.get_distribution_counters()['Nurse'] == {'Distributions': 4, 'SkippedDistributions': 2}
+
+    def test_distribution_unchanged_by_supply(self):
+        system = self.initiate_system(self.EXCEL_INPUT_1)
+        system.set_initial_damage()
+        system.time_step = 1
+        system.receive_patients()
+        system.update()
+        system.distribute_resources()
+        distribution_model = system.resources['Water']['DistributionModel']
+        # the total demand for water is 16
+        assert distribution_model.distribution_unchanged_by_supply(1000, 17)
+        assert not distribution_model.distribution_unchanged_by_supply(1000, 16)
+        assert not distribution_model.distribution_unchanged_by_supply(1000, 999.5)
+        assert distribution_model.distribution_unchanged_by_supply(10, 10)
+
+    def test_allocate_supply_using_prefix_sums(self):
+        system = self.initiate_system(self.EXCEL_INPUT_1)
+        reference_system = self.initiate_system(self.EXCEL_INPUT_1)
+        for distribution_model in [resource['DistributionModel'] for resource in reference_system.resources.values()]:
+            distribution_model.supply_can_be_allocated_using_prefix_sums = lambda component_row_ids: False
+        allocated_using_prefix_sums = []
+        for current_system in [system, reference_system]:
+            for component_id, resource_name in [(11, 'Oxygen'), (12, 'Oxygen'), (2, 'OperatingTheater_Bed')]:
+                current_system.components[component_id].supply['Supply'][resource_name].current_amount = 1
+                current_system.components[component_id].supply['Supply'][resource_name].initial_amount = 1
+            current_system.set_initial_damage()
+        for time_step in range(1, 4):
+            for current_system in [system, reference_system]:
+                current_system.time_step = time_step
+                current_system.receive_patients()
+                current_system.update()
+                current_system.distribute_resources()
+            for resource_name, resource in system.resources.items():
+                if not isinstance(resource['DistributionModel'], ResourceDistributionModel.UtilityDistributionModel):
+                    continue
+                system_matrix = resource['DistributionModel'].system_matrix
+                reference_system_matrix = reference_system.resources[resource_name]['DistributionModel'].system_matrix
+                assert np.array_equal(system_matrix.matrix[:, system_matrix.DEMAND_MET_COL_ID],
+                                      reference_system_matrix.matrix[:, reference_system_matrix.DEMAND_MET_COL_ID])
+                rows = list(range(system_matrix.matrix.shape[0]))
+                allocated_using_prefix_sums.append(resource['DistributionModel'].supply_can_be_allocated_using_prefix_sums(rows))
+            for current_system in [system, reference_system]:
+                current_system.update_patients()
+        assert any(allocated_using_prefix_sums)
+
+    def test_multi_resource_system_matrix(self):
+        system = self.initiate_system(self.EXCEL_INPUT_1)
+        system.set_initial_damage()
+        for system.time_step in range(3):
+            system.receive_patients()
+            system.update()
+            system.multi_resource_system_matrix.fill_system_matrix()
+            for resource_name, system_matrix in system.multi_resource_system_matrix.system_matrices.items():
+                assert np.shares_memory(system_matrix.matrix, system.multi_resource_system_matrix.matrix)
+                filled_matrix = system_matrix.matrix.copy()
+                system.multi_resource_system_matrix.filled = False
+                system_matrix.fill_system_matrix()
+                assert np.array_equal(filled_matrix, system_matrix.matrix)
+                system.multi_resource_system_matrix.filled = True
+            system.multi_resource_system_matrix.filled = False
+            system.distribute_resources()
+            system.update_patients()
+        oxygen_matrix = system.resources['Oxygen']['DistributionModel'].system_matrix
+        system.multi_resource_system_matrix.fill_system_matrix()
+        oxygen_matrix.matrix[:, oxygen_matrix.DEMAND_MET_COL_ID] = 0.5
+        system.components[12].supply['Supply']['Oxygen'].current_amount = 7
+        oxygen_matrix.fill_system_matrix()
+        assert np.all(oxygen_matrix.matrix[:, oxygen_matrix.DEMAND_MET_COL_ID] == 1.0)
+        assert oxygen_matrix.matrix[12, oxygen_matrix.SUPPLY_COL_ID] == 7
+
     def test_fuel_distribution(self):
         system = self.initiate_system(self.EXCEL_INPUT_1)
         system.time_step = 1
@@ -649,4 +763,70 @@ class TestTimeStepsOfAutonomyDistributionModel(TestHospitalDistributionModel):
         assert system.components[2].patients[0].unmet_demand_info['MedicalDrugs'] == [8]
         assert system.components[2].patients[1].unmet_demand_info['MedicalDrugs'] == [8]
 
+    def test_distribution_unchanged_by_supply(self):
+        system = self.initiate_system(self.EXCEL_INPUT_1)
+        distribution_model = system.resources['MedicalDrugs']['DistributionModel']
+        assert distribution_model.distribution_unchanged_by_supply(5, 1)
+        assert not distribution_model.distribution_unchanged_by_supply(1, 0)
+
+
+
+def create_link(locality: list, supply: float) -> Component.StandardiReCoDeSComponent:
+    link = Component.StandardiReCoDeSComponent()
+    link.set_name('Road')
+    link.set_locality(locality)
+    link.add_resources('supply', 'Supply', {'RoadTransfer': {'Amount': supply}})
+    return link
+
+class TestTransferServiceDistributionModelPotentialPathSets():
+
+    @pytest.fixture
+    def distribution_model(self, tmp_path):
+        path_sets_file = tmp_path / 'potential_path_sets.json'
+        path_sets_file.write_text('{"from 1 to 3": [[1, 3], [1, 2, 3]]}')
+        components = [create_link([1, 2], 5.0), create_link([2, 3], 3.0), create_link([1, 3], 1.0)]
+        return ResourceDistributionModel.TransferServiceDistributionModelPotentialPathSets('RoadTransfer', {'PathSetsFile': str(path_sets_file)}, components)
+
+    def test_get_optimal_path(self, distribution_model):
+        distribution_model.distribute()
+        assert distribution_model.get_optimal_path(1, 3) == (3.0, 1)
+        assert distribution_model.get_optimal_path(3, 1) == (0.0, None)
+        assert distribution_model.optimal_paths == {(1, 3): (3.0, 1), (3, 1): (0.0, None)}
+
+    def test_update_optimal_paths(self, distribution_model):
+        distribution_model.distribute()
+        distribution_model.get_optimal_path(1.0, 3.0)
+        distribution_model.update_optimal_paths()
+        assert distribution_model.optimal_paths == {(1, 3): (3.0, 1)}
+        distribution_model.components[1].supply['Supply']['RoadTransfer'].current_amount = 0.5
+        distribution_model.update_optimal_paths()
+        assert distribution_model.optimal_paths == {}
+        assert distribution_model.get_optimal_path(1, 3) == (1.0, 0)
+
+class TestTransferServiceDistributionModelWidestPath():
 
+    @pytest.fixture
+    def distribution_model(self):
+        components = [create_link([1, 2], 5.0), create_link([2, 3], 3.0), create_link([1, 3], 1.0),
+                      create_link([3, 4], 2.0), create_link([2, 4], 0.0), create_link([4, 4], 10.0)]
+        return ResourceDistributionModel.TransferServiceDistributionModelWidestPath('RoadTransfer', {}, components)
+
+    def test_set_links(self, distribution_model):
+        assert len(distribution_model.links) == 5
+        assert [end_locality for end_locality, _ in distribution_model.adjacent_links[1]] == [2, 3]
+
+    def test_get_optimal_path(self, distribution_model):
+        distribution_model.distribute()
+        components = distribution_model.components
+        assert distribution_model.get_optimal_path(1, 3) == (3.0, [components[0], components[1]])
+        assert distribution_model.get_optimal_path(1, 4) == (2.0, [components[0], components[1], components[3]])
+        assert distribution_model.get_optimal_path(4, 1) == (0.0, None)
+        assert list(distribution_model.widest_paths.keys()) == [1, 4]
+
+    def test_update_optimal_paths(self, distribution_model):
+        distribution_model.distribute()
+        distribution_model.get_optimal_path(1, 3)
+        distribution_model.components[1].supply['Supply']['RoadTransfer'].current_amount = 0.5
+        distribution_model.update_optimal_paths()
+        assert distribution_model.widest_paths == {}
+        assert distribution_model.get_optimal_path(1, 3) == (1.0, [distribution_model.components[2]])
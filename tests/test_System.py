@@ -5,6 +5,9 @@ from pyrecodes_hospitals import main
 from pyrecodes_hospitals import System
 from pyrecodes_hospitals import SystemCreator
 from pyrecodes_hospitals import ComponentLibraryCreator
+from pyrecodes_hospitals import ResilienceCalculator
+from pyrecodes_hospitals import DistributionPriority
+from pyrecodes_hospitals import RandomStreams
 
 class TestSystem():
 
@@ -53,6 +56,22 @@ class TestDistributionListCreator(TestSystem):
                        'Communication', 'ElectricPower', 'CoolingWater', 'Communication']
         assert distribution_list_creator.get_resource_distribution_list() == target_list
 
+    def test_get_resource_dependencies(self, distribution_list_creator):
+        resource_dependencies = distribution_list_creator.get_resource_dependencies(['ElectricPower', 'CoolingWater', 'Communication'])
+        assert resource_dependencies == {'ElectricPower': ['Communication', 'CoolingWater'], 'CoolingWater': ['ElectricPower'],
+                                         'Communication': ['ElectricPower', 'CoolingWater']}
+
+    def test_get_strongly_connected_resource_groups(self, distribution_list_creator):
+        resource_names = ['ElectricPower', 'CoolingWater', 'Communication', 'Water']
+        resource_dependencies = {'ElectricPower': ['CoolingWater'], 'CoolingWater': ['ElectricPower', 'Water'], 'Communication': ['ElectricPower'], 'Water': []}
+        resource_groups = distribution_list_creator.get_strongly_connected_resource_groups(resource_names, resource_dependencies)
+        assert resource_groups == [['Communication'], ['ElectricPower', 'CoolingWater'], ['Water']]
+
+    def test_get_resource_distribution_groups(self, distribution_list_creator):
+        resource_distribution_list, resource_distribution_groups = distribution_list_creator.get_resource_distribution_groups()
+        assert resource_distribution_list == []
+        assert resource_distribution_groups == [(['ElectricPower', 'CoolingWater', 'Communication'], 3)]
+
 class TestThreeLocalitiesSystem(TestSystem):
     COMPONENT_LIBRARY_FILE = "./tests/test_inputs/test_inputs_ThreeLocalitiesCommunity_ComponentLibrary.json"
     SYSTEM_CONFIGURATION_FILE = './tests/test_inputs/test_inputs_ThreeLocalitiesCommunity_SystemConfiguration.json'    
@@ -135,6 +154,18 @@ class TestThreeLocalitiesSystem(TestSystem):
         bool_list.append(system.recovery_target_met() == True)
         assert all(bool_list)
 
+    def test_set_random_streams(self, system: System.System):
+        system.components[7].recovery_model.recovery_activity.set_duration({'Lognormal': {'Median': 10, 'Dispersion': 0.5}})
+        system.resources['ElectricPower']['DistributionModel'].priority = DistributionPriority.RandomPriority('ElectricPower', {'Seed': 1, 'DemandType': ['OperationDemand']}, system.components)
+        replication_states = []
+        for replication_id in [0, 1, 0]:
+            system.set_random_streams(RandomStreams.RandomStreams(5, replication_id))
+            replication_states.append((system.components[7].recovery_model.recovery_activity.duration,
+                                       system.resources['ElectricPower']['DistributionModel'].priority.get_component_priorities()))
+        # replications differ and each replication is reproducible
+        assert replication_states[0] == replication_states[2]
+        assert replication_states[0][0] != replication_states[1][0]
+
     def test_set_resource_distribution_list(self, system: System.System):
         assert system.resource_distribution_list == ['ElectricPower', 'CoolingWater', 'Communication', 'ElectricPower',
                                                      'CoolingWater', 'Communication', 'ElectricPower', 'CoolingWater',
@@ -143,6 +174,27 @@ class TestThreeLocalitiesSystem(TestSystem):
     def test_set_system_creator(self, system: System.System):
         assert isinstance(system.system_creator, SystemCreator.JSONSystemCreator)
 
+    def test_distribute_until_converged(self, system: System.System, component_library_creator: ComponentLibraryCreator.ComponentLibraryCreator):
+        system_creator = SystemCreator.JSONSystemCreator()
+        converging_system = System.BuiltEnvironmentSystem(self.SYSTEM_CONFIGURATION_FILE, component_library_creator.form_library(), system_creator)
+        system_creator.DISTRIBUTION_CONVERGENCE_TOLERANCE = 0.0
+        converging_system.set_resource_distribution_list()
+        assert converging_system.resource_distribution_groups == [(['ElectricPower', 'CoolingWater', 'Communication'], 3)]
+        for current_system in [system, converging_system]:
+            current_system.time_step = current_system.DISASTER_TIME_STEP
+            current_system.set_initial_damage()
+        for time_step in range(system.DISASTER_TIME_STEP, system.DISASTER_TIME_STEP + 5):
+            for current_system in [system, converging_system]:
+                current_system.time_step = time_step
+                current_system.update()
+                current_system.distribute_resources()
+                current_system.recover()
+            for resource_name, resource in system.resources.items():
+                assert np.array_equal(resource['DistributionModel'].get_demand_met(),
+                                      converging_system.resources[resource_name]['DistributionModel'].get_demand_met())
+        assert len(converging_system.distribution_iterations) == 5
+        assert all(2 <= iterations[0] <= 3 for iterations in converging_system.distribution_iterations)
+
     def test_create_system(self, system: System.System):
         pass
 
@@ -173,6 +225,91 @@ class TestHospitalSystem(TestSystem):
         # What else to test here?
         assert system.time_step == 10
 
+    def assert_same_results(self, simulated_system: System.System, other_system: System.System):
+        for simulated_calculator, other_calculator in zip(simulated_system.resilience_calculators, other_system.resilience_calculators):
+            if isinstance(simulated_calculator, ResilienceCalculator.ReCoDeSResilienceCalculator):
+                assert np.array_equal(simulated_calculator.supply_table.get_values(), other_calculator.supply_table.get_values())
+                assert np.array_equal(simulated_calculator.demand_table.get_values(), other_calculator.demand_table.get_values())
+                assert np.array_equal(simulated_calculator.consumption_table.get_values(), other_calculator.consumption_table.get_values())
+            elif isinstance(simulated_calculator, ResilienceCalculator.DeadPatientsCalculator):
+                assert simulated_calculator.dead_patients == other_calculator.dead_patients
+            else:
+                assert str(simulated_calculator.calculate_resilience()) == str(other_calculator.calculate_resilience())
+        for simulated_component, other_component in zip(simulated_system.components, other_system.components):
+            assert simulated_component.functional == other_component.functional
+            for resource_name, resource in simulated_component.supply['Supply'].items():
+                assert resource.current_amount == other_component.supply['Supply'][resource_name].current_amount
+
+    @pytest.mark.parametrize('patient_store_type', [None, 'PatientArrayStore', 'PatientCohortStore'])
+    def test_next_event_time_advance(self, patient_store_type):
+        systems = []
+        for next_event_time_advance in [False, True]:
+            system = self.create_system(self.EXCEL_INPUT_1)
+            system.MAX_TIME_STEP = 200
+            system.set_patient_store(patient_store_type)
+            system.next_event_time_advance = next_event_time_advance
+            system.start_resilience_assessment()
+            systems.append(system)
+        simulated_system, advanced_system = systems
+        assert simulated_system.skipped_time_steps == []
+        # steps with linearly depleting water tanks and patients in departments are repeated
+        assert len(advanced_system.skipped_time_steps) > 0
+        assert advanced_system.skipped_time_steps[-1] == 200
+        assert advanced_system.time_step == 200
+        self.assert_same_results(simulated_system, advanced_system)
+
+    @pytest.mark.parametrize('patient_store_type, use_patient_router', [(None, True), (None, False), ('PatientArrayStore', False)])
+    def test_early_termination(self, patient_store_type, use_patient_router):
+        systems = []
+        for early_termination in [False, True]:
+            system = self.create_system(self.EXCEL_INPUT_1)
+            system.MAX_TIME_STEP = 200
+            system.set_patient_store(patient_store_type)
+            system.set_patient_router(use_patient_router)
+            system.set_recovery_target_checker(early_termination)
+            system.start_resilience_assessment()
+            systems.append(system)
+        simulated_system, terminated_system = systems
+        assert simulated_system.FINISH == False
+        assert terminated_system.FINISH == True
+        assert terminated_system.time_step == 200
+        assert len(terminated_system.skipped_time_steps) > 0
+        # water tanks keep depleting in the remaining time steps, which repeat the last one until a tank runs out
+        assert terminated_system.skipped_time_steps[-1] == 200
+        self.assert_same_results(simulated_system, terminated_system)
+
+    def test_hospital_recovery_target_met(self):
+        system = self.create_system(self.EXCEL_INPUT_1)
+        system.MAX_TIME_STEP = 200
+        recovery_target_checker = System.HospitalRecoveryTargetChecker()
+        system.start_resilience_assessment(stop_time_step=0)
+        # the hospital is empty, but patients arrive at the next time step
+        assert system.hospital_is_empty()
+        assert not recovery_target_checker.recovery_target_met(system)
+        system.start_resilience_assessment(stop_time_step=30)
+        assert not system.hospital_is_empty()
+        assert not recovery_target_checker.recovery_target_met(system)
+        system.start_resilience_assessment(stop_time_step=60)
+        assert recovery_target_checker.recovery_target_met(system)
+
+    def test_resume_from_checkpoint(self, tmp_path):
+        simulated_system = self.create_system(self.EXCEL_INPUT_1)
+        simulated_system.start_resilience_assessment()
+        stopped_system = self.create_system(self.EXCEL_INPUT_1)
+        stopped_system.start_resilience_assessment(stop_time_step=4)
+        assert stopped_system.time_step == 4
+        assert stopped_system.next_time_step == 5
+        stopped_system.save_as_pickle(tmp_path / 'checkpoint.pickle')
+        resumed_system = System.HospitalSystem.load_as_pickle(tmp_path / 'checkpoint.pickle')
+        resumed_system.start_resilience_assessment()
+        assert resumed_system.time_step == 10
+        assert str(resumed_system.calculate_resilience()) == str(simulated_system.calculate_resilience())
+        for simulated_calculator, resumed_calculator in zip(simulated_system.resilience_calculators, resumed_system.resilience_calculators):
+            if isinstance(simulated_calculator, ResilienceCalculator.ReCoDeSResilienceCalculator):
+                assert np.array_equal(simulated_calculator.supply_table.get_values(), resumed_calculator.supply_table.get_values())
+                assert np.array_equal(simulated_calculator.demand_table.get_values(), resumed_calculator.demand_table.get_values())
+                assert np.array_equal(simulated_calculator.consumption_table.get_values(), resumed_calculator.consumption_table.get_values())
+
     def test_update(self):
         system = self.create_system(self.EXCEL_INPUT_1)
         system.time_step = 0
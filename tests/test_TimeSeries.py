@@ -0,0 +1,71 @@
+import numpy as np
+import pickle
+from pyrecodes_hospitals import TimeSeries
+
+class TestTimeSeriesTable():
+
+    def test_append(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen'], number_of_time_steps=3)
+        table.append([0, 1], [5.0, 10.0])
+        table.append([0, 1], [6.0, 20.0])
+        assert table.lengths.tolist() == [2, 2]
+        assert table.get_values().tolist() == [[5.0, 10.0], [6.0, 20.0]]
+        assert table.values.shape == (3, 2)
+
+    def test_append_beyond_number_of_time_steps(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen'], number_of_time_steps=1)
+        for time_step in range(5):
+            table.append([0, 1], [time_step, 2 * time_step])
+        table.append_value(0, 5)
+        assert table.values.shape[0] >= 6
+        assert table.get_column(0).tolist() == [0, 1, 2, 3, 4, 5]
+        assert table.get_column(1).tolist() == [0, 2, 4, 6, 8]
+        assert table.get_values().shape == (6, 2)
+
+    def test_append_rows(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen', 'Water'], number_of_time_steps=2)
+        table.append([0, 1, 2], [1.0, 2.0, 3.0])
+        table.append_rows([0, 2], np.asarray([[4.0, 5.0], [6.0, 7.0], [8.0, 9.0]]))
+        assert table.lengths.tolist() == [4, 1, 4]
+        assert table.values.shape[0] >= 4
+        assert table.get_column(0).tolist() == [1.0, 4.0, 6.0, 8.0]
+        assert table.get_column(1).tolist() == [2.0]
+        assert table.get_column(2).tolist() == [3.0, 5.0, 7.0, 9.0]
+
+    def test_pickle_recorded_values(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen'], number_of_time_steps=100)
+        time_series = table.get_time_series()
+        table.append([0, 1], [5.0, 10.0])
+        table.append([0], [6.0])
+        unpickled_table, unpickled_time_series = pickle.loads(pickle.dumps((table, time_series)))
+        assert len(pickle.dumps(table)) < table.values.nbytes
+        assert unpickled_table.values.shape == (100, 2)
+        assert unpickled_table.get_values().tolist() == [[5.0, 10.0], [6.0, 0.0]]
+        unpickled_time_series['Oxygen'].append(20.0)
+        assert unpickled_table.get_column(1).tolist() == [10.0, 20.0]
+        assert time_series['Oxygen'] == [10.0]
+
+class TestTimeSeries():
+
+    def test_list_behavior(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen'])
+        time_series = table.get_time_series()
+        assert time_series == {'Nurse': [], 'Oxygen': []}
+        time_series['Nurse'].append(0)
+        time_series['Nurse'][-1] += 3
+        time_series['Nurse'].append(4)
+        assert len(time_series['Nurse']) == 2
+        assert time_series['Nurse'][-1] == 4
+        assert time_series['Nurse'] == [3, 4]
+        assert list(time_series['Nurse']) == [3.0, 4.0]
+        assert time_series == {'Nurse': [3, 4], 'Oxygen': []}
+
+    def test_array_is_view_of_table(self):
+        table = TimeSeries.TimeSeriesTable(['Nurse', 'Oxygen'], number_of_time_steps=4)
+        time_series = table.get_time_series()
+        table.append([0, 1], [1.0, 2.0])
+        nurse_array = np.asarray(time_series['Nurse'])
+        assert nurse_array.tolist() == [1.0]
+        assert np.shares_memory(nurse_array, table.values)
+        nurse_array[0] = 7.0
+        assert time_series['Nurse'] == [7.0]